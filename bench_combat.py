@@ -0,0 +1,47 @@
+"""
+Benchmark the scalar and vectorized combat engines.
+
+Usage:
+    python bench_combat.py [fights]
+
+Resolves the same fights with combat_simulator (one CombatSystem per fight,
+in this process) and with vector_combat (batches of NumPy arrays), and
+prints simulated turns per second and win rates for each.
+"""
+import sys
+import time
+
+from combat_simulator import run_simulation
+from vector_combat import simulate_batch
+
+OPPONENT = {"name": "Ogre", "hp": 500, "abilities": {
+    "Club": {"damage_range": (15, 35)},
+    "Roar": {"damage_range": (5, 10), "cooldown": 1},
+}}
+
+
+def measure(run, fights: int):
+    """Run one engine, returning (seconds, report)."""
+    start = time.perf_counter()
+    report = run(fights)
+    return time.perf_counter() - start, report
+
+
+def main():
+    fights = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    scalar_fights = max(1, fights // 20)
+
+    print(f"{'engine':<10}{'policy':<10}{'fights':>9}{'turns/s':>12}{'win rate':>10}")
+    for policy in ("random", "tactical"):
+        engines = (
+            ("scalar", scalar_fights, lambda n: run_simulation({}, OPPONENT, n, policy, seed=1, processes=1)),
+            ("vector", fights, lambda n: simulate_batch({}, OPPONENT, n, policy, seed=1)),
+        )
+        for engine, count, run in engines:
+            elapsed, report = measure(run, count)
+            turns = sum(length * number for length, number in report.turn_counts.items())
+            print(f"{engine:<10}{policy:<10}{count:>9}{turns / elapsed:>12,.0f}{report.win_rate:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark per-turn upkeep of status effects, buffs and cooldowns.
+
+Usage:
+    python bench_combat_effects.py [turns]
+
+Compares CombatEntity, which keeps expiry turns in a heap and cooldowns
+against a clock, with ScanEntity, the previous version that decremented
+every effect, buff and ability each turn. Each entity carries a number of
+long-running effects, buffs and cooling abilities, gets a few short
+effects per turn, and runs update_status_effects and update_cooldowns once
+per turn. Prints microseconds per turn.
+"""
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict
+
+from combat_system import Ability, CombatEntity
+
+SIZES = (10, 100, 1000, 10000)
+
+
+@dataclass
+class ScanEntity:
+    """The scan-based upkeep CombatEntity used before expiry heaps."""
+    name: str
+    max_health: int
+    current_health: int
+    abilities: Dict[str, Ability]
+    status_effects: Dict[str, int] = field(default_factory=dict)
+    buffs: Dict[str, Dict[str, any]] = field(default_factory=dict)
+
+    def apply_status_effect(self, effect: str, duration: int):
+        self.status_effects[effect] = duration
+
+    def apply_buff(self, buff_name: str, effect: Dict[str, any], duration: int):
+        self.buffs[buff_name] = {"effect": effect, "duration": duration}
+
+    def update_cooldowns(self):
+        for ability in self.abilities.values():
+            if ability.current_cooldown > 0:
+                ability.current_cooldown -= 1
+
+    def update_status_effects(self):
+        expired = []
+        for effect, duration in self.status_effects.items():
+            if duration <= 1:
+                expired.append(effect)
+            else:
+                self.status_effects[effect] = duration - 1
+        for effect in expired:
+            del self.status_effects[effect]
+
+        expired_buffs = []
+        for buff_name, buff_data in self.buffs.items():
+            if buff_data["duration"] <= 1:
+                expired_buffs.append(buff_name)
+            else:
+                buff_data["duration"] -= 1
+        for buff in expired_buffs:
+            del self.buffs[buff]
+
+
+def run(entity_class, size: int, turns: int) -> float:
+    """Time the upkeep of one entity, returning microseconds per turn."""
+    rng = random.Random(size)
+    abilities = {f"ability {i}": Ability(f"ability {i}", (1, 2), cooldown=turns,
+                                         current_cooldown=turns) for i in range(size)}
+    entity = entity_class("bench", 100, 100, abilities)
+    for i in range(size):
+        entity.apply_status_effect(f"effect {i}", turns + rng.randint(0, turns))
+        entity.apply_buff(f"buff {i}", {"damage_multiplier": 1.01}, turns + rng.randint(0, turns))
+
+    start = time.perf_counter()
+    for turn in range(turns):
+        for j in range(3):
+            entity.apply_status_effect(f"short {turn} {j}", rng.randint(1, 4))
+        entity.apply_buff(f"short buff {turn}", {"damage_multiplier": 1.1}, rng.randint(1, 4))
+        entity.update_status_effects()
+        entity.update_cooldowns()
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print(f"{turns} turns")
+    print(f"{'long-running':>13}{'scan us/turn':>14}{'heap us/turn':>14}{'speedup':>9}")
+    for size in SIZES:
+        scan = run(ScanEntity, size, turns)
+        heap = run(CombatEntity, size, turns)
+        print(f"{size:>13}{scan:>14.1f}{heap:>14.1f}{scan / heap:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
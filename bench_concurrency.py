@@ -0,0 +1,103 @@
+"""
+Benchmark lock contention on a shared save file with many concurrent writers.
+
+Usage:
+    python bench_concurrency.py [updates_per_writer]
+
+Each writer is a separate process that repeatedly increments its own counter
+in one shared save. Two strategies are measured for 1 to 32 writers:
+
+- locked:     IncrementalSaveFile.update, a read-modify-write under the file lock
+- optimistic: load once, then save with version checks and merges on conflict
+
+Prints throughput, the mean and worst time a writer waited for the lock,
+and whether any update was lost.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import concurrency
+from incremental_save import IncrementalSaveFile
+
+WRITER_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def _timed_lock(original, waits):
+    """Wrap file_lock to record how long each acquisition waited."""
+    def file_lock(path, *args, **kwargs):
+        start = time.perf_counter()
+        context = original(path, *args, **kwargs)
+
+        class Timed:
+            def __enter__(self):
+                context.__enter__()
+                waits.append(time.perf_counter() - start)
+
+            def __exit__(self, *exc):
+                return context.__exit__(*exc)
+        return Timed()
+    return file_lock
+
+
+def _writer(path, strategy, writer_id, updates, results):
+    """Apply updates increments to this writer's counter, reporting lock waits."""
+    import incremental_save
+    waits = []
+    incremental_save.file_lock = _timed_lock(concurrency.file_lock, waits)
+
+    save_file = IncrementalSaveFile(path)
+    key = f"writer_{writer_id}"
+    if strategy == "locked":
+        for _ in range(updates):
+            save_file.update(lambda document: document.update({key: document.get(key, 0) + 1}))
+    else:
+        document = save_file.load()
+        for _ in range(updates):
+            document[key] = document.get(key, 0) + 1
+            save_file.save(document)
+    results.put(waits)
+
+
+def run(strategy: str, writers: int, updates: int):
+    """Run one configuration, returning (seconds, lock waits, lost updates)."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "shared.json")
+        IncrementalSaveFile(path).save({"name": "shared"})
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_writer, args=(path, strategy, i, updates, results))
+                     for i in range(writers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        waits = []
+        for _ in processes:
+            waits.extend(results.get())
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        final = IncrementalSaveFile(path).load()
+        lost = sum(updates - final.get(f"writer_{i}", 0) for i in range(writers))
+        return elapsed, waits, lost
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    print(f"{updates} updates per writer")
+    print(f"{'strategy':<12}{'writers':>8}{'updates/s':>12}{'mean wait ms':>14}{'max wait ms':>13}{'lost':>6}")
+    for strategy in ("locked", "optimistic"):
+        for writers in WRITER_COUNTS:
+            elapsed, waits, lost = run(strategy, writers, updates)
+            mean_wait = sum(waits) / len(waits) * 1000 if waits else 0.0
+            max_wait = max(waits) * 1000 if waits else 0.0
+            print(f"{strategy:<12}{writers:>8}{writers * updates / elapsed:>12.0f}"
+                  f"{mean_wait:>14.2f}{max_wait:>13.2f}{lost:>6}")
+
+
+if __name__ == '__main__':
+    main()
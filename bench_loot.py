@@ -0,0 +1,50 @@
+"""
+Benchmark item generation.
+
+Usage:
+    python bench_loot.py [items]
+
+Compares legacy_random_item, the generator used before loot tables (it
+rebuilt the rarity, weight and type lists on every call), with
+LootTable.draw and the batched LootTable.draw_many. Prints items per second.
+"""
+import random
+import sys
+import time
+
+from items import ITEM_TYPES, RARITY_LEVELS, Item, LootTable
+
+
+def legacy_random_item(min_rarity: str = "Common") -> Item:
+    """The per-call generate_random_item used before loot tables."""
+    rarities = list(RARITY_LEVELS.keys())
+    min_idx = rarities.index(min_rarity)
+    possible_rarities = rarities[min_idx:]
+    rarity = random.choices(possible_rarities, [RARITY_LEVELS[r] for r in possible_rarities])[0]
+    item_type = random.choice(list(ITEM_TYPES.keys()))
+    item_data = ITEM_TYPES[item_type]
+    name = random.choice(item_data["examples"][rarity])
+    attributes = {}
+    if "attributes" in item_data:
+        for attr in item_data["attributes"]:
+            attributes[attr] = random.randint(1, 10) * (rarities.index(rarity) + 1)
+    return Item(name, item_type, rarity, attributes)
+
+
+def measure(label: str, generate, count: int) -> None:
+    start = time.perf_counter()
+    generate(count)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>12,.0f} items/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    table = LootTable(seed=1)
+    measure("legacy per-call", lambda n: [legacy_random_item("Uncommon") for _ in range(n)], count)
+    measure("LootTable.draw", lambda n: [table.draw("Uncommon") for _ in range(n)], count)
+    measure("LootTable.draw_many", lambda n: table.draw_many(n, "Uncommon"), count)
+
+
+if __name__ == '__main__':
+    main()
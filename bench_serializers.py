@@ -0,0 +1,88 @@
+"""
+Benchmark the save file serializers on a realistic large player save.
+
+Usage:
+    python bench_serializers.py [conversation_entries]
+
+Prints encode time, decode time and bytes on disk for the legacy
+json.dump(..., indent=4) format and every Serializer configuration.
+"""
+import json
+import random
+import sys
+import time
+
+from items import generate_random_item, generate_treasure
+from player import default_player
+from serializers import Serializer, loads
+
+
+def build_large_save(conversation_entries: int = 2000) -> dict:
+    """Build a player save with long histories, logs and discovered locations."""
+    random.seed(42)
+    player = json.loads(json.dumps(default_player))
+    player['name'] = "benchmark"
+    player['inventory'] = [generate_random_item().to_dict() for _ in range(200)]
+    player['conversation_history'] = [
+        {
+            'prompt': f"I walk towards the neon sign number {i} and look around",
+            'response': "Rain hisses on the hot asphalt as the crowd parts around you. " * 6
+        }
+        for i in range(conversation_entries)
+    ]
+    player['story_context'] = {
+        'quests': [f"Quest {i}" for i in range(100)],
+        'major_events': [f"Major event {i}" for i in range(300)],
+        'story_progress': [f"Story beat {i}" for i in range(300)]
+    }
+    player['crew'] = {
+        'morale': 80.5, 'rest': 65.0, 'status': "Rested", 'hours_since_rest': 12,
+        'activity_log': [
+            {"activity": "Movie Night", "duration": 3, "effects": {"rest": 10, "morale": 20}}
+            for _ in range(conversation_entries)
+        ],
+        'current_activity': None
+    }
+    player['discovered_locations'] = [generate_treasure("Normal").to_dict() for _ in range(500)]
+    player['blueprints'] = [generate_random_item("Epic").to_dict() for _ in range(100)]
+    return player
+
+
+def time_call(func, repeat: int = 5) -> float:
+    """Return the best wall-clock time of func over repeat runs, in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    document = build_large_save(entries)
+
+    rows = []
+    legacy = json.dumps(document, indent=4).encode('utf-8')
+    rows.append(("legacy json indent=4",
+                 time_call(lambda: json.dumps(document, indent=4).encode('utf-8')),
+                 time_call(lambda: loads(legacy)),
+                 len(legacy)))
+
+    for name in ("json", "json+zlib", "json+lzma", "binary", "binary+zlib", "binary+lzma"):
+        serializer = Serializer.from_name(name, compress_threshold=0)
+        data = serializer.dumps(document)
+        assert loads(data) == document
+        rows.append((name,
+                     time_call(lambda: serializer.dumps(document)),
+                     time_call(lambda: loads(data)),
+                     len(data)))
+
+    print(f"Save with {entries} conversation entries")
+    print(f"{'format':<22}{'encode ms':>12}{'decode ms':>12}{'bytes':>12}{'vs legacy':>11}")
+    for name, encode_ms, decode_ms, size in rows:
+        print(f"{name:<22}{encode_ms:>12.1f}{decode_ms:>12.1f}{size:>12}{size / len(legacy):>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,9 +33,27 @@ Key Features:
 Directory Structure:
 ------------------
 characters/
-├── [character_name]/
-│   ├── character.json  # Current character state
-│   └── history.json    # Character progression log
+├── index.jsonl                       # Name, last_saved, level and location of every save
+└── [ab]/[cd]/                        # Shard picked by a hash of the name (see storage.py)
+    ├── [character_name].json         # Last full snapshot of the save
+    ├── [character_name].delta.jsonl  # Changes saved since the snapshot
+    ├── [character_name].history.jsonl              # Character progression log
+    └── [character_name].history.000001.jsonl[.gz]  # Rotated history archives
+
+Saves are incremental: each save appends only the changes since the previous
+one, and the log is folded into a new snapshot once it grows too large (see
+incremental_save.py). save_character only takes a snapshot of the data; the
+write itself runs on the background writer (see persistence_writer.py), and
+loads wait for a pending write of the same character.
+
+The history log is an append-only JSONL stream (see journal.RotatingJournal):
+logging a change appends one line, the log rotates into archives once it
+passes history_max_bytes, and iter_character_history streams entries
+filtered by time or field without loading the whole log.
+
+Saves are written with the sections codec, so load_character(name, lazy=True)
+decodes only the character header and leaves the conversation history on
+disk until it is used (see lazy_save.py).
 
 Usage:
 -----
@@ -59,14 +77,49 @@ persistence and provide character context for the AI's responses.
 import json
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
+
+import journal
+
+import serializers
+from incremental_save import get_save_file
+from lazy_save import load_lazy
+from persistence_writer import writer
+from serializers import Serializer
+from storage import ShardedDirectory, shard_for
 
 class CharacterManager:
-    def __init__(self, save_directory: str = "characters"):
-        """Initialize the character manager with a save directory."""
-        self.save_directory = save_directory
-        if not os.path.exists(save_directory):
-            os.makedirs(save_directory)
+    def __init__(self, save_directory: str = "characters", serializer: Optional[Serializer] = None,
+                 history_max_bytes: int = journal.DEFAULT_ROTATE_BYTES,
+                 history_compression: Optional[str] = "gzip",
+                 history_max_archives: Optional[int] = None):
+        """Initialize the character manager with a save directory, save encoding and history rotation."""
+        self.serializer = serializer or serializers.sections_serializer
+        self.history_max_bytes = history_max_bytes
+        self.history_compression = history_compression
+        self.history_max_archives = history_max_archives
+        self._history_logs: Dict[str, journal.RotatingJournal] = {}
+        self.storage = ShardedDirectory(save_directory, describe=self._describe_save)
+        self.save_directory = self.storage.directory
+
+    def _save_path(self, character_name: str, create: bool = False) -> str:
+        """Get the path of a character's save file."""
+        return self.storage.path_for(character_name.lower(), ".json", create)
+
+    @staticmethod
+    def _index_meta(save_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the metadata the storage index keeps for a save."""
+        character = save_data.get('character', {})
+        return {
+            'last_saved': save_data.get('last_saved'),
+            'level': character.get('level'),
+            'location': character.get('current_location')
+        }
+
+    def _describe_save(self, name: str, path: str) -> Optional[Dict[str, Any]]:
+        """Read the index metadata of a save while the index is rebuilt, leaving its history on disk."""
+        save_data = load_lazy(path, serializer=self.serializer)
+        return self._index_meta(save_data) if save_data else None
 
     def save_character(self, character_data: Dict[str, Any], conversation_history: Optional[list] = None, current_context: Optional[Dict[str, Any]] = None) -> None:
         """Save character data along with conversation history and context."""
@@ -82,22 +135,36 @@ class CharacterManager:
         }
 
         filename = f"{character_data['name'].lower()}.json"
-        filepath = os.path.join(self.save_directory, filename)
-        
-        with open(filepath, 'w') as f:
-            json.dump(save_data, f, indent=4)
+        filepath = self._save_path(character_data['name'], create=True)
+
+        # Snapshot now so later changes by the caller do not leak into the write
+        snapshot = json.loads(json.dumps(save_data))
+        writer.submit(filepath, get_save_file(filepath, self.serializer).save, snapshot, coalesce=True)
+        self.storage.record(character_data['name'].lower(), self._index_meta(save_data))
         print(f"Character saved as '{filename}'!")
 
-    def load_character(self, character_name: str) -> Optional[Dict[str, Any]]:
-        """Load character data including conversation history and context."""
-        filename = f"{character_name.lower()}.json"
-        filepath = os.path.join(self.save_directory, filename)
-        
-        if not os.path.exists(filepath):
-            return None
+    def load_character(self, character_name: str, lazy: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Load character data including conversation history and context.
 
-        with open(filepath, 'r') as f:
-            save_data = json.load(f)
+        With lazy=True the result is a LazyDocument: the character is decoded
+        right away, the conversation history when it is first accessed.
+        """
+        filepath = self._save_path(character_name)
+        writer.wait(filepath)
+
+        if lazy:
+            save_data = load_lazy(filepath, serializer=self.serializer)
+            if save_data is None:
+                return None
+            for key, default in (('character', {}), ('conversation_history', []), ('current_context', {})):
+                if key not in save_data:
+                    save_data[key] = default
+            return save_data
+
+        save_data = get_save_file(filepath, self.serializer).load()
+        if save_data is None:
+            return None
 
         return {
             'character': save_data.get('character', {}),
@@ -107,21 +174,19 @@ class CharacterManager:
 
     def delete_character(self, character_name: str) -> bool:
         """Delete a character's save file."""
-        filename = f"{character_name.lower()}.json"
-        filepath = os.path.join(self.save_directory, filename)
-        
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            return True
-        return False
+        filepath = self._save_path(character_name)
+        writer.wait(filepath)
+
+        self.storage.remove(character_name.lower())
+        return get_save_file(filepath, self.serializer).delete()
 
     def list_characters(self) -> list:
         """List all saved characters."""
-        characters = []
-        for filename in os.listdir(self.save_directory):
-            if filename.endswith('.json'):
-                characters.append(filename[:-5])  # Remove .json extension
-        return characters
+        return self.storage.names()
+
+    def search_characters(self, predicate=None, **equals) -> list:
+        """Find saved characters by indexed metadata, e.g. search_characters(location='docks')."""
+        return self.storage.search(predicate, **equals)
 
     def get_character_template(self) -> Dict[str, Any]:
         """Get a template for creating a new character."""
@@ -131,7 +196,7 @@ class CharacterManager:
             'health': 100,
             'max_health': 100,
             'credits': 1000,
-            'inventory': [],
+            'inventory': {},
             'equipped_items': {},
             'skills': {
                 'hacking': 0,
@@ -169,16 +234,51 @@ class CharacterManager:
             'achievements': []
         }
 
+    def _history_log(self, character_name: str) -> journal.RotatingJournal:
+        """Get the history log of a character, migrating a legacy history.json."""
+        name = character_name.lower()
+        log = self._history_logs.get(name)
+        if log is None:
+            log = journal.RotatingJournal(
+                self.storage.path_for(name, ".history.jsonl", create=True),
+                max_bytes=self.history_max_bytes,
+                compression=self.history_compression,
+                max_archives=self.history_max_archives
+            )
+            self._migrate_legacy_history(character_name, log)
+            self._history_logs[name] = log
+        return log
+
+    def _migrate_legacy_history(self, character_name: str, log: journal.RotatingJournal) -> None:
+        """Move a history.json array from the old per-character folder into the log."""
+        # The old folder was named after the character as written, and
+        # storage.migrate() moved it into the shard of that name
+        for folder in dict.fromkeys((character_name, character_name.lower())):
+            legacy_dir = os.path.join(self.storage.directory, shard_for(folder), folder)
+            legacy_file = os.path.join(legacy_dir, "history.json")
+            if os.path.exists(legacy_file):
+                break
+        else:
+            return
+        with open(legacy_file, 'r') as f:
+            history = json.load(f)
+        writer.wait(log.path)
+        # The legacy entries are older than anything already in the log
+        existing = log.path if os.path.exists(log.path) else None
+        if existing:
+            os.replace(existing, f"{existing}.tmp")
+        log.append_encoded(journal.encode_entries(history))
+        if existing:
+            with open(f"{existing}.tmp", 'rb') as f:
+                log.append_encoded(f.read())
+            os.remove(f"{existing}.tmp")
+        os.remove(legacy_file)
+        if not os.listdir(legacy_dir):
+            os.rmdir(legacy_dir)
+
     def _update_character_log(self, character_name: str, new_data: Dict[str, Any]) -> None:
-        """Update character history log with significant changes."""
-        log_file = os.path.join(self.save_directory, character_name, "history.json")
-        
-        # Load existing history
-        try:
-            with open(log_file, 'r') as f:
-                history = json.load(f)
-        except FileNotFoundError:
-            history = []
+        """Append significant changes to the character history log."""
+        log = self._history_log(character_name)
 
         # Create new log entry
         log_entry = {
@@ -192,11 +292,28 @@ class CharacterManager:
             }
         }
         
-        history.append(log_entry)
-        
-        # Save updated history
-        with open(log_file, 'w') as f:
-            json.dump(history, f, indent=4)
+        # Encode now, append (and rotate if needed) on the writer thread
+        writer.submit(log.path, log.append_encoded, journal.encode_entries([log_entry]))
+
+    def iter_character_history(self, character_name: str, since: Optional[str] = None,
+                               until: Optional[str] = None, match: Optional[Dict[str, Any]] = None,
+                               predicate=None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a character's history log, oldest first.
+
+        Args:
+        character_name (str): The character whose history to read.
+        since (Optional[str]): Only entries at or after this ISO timestamp.
+        until (Optional[str]): Only entries at or before this ISO timestamp.
+        match (Optional[Dict[str, Any]]): Dotted fields that must match, e.g. {"stats.location": "docks"}.
+        predicate (Optional[Callable]): Keeps only entries it accepts.
+
+        Returns:
+        Iterator[Dict[str, Any]]: Matching history entries, read lazily.
+        """
+        log = self._history_log(character_name)
+        writer.wait(log.path)
+        return log.iter_entries(since=since, until=until, match=match, predicate=predicate)
 
     def _detect_significant_changes(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Detect significant changes in character data."""
@@ -0,0 +1,316 @@
+"""
+Combat AI Module
+==============
+
+Search-based opponents for CombatSystem.
+
+MCTSOpponent is an action policy that picks the opponent's ability by Monte
+Carlo tree search within a wall-clock budget per turn. The tree alternates
+between opponent and player decisions. Damage rolls are sampled on every
+pass through it, and fights are played out with random moves from the
+leaves. Outcomes are scored by who won and by how much health is left, so
+an opponent that is bound to lose still makes the player pay. The most
+visited ability is used.
+
+Search runs on a compact position: both health values plus the tactical
+state of combat_odds (cooldowns, stuns and buff durations as tuples). No
+CombatSystem or CombatEntity is copied, so a rollout costs a few tuple
+operations per turn. With workers > 1 every worker process searches its
+own tree for the same budget and their root statistics are summed (root
+parallelization); workers still busy at the deadline are not waited for.
+
+Difficulty levels map to search budgets, capped at MAX_BUDGET so a turn
+always answers promptly:
+
+- Easy:   random choice, as before
+- Normal: 5 ms
+- Hard:   20 ms
+- Epic:   100 ms
+
+Usage:
+-----
+```python
+combat = CombatSystem(player, opponent, opponent_policy=opponent_policy_for("Hard"))
+combat = CombatSystem(player, opponent, opponent_policy=MCTSOpponent(budget=0.05, workers=4))
+```
+"""
+
+import atexit
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from combat_odds import SideState, _SideSpec
+from combat_system import ActionPolicy, CombatEntity, CombatSystem, random_policy
+
+# Search time per turn in seconds; None plays randomly
+DIFFICULTY_BUDGETS: Dict[str, Optional[float]] = {
+    "Easy": None,
+    "Normal": 0.005,
+    "Hard": 0.02,
+    "Epic": 0.1,
+}
+
+# No search runs longer than this, whatever the budget
+MAX_BUDGET = 0.25
+
+# Rollouts stop after this many actions and are scored by remaining health
+DEFAULT_ROLLOUT_DEPTH = 60
+
+PLAYER, OPPONENT = 0, 1
+
+# (player hp, opponent hp, player side, opponent side)
+Position = Tuple[int, int, SideState, SideState]
+
+
+class _Rules:
+    """Plays actions on positions without touching CombatSystem objects."""
+
+    def __init__(self, player: _SideSpec, opponent: _SideSpec, max_hp: Tuple[int, int]):
+        self.specs = (player, opponent)
+        self.max_hp = max_hp
+
+    def actions(self, position: Position, mover: int) -> List[int]:
+        return self.specs[mover].ready(position[2 + mover])
+
+    def act(self, position: Position, actor: int, index: int,
+            rng: random.Random) -> Tuple[Position, int, Optional[int]]:
+        """
+        Play one action and the skipped turns that follow it.
+
+        Returns:
+        Tuple[Position, int, Optional[int]]: The new position, who moves next and the
+            winner if the action ended the fight.
+        """
+        hp = [position[0], position[1]]
+        sides = [position[2], position[3]]
+        target = 1 - actor
+        spec = self.specs[actor]
+        hp[target] -= spec.roll(index, sides[actor][2], rng)
+        sides[actor], sides[target] = spec.after_action(sides[actor], sides[target], index)
+
+        mover = PLAYER
+        if actor == PLAYER:
+            # The opponent answers unless stunned or out of ready abilities
+            if sides[OPPONENT][1] > 0 or not self.specs[OPPONENT].ready(sides[OPPONENT]):
+                sides[OPPONENT] = _SideSpec.tick(sides[OPPONENT])
+            else:
+                mover = OPPONENT
+        winner = actor if hp[target] <= 0 else None
+        return (hp[0], hp[1], sides[0], sides[1]), mover, winner
+
+    def reward(self, position: Position, winner: Optional[int]) -> float:
+        """
+        Score a position for the opponent, between 0 and 1.
+
+        A win is worth more than any loss, and margins break ties, so the
+        opponent still fights well in fights it is expected to lose.
+        """
+        player = max(position[0], 0) / self.max_hp[PLAYER]
+        opponent = max(position[1], 0) / self.max_hp[OPPONENT]
+        if winner == OPPONENT:
+            return 0.5 + 0.5 * opponent
+        if winner == PLAYER:
+            return 0.5 - 0.5 * player
+        return 0.5 + 0.5 * (opponent - player)
+
+    def rollout(self, position: Position, mover: int, rng: random.Random, depth: int) -> float:
+        """Play random moves to the end, returning the opponent's reward."""
+        for _ in range(depth):
+            actions = self.actions(position, mover)
+            if not actions:
+                break
+            position, mover, winner = self.act(position, mover, rng.choice(actions), rng)
+            if winner is not None:
+                return self.reward(position, winner)
+        return self.reward(position, None)
+
+
+class _Node:
+    __slots__ = ("mover", "actions", "children", "visits", "value")
+
+    def __init__(self, mover: int, actions: List[int]):
+        self.mover = mover
+        self.actions = actions
+        self.children: Dict[int, '_Node'] = {}
+        self.visits = 0
+        self.value = 0.0  # Sum of the opponent's rewards
+
+    def select(self, exploration: float) -> int:
+        """Pick the child with the best upper confidence bound for the side to move."""
+        log_visits = math.log(self.visits)
+        best, best_score = None, -1.0
+        for action, child in self.children.items():
+            mean = child.value / child.visits
+            if self.mover == PLAYER:
+                mean = 1.0 - mean
+            score = mean + exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = action, score
+        return best
+
+
+def search(rules: _Rules, position: Position, budget: Optional[float], iterations: Optional[int],
+           seed: int, exploration: float = 1.4,
+           depth: int = DEFAULT_ROLLOUT_DEPTH) -> Dict[int, Tuple[int, float]]:
+    """
+    Search the opponent's move from a position.
+
+    Args:
+    rules (_Rules): The abilities of both sides.
+    position (Position): The position with the opponent to move.
+    budget (Optional[float]): Seconds to search for.
+    iterations (Optional[int]): Number of passes to make instead of searching for a time.
+    seed (int): Seed of the search's random stream.
+    exploration (float): The UCB exploration constant.
+    depth (int): Actions per rollout before scoring by health.
+
+    Returns:
+    Dict[int, Tuple[int, float]]: Ability index -> (visits, summed opponent reward) at the root.
+    """
+    rng = random.Random(seed)
+    root = _Node(OPPONENT, rules.actions(position, OPPONENT))
+    deadline = time.perf_counter() + min(budget or 0.0, MAX_BUDGET)
+    done = 0
+    while root.actions:
+        if iterations is not None:
+            if done >= iterations:
+                break
+        elif done and time.perf_counter() >= deadline:
+            break
+        done += 1
+
+        node, state, path = root, position, [root]
+        reward = None
+        while True:
+            untried = [action for action in node.actions if action not in node.children]
+            if untried:
+                action = rng.choice(untried)
+                state, mover, winner = rules.act(state, node.mover, action, rng)
+                child = node.children[action] = _Node(mover, rules.actions(state, mover))
+                path.append(child)
+                break
+            if not node.actions:
+                reward = rules.reward(state, None)
+                break
+            action = node.select(exploration)
+            state, _, winner = rules.act(state, node.mover, action, rng)
+            node = node.children[action]
+            path.append(node)
+            if winner is not None:
+                break
+
+        if reward is None:
+            if winner is not None:
+                reward = rules.reward(state, winner)
+            else:
+                reward = rules.rollout(state, path[-1].mover, rng, depth)
+        for visited in path:
+            visited.visits += 1
+            visited.value += reward
+    return {action: (child.visits, child.value) for action, child in root.children.items()}
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Get the shared search pool, growing it if more workers are wanted."""
+    global _pool, _pool_size
+    if _pool is None or _pool_size < workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_size = workers
+    return _pool
+
+
+@atexit.register
+def _close_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+class MCTSOpponent:
+    def __init__(self, budget: float = 0.02, iterations: Optional[int] = None, workers: int = 1,
+                 exploration: float = 1.4, rollout_depth: int = DEFAULT_ROLLOUT_DEPTH):
+        """
+        Create a search-based opponent policy.
+
+        Args:
+        budget (float): Seconds to search per turn, capped at MAX_BUDGET.
+        iterations (Optional[int]): Search a fixed number of passes instead, for reproducible play.
+        workers (int): Processes searching in parallel; 1 searches in this process only.
+        exploration (float): The UCB exploration constant.
+        rollout_depth (int): Actions per rollout before scoring by health.
+        """
+        self.budget = min(budget, MAX_BUDGET)
+        self.iterations = iterations
+        self.workers = workers
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self._combat: Optional[CombatSystem] = None
+        self._rules: Optional[_Rules] = None
+
+    def _rules_for(self, combat: CombatSystem) -> _Rules:
+        """Get the rules of a fight, reusing them across its turns."""
+        if self._combat is not combat:
+            self._combat = combat
+            self._rules = _Rules(_SideSpec(combat.player), _SideSpec(combat.opponent),
+                                 (combat.player.max_health, combat.opponent.max_health))
+        return self._rules
+
+    def statistics(self, combat: CombatSystem, rng: random.Random) -> Dict[str, Tuple[int, float]]:
+        """Search the opponent's move, returning (visits, mean opponent reward) per ability."""
+        rules = self._rules_for(combat)
+        player, opponent = rules.specs
+        position = (combat.player.current_health, combat.opponent.current_health,
+                    player.state_of(combat.player), opponent.state_of(combat.opponent))
+        args = (rules, position, self.budget, self.iterations)
+        options = dict(exploration=self.exploration, depth=self.rollout_depth)
+
+        futures = []
+        if self.workers > 1:
+            pool = _get_pool(self.workers - 1)
+            futures = [pool.submit(search, *args, rng.getrandbits(64), **options)
+                       for _ in range(self.workers - 1)]
+        totals = search(*args, rng.getrandbits(64), **options)
+        if futures:
+            # Allow a little slack for the workers to report, never the whole budget again
+            finished, _ = wait(futures, timeout=None if self.iterations else self.budget / 2 + 0.01)
+            for future in finished:
+                for action, (visits, value) in future.result().items():
+                    known = totals.get(action, (0, 0.0))
+                    totals[action] = (known[0] + visits, known[1] + value)
+        return {opponent.names[action]: (visits, value / visits)
+                for action, (visits, value) in totals.items() if visits}
+
+    def __call__(self, combat: CombatSystem, actor: CombatEntity, target: CombatEntity,
+                 rng: random.Random) -> Optional[str]:
+        ready = actor.ready_abilities()
+        if len(ready) <= 1:
+            return ready[0] if ready else None
+        stats = self.statistics(combat, rng)
+        if not stats:
+            return rng.choice(ready)
+        return max(stats, key=lambda name: stats[name][0])
+
+
+def opponent_policy_for(difficulty: str = "Normal", workers: int = 1) -> ActionPolicy:
+    """
+    Get the opponent policy of a difficulty level.
+
+    Args:
+    difficulty (str): "Easy", "Normal", "Hard" or "Epic"; unknown levels play as Normal.
+    workers (int): Processes to search with.
+
+    Returns:
+    ActionPolicy: The policy, to pass to CombatSystem as opponent_policy.
+    """
+    budget = DIFFICULTY_BUDGETS.get(difficulty, DIFFICULTY_BUDGETS["Normal"])
+    if budget is None:
+        return random_policy
+    return MCTSOpponent(budget=budget, workers=workers)
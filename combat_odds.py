@@ -0,0 +1,556 @@
+"""
+Combat Odds Module
+================
+
+Exact win probabilities for CombatSystem fights.
+
+Damage rolls are uniform over each ability's damage_range, and the built-in
+policies only look at cooldowns, stuns and buffs, never at health. So the
+chance of winning from any position can be computed exactly instead of
+sampled. A position is the pair of health values plus the "tactical state":
+every ability's cooldown and both sides' stun and buff durations.
+
+The solver enumerates the tactical states reachable from the start of a
+fight and keeps one table per state, indexed by [player_hp, opponent_hp].
+Each turn is a convolution of the table with the damage distributions of
+the abilities used (including buff multipliers); a uniform damage range
+costs two array operations on running sums however wide it is. The tables
+are refined by value iteration until they stop changing, about as many
+sweeps as the longest fight takes turns.
+
+Solving takes under a second for a typical fight (300 against 100 health)
+but grows with the number of tactical states times the product of the two
+health caps, up to a minute for large opponents. So it never runs on the
+game's interactive path:
+
+- get_table() solves on the caller's thread, for tools and balancing.
+- request_table() solves on a background worker and returns a Future.
+- cached_win_chance() only looks up tables that are already solved, and
+  returns None otherwise.
+
+The opponent is assumed to pick at random, as on Easy. The search-based
+opponents of harder difficulties (see combat_ai.py) cannot be solved this
+way, so CombatSystem.get_win_chance() gives no odds against them.
+
+Tables larger than MAX_TABLE_CELLS are refused with TableTooLarge. The
+solved tables are kept per ability set, health cap and pair of policies in
+an LRU cache of TABLE_CACHE_SIZE entries, so the odds of a running fight
+are a dictionary lookup and an array index.
+
+The player policy "optimal" picks the ability with the best odds at every
+turn; any policy of combat_simulator can be used for either side, as long
+as it is deterministic ("random" is handled as a uniform choice).
+
+Usage:
+-----
+```python
+combat = CombatSystem(player, opponent)
+request_table(combat)                        # Start solving in the background
+chance = cached_win_chance(combat)           # None until the table is solved
+chance = win_chance(combat)                  # Odds with best play, solving if needed
+odds = action_win_chances(combat)            # Odds of each ready ability
+table = get_table(combat)
+hp = table.opponent_hp_for(0.6)              # Opponent health for a 60% win chance
+```
+"""
+
+import random
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from combat_simulator import Policy, get_policy
+from combat_system import Ability, CombatEntity, CombatSystem
+
+# Stop refining the tables once no probability changes by more than this
+TOLERANCE = 1e-9
+
+# Bound on value iteration sweeps, reached only by fights that can stall
+MAX_SWEEPS = 2000
+
+# Largest table solved, in tactical states x player health x opponent health
+# (a few seconds of solving)
+MAX_TABLE_CELLS = 5_000_000
+
+# Solved tables kept, least recently used dropped first
+TABLE_CACHE_SIZE = 16
+
+# (cooldowns, stun duration, buff durations) of one side
+SideState = Tuple[Tuple[int, ...], int, Tuple[int, ...]]
+# (player side, opponent side)
+TacticalState = Tuple[SideState, SideState]
+
+
+class TableTooLarge(ValueError):
+    """Raised when a fight has too many positions to solve."""
+
+
+class _SideSpec:
+    """The abilities of one side and how an action changes its tactical state."""
+
+    def __init__(self, entity: CombatEntity):
+        self.abilities: List[Ability] = list(entity.abilities.values())
+        self.names = [ability.name for ability in self.abilities]
+        self.buff_names: List[str] = []
+        self.buff_multipliers: List[float] = []
+        self.buff_slots: List[int] = []
+        for ability in self.abilities:
+            buff = ability.special_effects.get("buff")
+            if buff is None:
+                self.buff_slots.append(-1)
+                continue
+            name = buff.get("name", ability.name)
+            if name not in self.buff_names:
+                self.buff_names.append(name)
+                self.buff_multipliers.append(buff.get("effect", {}).get("damage_multiplier", 1.0))
+            self.buff_slots.append(self.buff_names.index(name))
+        self._pmfs: Dict[Tuple[int, Tuple[int, ...]], List[Tuple[int, int, float]]] = {}
+
+    def key(self) -> Tuple:
+        """A hashable description of the abilities, for memoizing tables."""
+        return tuple((a.name, tuple(a.damage_range), a.cooldown, repr(sorted(a.special_effects.items())))
+                     for a in self.abilities)
+
+    def state_of(self, entity: CombatEntity) -> SideState:
+        """Read the tactical state of an entity."""
+        return (tuple(entity.abilities[name].current_cooldown for name in self.names),
+                entity.status_effects.get("stun", 0),
+                tuple(entity.buffs[name]["duration"] if name in entity.buffs else 0
+                      for name in self.buff_names))
+
+    def entity(self, state: SideState) -> CombatEntity:
+        """Build an entity in a tactical state, for calling policies."""
+        cooldowns, stun, buffs = state
+        abilities = {a.name: Ability(a.name, a.damage_range, a.cooldown, cooldowns[i],
+                                     a.special_effects, a.description)
+                     for i, a in enumerate(self.abilities)}
+        entity = CombatEntity("", 1, 1, abilities)
+        if stun:
+            entity.apply_status_effect("stun", stun)
+        for slot, duration in enumerate(buffs):
+            if duration:
+                entity.apply_buff(self.buff_names[slot],
+                                  {"damage_multiplier": self.buff_multipliers[slot]}, duration)
+        return entity
+
+    def ready(self, state: SideState) -> List[int]:
+        return [i for i, cooldown in enumerate(state[0]) if cooldown == 0]
+
+    def multiplier(self, buffs: Tuple[int, ...]) -> float:
+        """Get the damage multiplier of the active buffs."""
+        multiplier = 1.0
+        for slot, duration in enumerate(buffs):
+            if duration:
+                multiplier *= self.buff_multipliers[slot]
+        return multiplier
+
+    def roll(self, index: int, buffs: Tuple[int, ...], rng: random.Random) -> int:
+        """Roll the damage of an ability under the active buffs."""
+        return int(rng.randint(*self.abilities[index].damage_range) * self.multiplier(buffs))
+
+    def damage_pmf(self, index: int, buffs: Tuple[int, ...]) -> List[Tuple[int, int, float]]:
+        """
+        Get the damage distribution of an ability under the active buffs.
+
+        Returns:
+        List[Tuple[int, int, float]]: Runs (low, high, p) of consecutive damage values
+            that each have probability p; a plain damage_range is a single run.
+        """
+        key = (index, buffs)
+        if key not in self._pmfs:
+            multiplier = self.multiplier(buffs)
+            low, high = self.abilities[index].damage_range
+            counts = Counter(int(roll * multiplier) for roll in range(low, high + 1))
+            total = high - low + 1
+            runs: List[Tuple[int, int, float]] = []
+            for damage, count in sorted(counts.items()):
+                if runs and runs[-1][1] == damage - 1 and runs[-1][2] == count / total:
+                    runs[-1] = (runs[-1][0], damage, runs[-1][2])
+                else:
+                    runs.append((damage, damage, count / total))
+            self._pmfs[key] = runs
+        return self._pmfs[key]
+
+    @staticmethod
+    def tick(state: SideState) -> SideState:
+        """Count down effects and cooldowns after the side acted or lost its action."""
+        cooldowns, stun, buffs = state
+        return (tuple(max(c - 1, 0) for c in cooldowns), max(stun - 1, 0),
+                tuple(max(b - 1, 0) for b in buffs))
+
+    def after_action(self, actor: SideState, target: SideState, index: int) -> Tuple[SideState, SideState]:
+        """Get the states of actor and target after the actor used an ability."""
+        ability = self.abilities[index]
+        cooldowns, stun, buffs = self.tick(actor)
+        cooldowns = cooldowns[:index] + (ability.cooldown,) + cooldowns[index + 1:]
+        slot = self.buff_slots[index]
+        if slot >= 0:
+            buffs = buffs[:slot] + (ability.special_effects["buff"].get("duration", 1),) + buffs[slot + 1:]
+        if "stun" in ability.special_effects:
+            target = (target[0], ability.special_effects["stun"], target[2])
+        return (cooldowns, stun, buffs), target
+
+
+def _expand_runs(runs: List[Tuple[int, int, float]]) -> List[Tuple[int, float]]:
+    """Turn damage runs back into (damage, probability) pairs."""
+    return [(damage, weight) for low, high, weight in runs for damage in range(low, high + 1)]
+
+
+def _policy_choices(policy: Policy, spec: _SideSpec, actor: SideState,
+                    target_spec: _SideSpec, target: SideState) -> List[Tuple[int, float]]:
+    """Get the (ability index, probability) choices of a policy in a tactical state."""
+    ready = spec.ready(actor)
+    if not ready:
+        return []
+    if policy == "random":
+        return [(index, 1 / len(ready)) for index in ready]
+    name = get_policy(policy)(None, spec.entity(actor), target_spec.entity(target), random.Random(0))
+    return [(spec.names.index(name), 1.0)] if name is not None else []
+
+
+class WinTable:
+    """Win probabilities and expected fight lengths for every reachable position."""
+
+    def __init__(self, player: _SideSpec, opponent: _SideSpec, max_player_hp: int,
+                 max_opponent_hp: int, player_policy: Policy, opponent_policy: Policy):
+        self.player = player
+        self.opponent = opponent
+        self.max_player_hp = max_player_hp
+        self.max_opponent_hp = max_opponent_hp
+        self.player_policy = player_policy
+        self.opponent_policy = opponent_policy
+        self.sweeps = 0
+        # Tactical state -> array [0: win probability, 1: expected turns][player_hp, opponent_hp]
+        self.tables: Dict[TacticalState, np.ndarray] = {}
+        self._actions: Dict[TacticalState, List[Tuple[int, float, list, list]]] = {}
+        self._prefixes: Dict[TacticalState, np.ndarray] = {}
+
+    # --- Solving ---
+
+    def _opponent_outcomes(self, player: SideState, opponent: SideState) -> list:
+        """Get the (probability, damage pmf, next state) outcomes of the opponent's reply."""
+        if opponent[1] > 0:
+            return [(1.0, [(0, 0, 1.0)], (player, self.opponent.tick(opponent)))]
+        choices = _policy_choices(self.opponent_policy, self.opponent, opponent, self.player, player)
+        if not choices:
+            return [(1.0, [(0, 0, 1.0)], (player, self.opponent.tick(opponent)))]
+        outcomes = []
+        for index, probability in choices:
+            pmf = self.opponent.damage_pmf(index, opponent[2])
+            after, target = self.opponent.after_action(opponent, player, index)
+            outcomes.append((probability, pmf, (target, after)))
+        return outcomes
+
+    def _expand(self, state: TacticalState) -> List[TacticalState]:
+        """Work out the player's actions in a state, returning the states they lead to."""
+        player, opponent = state
+        if self.player_policy == "optimal":
+            choices = [(index, 1.0) for index in self.player.ready(player)]
+        else:
+            choices = _policy_choices(self.player_policy, self.player, player, self.opponent, opponent)
+        actions, successors = [], []
+        for index, probability in choices:
+            pmf = self.player.damage_pmf(index, player[2])
+            after, target = self.player.after_action(player, opponent, index)
+            outcomes = self._opponent_outcomes(after, target)
+            actions.append((index, probability, pmf, outcomes))
+            successors.extend(outcome[2] for outcome in outcomes)
+        self._actions[state] = actions
+        return successors
+
+    def add_states(self, start: TacticalState, max_cells: Optional[int] = None) -> None:
+        """
+        Enumerate the states reachable from start and (re)solve the tables.
+
+        Raises:
+        TableTooLarge: If the tables would have more than max_cells positions.
+        """
+        new = []
+        queue = deque([start])
+        while queue:
+            state = queue.popleft()
+            if state in self._actions:
+                continue
+            new.append(state)
+            queue.extend(self._expand(state))
+        states = len(self._actions)
+        cells = states * (self.max_player_hp + 1) * (self.max_opponent_hp + 1)
+        if max_cells is not None and cells > max_cells:
+            for state in new:
+                del self._actions[state]
+            raise TableTooLarge(f"{states} tactical states at {self.max_player_hp}x"
+                                f"{self.max_opponent_hp} health is {cells} positions, more than {max_cells}")
+        for state in new:
+            self.tables[state] = self._terminal_table()
+            self._prefixes.pop(state, None)
+        self._solve()
+
+    def _terminal_table(self) -> np.ndarray:
+        table = np.zeros((2, self.max_player_hp + 1, self.max_opponent_hp + 1))
+        table[0, 1:, 0] = 1.0
+        return table
+
+    def _prefix(self, state: TacticalState) -> np.ndarray:
+        """Get the running sums of a table over player health, for convolving with damage runs."""
+        prefix = self._prefixes.get(state)
+        if prefix is None:
+            table = self.tables[state]
+            prefix = np.zeros((2, table.shape[1] + 1, table.shape[2]))
+            np.cumsum(table, axis=1, out=prefix[:, 1:])
+            self._prefixes[state] = prefix
+        return prefix
+
+    def _action_value(self, pmf: list, outcomes: list) -> np.ndarray:
+        """Get the win probability and expected turns of every position for one action."""
+        rows, columns = self.max_player_hp + 1, self.max_opponent_hp + 1
+        # The opponent's reply, before the player's damage is applied: a sum of
+        # table[p - e] over each run of damage e, taken from the running sums
+        reply = np.zeros((2, rows, columns))
+        for probability, opponent_pmf, successor in outcomes:
+            prefix = self._prefix(successor)
+            for low, high, weight in opponent_pmf:
+                if low < rows:
+                    reply[:, low:] += probability * weight * prefix[:, 1:rows - low + 1]
+                if high < rows:
+                    reply[:, high:] -= probability * weight * prefix[:, :rows - high]
+        reply[0, :, 0] = 1.0
+        reply[1, :, 0] = 0.0
+
+        # The player's damage, summed the same way over opponent health
+        running = np.zeros((2, rows, columns + 1))
+        np.cumsum(reply, axis=2, out=running[:, :, 1:])
+        value = np.zeros((2, rows, columns))
+        hp = np.arange(columns)
+        for low, high, weight in pmf:
+            if low < columns:
+                value[:, :, low:] += weight * running[:, :, 1:columns - low + 1]
+            if high < columns:
+                value[:, :, high:] -= weight * running[:, :, :columns - high]
+            # Blows that take the opponent below zero win outright
+            value[0] += weight * np.clip(high - np.maximum(low, hp + 1) + 1, 0, None)
+        value[1] += 1.0
+        return value
+
+    def _sweep(self) -> float:
+        """Update every table once, returning the largest change."""
+        change = 0.0
+        for state, actions in self._actions.items():
+            values = [(probability, self._action_value(pmf, outcomes))
+                      for _, probability, pmf, outcomes in actions]
+            if not values:
+                continue
+            if self.player_policy == "optimal":
+                new = values[0][1]
+                for _, value in values[1:]:
+                    new = np.where(value[0] > new[0], value, new)
+            else:
+                new = sum(probability * value for probability, value in values)
+            new[:, 0, :] = 0.0
+            new[0, 1:, 0] = 1.0
+            new[1, :, 0] = 0.0
+            change = max(change, float(np.abs(new - self.tables[state]).max()))
+            self.tables[state] = new
+            self._prefixes.pop(state, None)
+        return change
+
+    def _solve(self) -> None:
+        for _ in range(MAX_SWEEPS):
+            self.sweeps += 1
+            if self._sweep() < TOLERANCE:
+                break
+
+    # --- Lookups ---
+
+    def state_of(self, combat: CombatSystem) -> TacticalState:
+        """Read the tactical state of a running fight."""
+        return self.player.state_of(combat.player), self.opponent.state_of(combat.opponent)
+
+    def _lookup(self, layer: int, player_hp: int, opponent_hp: int, state: TacticalState) -> float:
+        if state not in self.tables:
+            self.add_states(state)
+        player_hp = min(max(player_hp, 0), self.max_player_hp)
+        opponent_hp = min(max(opponent_hp, 0), self.max_opponent_hp)
+        value = float(self.tables[state][layer, player_hp, opponent_hp])
+        return min(value, 1.0) if layer == 0 else value
+
+    def win_probability(self, player_hp: int, opponent_hp: int, state: TacticalState) -> float:
+        """Get the chance that the player wins from a position."""
+        return self._lookup(0, player_hp, opponent_hp, state)
+
+    def expected_turns(self, player_hp: int, opponent_hp: int, state: TacticalState) -> float:
+        """Get the expected number of turns left in the fight from a position."""
+        return self._lookup(1, player_hp, opponent_hp, state)
+
+    def action_win_probabilities(self, player_hp: int, opponent_hp: int,
+                                 state: TacticalState) -> Dict[str, float]:
+        """Get the chance of winning after using each ready ability, then playing by the policy."""
+        if state not in self._actions:
+            self.add_states(state)
+        if self.player_policy != "optimal":
+            choices = [(index, 1.0) for index in self.player.ready(state[0])]
+            actions = []
+            for index, _ in choices:
+                after, target = self.player.after_action(state[0], state[1], index)
+                actions.append((index, 1.0, self.player.damage_pmf(index, state[0][2]),
+                                self._opponent_outcomes(after, target)))
+                for outcome in actions[-1][3]:
+                    if outcome[2] not in self.tables:
+                        self.add_states(outcome[2])
+        else:
+            actions = self._actions[state]
+
+        odds = {}
+        for index, _, pmf, outcomes in actions:
+            chance = 0.0
+            for damage, weight in _expand_runs(pmf):
+                if damage >= opponent_hp:
+                    chance += weight
+                    continue
+                for probability, opponent_pmf, successor in outcomes:
+                    for hit, hit_weight in _expand_runs(opponent_pmf):
+                        if hit < player_hp:
+                            chance += weight * probability * hit_weight * self.win_probability(
+                                player_hp - hit, opponent_hp - damage, successor)
+            odds[self.player.names[index]] = chance
+        return odds
+
+    def opponent_hp_for(self, win_chance: float, player_hp: Optional[int] = None,
+                        state: Optional[TacticalState] = None) -> int:
+        """
+        Find the opponent health that gives the player a win chance closest to a target.
+
+        Args:
+        win_chance (float): The target probability, e.g. 0.6 for a fair but winnable fight.
+        player_hp (Optional[int]): The player's health, full health if None.
+        state (Optional[TacticalState]): The tactical state, a fresh fight if None.
+
+        Returns:
+        int: The opponent health, at most the table's cap.
+        """
+        state = state or next(iter(self.tables))
+        row = self.tables[state][0, player_hp or self.max_player_hp, 1:]
+        return int(np.argmin(np.abs(row - win_chance))) + 1
+
+
+# Solved tables by _table_key, least recently used first
+_tables: "OrderedDict[Tuple, WinTable]" = OrderedDict()
+# Background solves by _table_key
+_requests: Dict[Tuple, Future] = {}
+_lock = threading.Lock()
+_worker: Optional[ThreadPoolExecutor] = None
+
+
+def _table_key(combat: CombatSystem, player_policy: Policy, opponent_policy: Policy) -> Tuple:
+    return (_SideSpec(combat.player).key(), _SideSpec(combat.opponent).key(),
+            combat.player.max_health, combat.opponent.max_health, player_policy, opponent_policy)
+
+
+def _start_of(combat: CombatSystem) -> Tuple[_SideSpec, _SideSpec, TacticalState]:
+    """Read what a solve needs from a fight, so the fight can move on while it runs."""
+    player, opponent = _SideSpec(combat.player), _SideSpec(combat.opponent)
+    return player, opponent, (player.state_of(combat.player), opponent.state_of(combat.opponent))
+
+
+def _cached(key: Tuple) -> Optional[WinTable]:
+    with _lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+        return table
+
+
+def _store(key: Tuple, table: WinTable) -> None:
+    with _lock:
+        _tables[key] = table
+        _tables.move_to_end(key)
+        while len(_tables) > TABLE_CACHE_SIZE:
+            _tables.popitem(last=False)
+
+
+def _solve_table(key: Tuple, player: _SideSpec, opponent: _SideSpec, state: TacticalState,
+                 player_policy: Policy, opponent_policy: Policy) -> WinTable:
+    """Solve a new table; it is only cached once it is complete."""
+    table = WinTable(player, opponent, key[2], key[3], player_policy, opponent_policy)
+    table.add_states(state, MAX_TABLE_CELLS)
+    _store(key, table)
+    return table
+
+
+def get_table(combat: CombatSystem, player_policy: Policy = "optimal",
+              opponent_policy: Policy = "random") -> WinTable:
+    """
+    Get the win table for the abilities and health caps of a fight, solving it on this thread if needed.
+
+    Args:
+    combat (CombatSystem): The fight; its abilities, max health and current state are used.
+    player_policy (Policy): "optimal" or a deterministic policy of combat_simulator.
+    opponent_policy (Policy): "random" (as on Easy) or a deterministic policy.
+
+    Returns:
+    WinTable: The table, solved for the fight's current tactical state.
+
+    Raises:
+    TableTooLarge: If the fight has more than MAX_TABLE_CELLS positions.
+    """
+    key = _table_key(combat, player_policy, opponent_policy)
+    table = _cached(key)
+    if table is None:
+        return _solve_table(key, *_start_of(combat), player_policy, opponent_policy)
+    state = table.state_of(combat)
+    if state not in table.tables:
+        table.add_states(state, MAX_TABLE_CELLS)
+    return table
+
+
+def request_table(combat: CombatSystem, player_policy: Policy = "optimal",
+                  opponent_policy: Policy = "random") -> Future:
+    """
+    Solve the win table of a fight on the background worker.
+
+    Returns:
+    Future: Resolves to the WinTable, or raises TableTooLarge.
+    """
+    global _worker
+    key = _table_key(combat, player_policy, opponent_policy)
+    table = _cached(key)
+    if table is not None:
+        future: Future = Future()
+        future.set_result(table)
+        return future
+    with _lock:
+        future = _requests.get(key)
+        if future is None:
+            if _worker is None:
+                _worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="combat-odds")
+            future = _requests[key] = _worker.submit(_solve_table, key, *_start_of(combat),
+                                                     player_policy, opponent_policy)
+            future.add_done_callback(lambda _: _requests.pop(key, None))
+        return future
+
+
+def cached_win_chance(combat: CombatSystem, player_policy: Policy = "optimal") -> Optional[float]:
+    """Get the player's chance of winning from an already solved table, None if there is none."""
+    table = _cached(_table_key(combat, player_policy, "random"))
+    if table is None:
+        return None
+    state = table.state_of(combat)
+    if state not in table.tables:
+        return None
+    return table.win_probability(combat.player.current_health, combat.opponent.current_health, state)
+
+
+def win_chance(combat: CombatSystem, player_policy: Policy = "optimal") -> float:
+    """Get the player's chance of winning a running fight."""
+    table = get_table(combat, player_policy)
+    return table.win_probability(combat.player.current_health, combat.opponent.current_health,
+                                 table.state_of(combat))
+
+
+def action_win_chances(combat: CombatSystem, player_policy: Policy = "optimal") -> Dict[str, float]:
+    """Get the player's chance of winning after each ready ability."""
+    table = get_table(combat, player_policy)
+    return table.action_win_probabilities(combat.player.current_health,
+                                          combat.opponent.current_health, table.state_of(combat))
@@ -0,0 +1,287 @@
+"""
+Combat Replay Module
+==================
+
+Compact binary replays of CombatSystem fights.
+
+Every CombatSystem records its fight as it is played. A replay is a short
+header followed by one fixed-width record per action:
+
+    header   "RPGR", version, flags, seed (u64), length and JSON of the
+             fighters (names, health, ability definitions in id order)
+    record   turn (u16), actor (u8), ability id (u8), roll (u16),
+             player hp (u16), opponent hp (u16) after the action
+             - 10 bytes, little-endian
+
+The actor is 0 for the player and 1 for the opponent; ability id 255
+marks an opponent that lost its action to a stun or had nothing ready, so
+fighters with more than 255 abilities cannot be recorded.
+
+Because the rolls are recorded, load_replay(...).state_at(turn) rebuilds
+the exact state of any turn without depending on the random generator or
+on how the opponent chose (search-based opponents are not reproducible
+otherwise). The seed in the header reproduces a fight end to end when the
+same player actions are played against a deterministic opponent.
+
+read_records() loads the records of many replays into one NumPy array
+for analytics, without decoding them one by one.
+
+The game only saves its fights when the RPG_SAVE_REPLAYS environment
+variable is set, and REPLAY_DIRECTORY keeps the newest KEEP_REPLAYS files.
+
+Usage:
+-----
+```python
+combat = CombatSystem(player, opponent, seed=1234)
+...                                           # Play the fight
+combat.save_replay("replays/duel.rpgr")      # Or save_replay() for a new file in replays/
+
+replay = load_replay("replays/duel.rpgr")
+state = replay.state_at(3)                    # The CombatSystem at the start of turn 3
+records = read_records(glob.glob("replays/*.rpgr"))
+crits = records[records["roll"] >= 38]
+```
+"""
+
+import json
+import os
+import random
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from persistence_writer import atomic_write
+from storage import resolve
+
+MAGIC = b"RPGR"
+VERSION = 1
+
+# Header flags
+FLAG_SEEDED = 1  # The seed in the header drove the fight's random generator
+
+HEADER = struct.Struct("<4sBBQI")
+RECORD = struct.Struct("<HBBHHH")
+RECORD_DTYPE = np.dtype([("turn", "<u2"), ("actor", "u1"), ("ability", "u1"), ("roll", "<u2"),
+                         ("player_hp", "<u2"), ("opponent_hp", "<u2")])
+
+PLAYER, OPPONENT = 0, 1
+NO_ABILITY = 255
+
+# Largest value a record field can hold; larger health is stored capped
+MAX_RECORD_VALUE = 0xFFFF
+
+# Where finished fights are saved, relative to the storage root
+REPLAY_DIRECTORY = "replays"
+
+# Replays kept in REPLAY_DIRECTORY; the oldest are deleted as new ones are saved
+KEEP_REPLAYS = 100
+
+
+def replays_enabled() -> bool:
+    """Check whether the game should save its fights (RPG_SAVE_REPLAYS is set)."""
+    return bool(os.environ.get("RPG_SAVE_REPLAYS"))
+
+
+def _definitions(entity) -> List[Dict[str, Any]]:
+    """Describe an entity's abilities in id order."""
+    return [{"name": ability.name,
+             "damage_range": list(ability.damage_range),
+             "cooldown": ability.cooldown,
+             "special_effects": ability.special_effects,
+             "description": ability.description}
+            for ability in entity.abilities.values()]
+
+
+class ReplayRecorder:
+    """Collects the records of one fight in memory."""
+
+    def __init__(self, combat, seed: Optional[int]):
+        """
+        Start recording a fight.
+
+        Raises:
+        ValueError: If a fighter has too many abilities for a record's ability id.
+        """
+        for entity in (combat.player, combat.opponent):
+            if len(entity.abilities) >= NO_ABILITY:
+                raise ValueError(f"{entity.name} has {len(entity.abilities)} abilities; "
+                                 f"replays record at most {NO_ABILITY - 1}")
+        self.seed = seed
+        self.fighters = {
+            "player": {"name": combat.player.name, "hp": combat.player.max_health,
+                       "abilities": _definitions(combat.player)},
+            "opponent": {"name": combat.opponent.name, "hp": combat.opponent.max_health,
+                         "abilities": _definitions(combat.opponent)},
+        }
+        self._ids = (
+            {name: i for i, name in enumerate(combat.player.abilities)},
+            {name: i for i, name in enumerate(combat.opponent.abilities)},
+        )
+        self.records = bytearray()
+
+    def record(self, turn: int, actor: int, ability: Optional[str], roll: int,
+               player_hp: int, opponent_hp: int) -> None:
+        """Append the record of one action."""
+        ability_id = NO_ABILITY if ability is None else self._ids[actor][ability]
+        self.records += RECORD.pack(min(turn, MAX_RECORD_VALUE), actor, ability_id, roll,
+                                    min(player_hp, MAX_RECORD_VALUE),
+                                    min(opponent_hp, MAX_RECORD_VALUE))
+
+    def __len__(self) -> int:
+        return len(self.records) // RECORD.size
+
+    def to_bytes(self) -> bytes:
+        """Encode the replay: header, fighters and records."""
+        meta = json.dumps(self.fighters, separators=(",", ":")).encode("utf-8")
+        flags = FLAG_SEEDED if self.seed is not None else 0
+        return HEADER.pack(MAGIC, VERSION, flags, self.seed or 0, len(meta)) + meta + bytes(self.records)
+
+    def save(self, path: Optional[str] = None) -> str:
+        """
+        Write the replay to a file and return its path.
+
+        Without a path the replay goes to a new file in REPLAY_DIRECTORY, and
+        all but the newest KEEP_REPLAYS replays there are deleted.
+        """
+        if path is not None:
+            atomic_write(path, self.to_bytes())
+            return path
+        directory = resolve(REPLAY_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.seed or 0}.rpgr")
+        atomic_write(path, self.to_bytes())
+        # Names start with the time they were saved, so they sort oldest first
+        saved = sorted(name for name in os.listdir(directory) if name.endswith(".rpgr"))
+        for name in saved[:max(len(saved) - KEEP_REPLAYS, 0)]:
+            os.remove(os.path.join(directory, name))
+        return path
+
+
+class _ScriptedRandom(random.Random):
+    """A random generator that plays back recorded rolls."""
+
+    def __init__(self, rolls: Iterable[int]):
+        super().__init__(0)
+        self._rolls = iter(rolls)
+
+    def randint(self, a: int, b: int) -> int:
+        return next(self._rolls)
+
+
+class Replay:
+    def __init__(self, version: int, flags: int, seed: int, fighters: Dict[str, Any], records: np.ndarray):
+        self.version = version
+        self.seed = seed if flags & FLAG_SEEDED else None
+        self.fighters = fighters
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def turns(self) -> int:
+        """Number of turns played."""
+        return int(self.records["turn"].max()) if len(self.records) else 0
+
+    def ability_name(self, actor: int, ability_id: int) -> Optional[str]:
+        if ability_id == NO_ABILITY:
+            return None
+        side = "player" if actor == PLAYER else "opponent"
+        return self.fighters[side]["abilities"][ability_id]["name"]
+
+    def new_combat(self, rng: Optional[random.Random] = None, opponent_policy=None):
+        """Set up the fight as it started."""
+        from combat_system import CombatSystem
+        player, opponent = self.fighters["player"], self.fighters["opponent"]
+        return CombatSystem(
+            {"name": player["name"]},
+            {"name": opponent["name"], "hp": opponent["hp"],
+             "abilities": {a["name"]: a for a in opponent["abilities"]}},
+            rng=rng,
+            player_abilities={a["name"]: a for a in player["abilities"]},
+            player_hp=player["hp"],
+            opponent_policy=opponent_policy)
+
+    def state_at(self, turn: int):
+        """
+        Rebuild the fight at the start of a turn by playing the recorded actions.
+
+        Args:
+        turn (int): The turn, from 1 to turns + 1 (the end of the fight).
+
+        Returns:
+        CombatSystem: The fight in that state. Playing on from there uses a
+            fresh generator seeded with the replay's seed.
+        """
+        played = self.records[self.records["turn"] < turn]
+        rolls = (int(record["roll"]) for record in played if record["ability"] != NO_ABILITY)
+        # Stunned opponents are never asked for a move, so moves are looked up by turn
+        opponent_moves = {int(record["turn"]): self.ability_name(OPPONENT, record["ability"])
+                          for record in played[played["actor"] == OPPONENT]}
+        combat = self.new_combat(
+            rng=_ScriptedRandom(rolls),
+            opponent_policy=lambda combat, *_: opponent_moves.get(combat.turn_number))
+
+        for record in played[played["actor"] == PLAYER]:
+            combat.execute_turn(self.ability_name(PLAYER, record["ability"]))
+            last = played[played["turn"] == record["turn"]][-1]
+            health = (min(combat.player.current_health, MAX_RECORD_VALUE),
+                      min(combat.opponent.current_health, MAX_RECORD_VALUE))
+            if health != (last["player_hp"], last["opponent_hp"]):
+                raise ValueError(f"Replay diverged at turn {record['turn']}")
+
+        from combat_system import random_policy
+        combat.rng = random.Random(self.seed)
+        combat.opponent_policy = random_policy
+        return combat
+
+    def final_state(self):
+        """Rebuild the fight as it ended."""
+        return self.state_at(self.turns + 1)
+
+
+def decode_replay(data: bytes) -> Replay:
+    """Decode a replay from bytes."""
+    magic, version, flags, seed, meta_length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a combat replay")
+    if version > VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    start = HEADER.size + meta_length
+    fighters = json.loads(data[HEADER.size:start].decode("utf-8"))
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, offset=start)
+    return Replay(version, flags, seed, fighters, records)
+
+
+def load_replay(path: str) -> Replay:
+    """Load a replay file."""
+    with open(path, "rb") as f:
+        return decode_replay(f.read())
+
+
+def read_records(paths: Iterable[str]) -> np.ndarray:
+    """
+    Load the records of many replays into one array for analytics.
+
+    Args:
+    paths (Iterable[str]): Replay files.
+
+    Returns:
+    np.ndarray: Structured array with the record fields plus "fight", the
+        position of the replay in paths.
+    """
+    dtype = np.dtype([("fight", "<u4")] + RECORD_DTYPE.descr)
+    chunks = []
+    for fight, path in enumerate(paths):
+        with open(path, "rb") as f:
+            data = f.read()
+        _, _, _, _, meta_length = HEADER.unpack_from(data, 0)
+        records = np.frombuffer(data, dtype=RECORD_DTYPE, offset=HEADER.size + meta_length)
+        chunk = np.empty(len(records), dtype=dtype)
+        chunk["fight"] = fight
+        for name in RECORD_DTYPE.names:
+            chunk[name] = records[name]
+        chunks.append(chunk)
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
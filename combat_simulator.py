@@ -0,0 +1,322 @@
+"""
+Combat Simulator Module
+=====================
+
+Headless Monte Carlo simulation of CombatSystem fights for balancing.
+
+Runs many complete fights between a player loadout and an opponent
+definition (the same "hp"/"abilities" dictionaries CombatEvent passes to
+CombatSystem) without any prose, and summarises win rate, fight length and
+damage. Both sides pick their abilities through action policies:
+
+- random:   a random ready ability (how opponents play in the game)
+- greedy:   the ready ability with the highest expected damage
+- tactical: buff when no buff is active, stun when the target can act,
+            otherwise greedy
+
+A policy can also be any function (combat, actor, target, rng) -> ability
+name; pass a module-level function when using several processes.
+
+Fight i of a run is seeded from (seed, i), so a run gives the same results
+however many processes it is spread over, and any single fight can be
+replayed with simulate_fight.
+
+Usage:
+-----
+```python
+loadout = {"hp": 300, "abilities": {"Sword Strike": {"damage_range": (20, 40)}}}
+dragon = {"name": "Dragon", "hp": 400, "abilities": {"Claw": {"damage_range": (15, 30)}}}
+report = run_simulation(loadout, dragon, fights=10000, player_policy="tactical", seed=7)
+print(report.summary())
+```
+
+Or from the command line:
+    python combat_simulator.py [fights] [player_policy] [processes]
+"""
+
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from combat_system import CombatEntity, CombatSystem, random_policy
+
+# Fights longer than this end in a draw
+DEFAULT_MAX_TURNS = 200
+
+# Fights handed to a worker process at a time
+DEFAULT_CHUNK_SIZE = 250
+
+
+def expected_damage(actor: CombatEntity, name: str) -> float:
+    """Get the mean damage of an ability, including the actor's buffs."""
+    low, high = actor.abilities[name].damage_range
+    return (low + high) / 2 * actor.damage_multiplier()
+
+
+def greedy_policy(combat: CombatSystem, actor: CombatEntity, target: CombatEntity,
+                  rng: random.Random) -> Optional[str]:
+    """Use the ready ability with the highest expected damage."""
+    ready = actor.ready_abilities()
+    return max(ready, key=lambda name: expected_damage(actor, name)) if ready else None
+
+
+def tactical_policy(combat: CombatSystem, actor: CombatEntity, target: CombatEntity,
+                    rng: random.Random) -> Optional[str]:
+    """Buff when unbuffed, stun when the target can act, otherwise hit hardest."""
+    ready = actor.ready_abilities()
+    if not actor.buffs:
+        for name in ready:
+            if "buff" in actor.abilities[name].special_effects:
+                return name
+    if "stun" not in target.status_effects:
+        stuns = [name for name in ready if "stun" in actor.abilities[name].special_effects]
+        if stuns:
+            return max(stuns, key=lambda name: expected_damage(actor, name))
+    return greedy_policy(combat, actor, target, rng)
+
+
+POLICIES: Dict[str, Callable] = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "tactical": tactical_policy,
+}
+
+Policy = Union[str, Callable]
+
+
+def get_policy(policy: Policy) -> Callable:
+    """Look up a policy by name, passing functions through."""
+    if callable(policy):
+        return policy
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
+    return POLICIES[policy]
+
+
+def fight_seed(seed: int, index: int) -> int:
+    """Get the seed of fight index in a run seeded with seed."""
+    return (seed << 32) + index
+
+
+@dataclass
+class FightResult:
+    winner: str  # "player", "opponent" or "draw"
+    turns: int
+    damage_dealt: int
+    damage_taken: int
+    player_hp: int
+    ability_uses: Dict[str, int] = field(default_factory=dict)
+
+
+def simulate_fight(loadout: Dict[str, Any], opponent: Dict[str, Any],
+                   player_policy: Policy = "greedy", opponent_policy: Policy = "random",
+                   seed: Optional[int] = None, max_turns: int = DEFAULT_MAX_TURNS) -> FightResult:
+    """
+    Play one fight to the end.
+
+    Args:
+    loadout (Dict[str, Any]): The player's "hp" and "abilities" (defaults if missing).
+    opponent (Dict[str, Any]): The opponent's "name", "hp" and "abilities".
+    player_policy (Policy): How the player picks abilities.
+    opponent_policy (Policy): How the opponent picks abilities.
+    seed (Optional[int]): Seed of the fight's random stream.
+    max_turns (int): Turns after which the fight is a draw.
+
+    Returns:
+    FightResult: The outcome of the fight.
+    """
+    rng = random.Random(seed)
+    combat = CombatSystem({"name": loadout.get("name", "Player")},
+                          dict(opponent, name=opponent.get("name", "Opponent")),
+                          rng=rng,
+                          player_abilities=loadout.get("abilities"),
+                          player_hp=loadout.get("hp"),
+                          opponent_policy=get_policy(opponent_policy))
+    choose = get_policy(player_policy)
+    player, enemy = combat.player, combat.opponent
+
+    uses: Counter = Counter()
+    dealt = taken = 0
+    while not combat.is_combat_finished() and combat.turn_number <= max_turns:
+        action = choose(combat, player, enemy, rng)
+        if action is None:
+            break
+        turn = combat.execute_turn(action)
+        uses[action] += 1
+        dealt += turn["player_damage"]
+        taken += turn["opponent_damage"]
+
+    if not enemy.is_alive():
+        winner = "player"
+    elif not player.is_alive():
+        winner = "opponent"
+    else:
+        winner = "draw"
+    return FightResult(winner, combat.turn_number - 1, dealt, taken, player.current_health, dict(uses))
+
+
+@dataclass
+class SimulationReport:
+    fights: int
+    wins: int
+    losses: int
+    draws: int
+    turn_counts: Counter
+    damage_dealt: List[int]
+    damage_taken: List[int]
+    player_hp_on_win: List[int]
+    ability_uses: Counter
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.fights if self.fights else 0.0
+
+    def turn_percentile(self, fraction: float) -> int:
+        """Get the fight length that the given fraction of fights do not exceed."""
+        target = fraction * self.fights
+        seen = 0
+        for turns in sorted(self.turn_counts):
+            seen += self.turn_counts[turns]
+            if seen >= target:
+                return turns
+        return 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarise the report as plain numbers."""
+        def spread(values: List[int]) -> Dict[str, float]:
+            if not values:
+                return {"mean": 0.0, "stdev": 0.0, "min": 0, "max": 0}
+            return {"mean": statistics.fmean(values),
+                    "stdev": statistics.pstdev(values),
+                    "min": min(values), "max": max(values)}
+
+        total_turns = sum(turns * count for turns, count in self.turn_counts.items())
+        total_uses = sum(self.ability_uses.values())
+        return {
+            "fights": self.fights,
+            "win_rate": self.win_rate,
+            "wins": self.wins,
+            "losses": self.losses,
+            "draws": self.draws,
+            "turns": {
+                "mean": total_turns / self.fights if self.fights else 0.0,
+                "p10": self.turn_percentile(0.1),
+                "median": self.turn_percentile(0.5),
+                "p90": self.turn_percentile(0.9),
+                "histogram": dict(sorted(self.turn_counts.items())),
+            },
+            "damage_dealt": spread(self.damage_dealt),
+            "damage_taken": spread(self.damage_taken),
+            "player_hp_on_win": spread(self.player_hp_on_win),
+            "ability_share": {name: count / total_uses for name, count in self.ability_uses.most_common()},
+        }
+
+    def summary(self) -> str:
+        """Format the report for the console."""
+        data = self.to_dict()
+        turns = data["turns"]
+        lines = [
+            f"Fights: {self.fights}  Win rate: {self.win_rate:.1%}  "
+            f"(W {self.wins} / L {self.losses} / D {self.draws})",
+            f"Turns: mean {turns['mean']:.1f}, p10 {turns['p10']}, median {turns['median']}, p90 {turns['p90']}",
+        ]
+        for key, label in (("damage_dealt", "Damage dealt"), ("damage_taken", "Damage taken"),
+                           ("player_hp_on_win", "HP left on win")):
+            stats = data[key]
+            lines.append(f"{label}: mean {stats['mean']:.1f} ± {stats['stdev']:.1f} "
+                         f"(min {stats['min']}, max {stats['max']})")
+        lines.append("Ability use: " + ", ".join(f"{name} {share:.0%}"
+                                                 for name, share in data["ability_share"].items()))
+        return "\n".join(lines)
+
+
+def _run_chunk(args: Tuple) -> List[Tuple]:
+    """Play a range of fights, returning compact results (runs in worker processes)."""
+    loadout, opponent, player_policy, opponent_policy, seed, start, count, max_turns = args
+    results = []
+    for index in range(start, start + count):
+        result = simulate_fight(loadout, opponent, player_policy, opponent_policy,
+                                fight_seed(seed, index), max_turns)
+        results.append((result.winner, result.turns, result.damage_dealt, result.damage_taken,
+                        result.player_hp, result.ability_uses))
+    return results
+
+
+def run_simulation(loadout: Dict[str, Any], opponent: Dict[str, Any], fights: int = 1000,
+                   player_policy: Policy = "greedy", opponent_policy: Policy = "random",
+                   seed: int = 0, processes: Optional[int] = None,
+                   max_turns: int = DEFAULT_MAX_TURNS,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> SimulationReport:
+    """
+    Play many fights and aggregate the results.
+
+    Args:
+    loadout (Dict[str, Any]): The player's "hp" and "abilities".
+    opponent (Dict[str, Any]): The opponent's "name", "hp" and "abilities".
+    fights (int): Number of fights to play.
+    player_policy (Policy): Policy name or module-level function for the player.
+    opponent_policy (Policy): Policy name or module-level function for the opponent.
+    seed (int): Seed of the run; fight i is seeded with fight_seed(seed, i).
+    processes (Optional[int]): Worker processes, the CPU count if None; 1 plays in this process.
+    max_turns (int): Turns after which a fight is a draw.
+    chunk_size (int): Fights sent to a worker at a time.
+
+    Returns:
+    SimulationReport: The aggregated results.
+    """
+    tasks = [(loadout, opponent, player_policy, opponent_policy, seed, start,
+              min(chunk_size, fights - start), max_turns)
+             for start in range(0, fights, chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    processes = min(processes, len(tasks))
+
+    if processes <= 1:
+        chunks = map(_run_chunk, tasks)
+        return _aggregate(fights, chunks)
+    with multiprocessing.Pool(processes) as pool:
+        return _aggregate(fights, pool.imap(_run_chunk, tasks))
+
+
+def _aggregate(fights: int, chunks) -> SimulationReport:
+    report = SimulationReport(fights, 0, 0, 0, Counter(), [], [], [], Counter())
+    for chunk in chunks:
+        for winner, turns, dealt, taken, player_hp, uses in chunk:
+            if winner == "player":
+                report.wins += 1
+                report.player_hp_on_win.append(player_hp)
+            elif winner == "opponent":
+                report.losses += 1
+            else:
+                report.draws += 1
+            report.turn_counts[turns] += 1
+            report.damage_dealt.append(dealt)
+            report.damage_taken.append(taken)
+            report.ability_uses.update(uses)
+    return report
+
+
+def main():
+    fights = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    player_policy = sys.argv[2] if len(sys.argv) > 2 else "tactical"
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    opponent = {
+        "name": "Pirate Captain",
+        "hp": 250,
+        "abilities": {
+            "Cutlass Slash": "A quick slash",
+            "Pistol Shot": {"damage_range": (25, 40), "cooldown": 2, "description": "A point-blank shot"},
+        },
+    }
+    report = run_simulation({}, opponent, fights, player_policy, seed=1, processes=processes)
+    print(f"Default loadout ({player_policy}) vs {opponent['name']}")
+    print(report.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""
+Combat Sweep Module
+=================
+
+Parallel parameter sweeps for ability and opponent balance.
+
+A sweep evaluates many variations of one fight. Parameters are dotted paths
+into the player loadout and the opponent definition:
+
+    player.hp
+    player.abilities.Sword Strike.damage_range
+    player.abilities.Shield Bash.cooldown
+    opponent.hp
+    opponent.abilities.Smash.damage_range
+
+grid() walks every combination of the listed values; random_search()
+draws samples, picking from lists and uniformly from (low, high) integer
+ranges. Every configuration is simulated headlessly (combat_simulator, or
+vector_combat with engine="vector") in a multiprocessing pool, and each
+result row is appended to the results table (JSONL, or CSV if the path
+ends in .csv) as soon as it finishes.
+
+Each row records the setup it was simulated under: a hash of the base
+loadout and opponent (defaults filled in), the number of fights, the seed,
+the engine and both policies. A configuration is identified by a hash of
+its parameters and that setup. Rerunning a sweep skips the configurations
+already in the table, so an interrupted sweep resumes where it stopped.
+Rows simulated under a different setup are neither skipped nor ranked, so
+several sweeps can share one table.
+
+All configurations are simulated with the same seed, so they are compared
+on the same sequence of fights.
+
+Usage:
+-----
+```python
+space = {"opponent.hp": [250, 300, 350, 400],
+         "player.abilities.Sword Strike.damage_range": [(15, 35), (20, 40), (25, 45)]}
+rows = run_sweep(grid(space), {}, opponent, "sweep.jsonl", fights=5000)
+print_summary(rows, band=(0.55, 0.70))
+```
+
+Or from the command line, sweeping the default loadout against a sample opponent:
+    python combat_sweep.py [results_path] [fights] [processes]
+"""
+
+import copy
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import journal
+from combat_simulator import run_simulation
+from combat_system import DEFAULT_PLAYER_ABILITIES
+
+# Win rates a balanced fight should land in
+DEFAULT_BAND = (0.55, 0.70)
+
+CSV_FIELDS = ["id", "setup", "win_rate", "wins", "losses", "draws", "mean_turns", "p90_turns",
+              "damage_dealt_mean", "damage_taken_mean", "seconds", "params"]
+
+
+# --- Configurations ---
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=list).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def setup_id(loadout: Dict[str, Any], opponent: Dict[str, Any], fights: int, seed: int,
+             engine: str, player_policy: str, opponent_policy: str) -> str:
+    """Get the stable identifier of the base fight and run settings of a sweep."""
+    loadout, opponent = apply_params(loadout, opponent, {})
+    return _digest({"loadout": loadout, "opponent": opponent, "fights": fights, "seed": seed,
+                    "engine": engine, "player_policy": player_policy,
+                    "opponent_policy": opponent_policy})
+
+
+def config_id(params: Dict[str, Any], setup: str = "") -> str:
+    """Get the stable identifier of a configuration under a setup (see setup_id)."""
+    return _digest({"params": params, "setup": setup})
+
+
+def grid(space: Dict[str, List[Any]]) -> Iterator[Dict[str, Any]]:
+    """Yield every combination of the listed parameter values."""
+    paths = list(space)
+    for values in itertools.product(*(space[path] for path in paths)):
+        yield dict(zip(paths, values))
+
+
+def random_search(space: Dict[str, Any], samples: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield random configurations.
+
+    Args:
+    space (Dict[str, Any]): Path -> list of values to pick from, or (low, high) integer range.
+    samples (int): Number of configurations.
+    seed (int): Seed of the sampling.
+    """
+    rng = random.Random(seed)
+    for _ in range(samples):
+        params = {}
+        for path, values in space.items():
+            if isinstance(values, tuple) and len(values) == 2 and all(isinstance(v, int) for v in values):
+                params[path] = rng.randint(*values)
+            else:
+                params[path] = rng.choice(list(values))
+        yield params
+
+
+def apply_params(loadout: Dict[str, Any], opponent: Dict[str, Any],
+                 params: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Apply a configuration to copies of a loadout and an opponent.
+
+    Returns:
+    Tuple[Dict[str, Any], Dict[str, Any]]: The changed loadout and opponent.
+    """
+    loadout = copy.deepcopy(loadout)
+    opponent = copy.deepcopy(opponent)
+    loadout.setdefault("abilities", copy.deepcopy(DEFAULT_PLAYER_ABILITIES))
+    for document in (loadout, opponent):
+        abilities = document.get("abilities", {})
+        for name, definition in abilities.items():
+            if not isinstance(definition, dict):
+                abilities[name] = {"description": definition}
+
+    for path, value in params.items():
+        side, *keys = path.split(".")
+        if side not in ("player", "opponent") or not keys:
+            raise ValueError(f"Parameter paths start with player. or opponent.: {path}")
+        target = loadout if side == "player" else opponent
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = tuple(value) if isinstance(value, list) else value
+    return loadout, opponent
+
+
+# --- Evaluation ---
+
+def _evaluate(task: Tuple) -> Dict[str, Any]:
+    """Simulate one configuration (runs in worker processes)."""
+    params, setup, loadout, opponent, fights, seed, engine, player_policy, opponent_policy = task
+    start = time.perf_counter()
+    loadout, opponent = apply_params(loadout, opponent, params)
+    if engine == "vector":
+        from vector_combat import simulate_batch
+        report = simulate_batch(loadout, opponent, fights, player_policy, opponent_policy, seed=seed)
+    else:
+        report = run_simulation(loadout, opponent, fights, player_policy, opponent_policy,
+                                seed=seed, processes=1)
+    summary = report.to_dict()
+    return {
+        "id": config_id(params, setup),
+        "setup": setup,
+        "win_rate": summary["win_rate"],
+        "wins": summary["wins"],
+        "losses": summary["losses"],
+        "draws": summary["draws"],
+        "mean_turns": summary["turns"]["mean"],
+        "p90_turns": summary["turns"]["p90"],
+        "damage_dealt_mean": summary["damage_dealt"]["mean"],
+        "damage_taken_mean": summary["damage_taken"]["mean"],
+        "seconds": time.perf_counter() - start,
+        "params": params,
+    }
+
+
+# --- Results table ---
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    """Read the rows of a results table, JSONL or CSV."""
+    if not os.path.exists(path):
+        return []
+    if not path.endswith(".csv"):
+        return list(journal.iter_entries(path))
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                row["params"] = json.loads(row["params"])
+                for field in CSV_FIELDS[2:-1]:
+                    row[field] = float(row[field])
+            except (KeyError, TypeError, ValueError):
+                continue  # A row cut short by an interrupted run
+            rows.append(row)
+    return rows
+
+
+class _ResultsWriter:
+    """Appends result rows to a table as they arrive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.csv = path.endswith(".csv")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if not self.csv:
+            journal.append_entry(self.path, row)
+            return
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if new:
+                writer.writeheader()
+            writer.writerow(dict(row, params=json.dumps(row["params"], default=list)))
+
+
+def run_sweep(configs: Iterable[Dict[str, Any]], loadout: Dict[str, Any], opponent: Dict[str, Any],
+              results_path: str, fights: int = 2000, processes: Optional[int] = None,
+              seed: int = 0, engine: str = "scalar", player_policy: str = "tactical",
+              opponent_policy: str = "random", progress: bool = True) -> List[Dict[str, Any]]:
+    """
+    Simulate every configuration not yet in the results table.
+
+    Args:
+    configs (Iterable[Dict[str, Any]]): Configurations, from grid() or random_search().
+    loadout (Dict[str, Any]): The base player loadout ("hp", "abilities"); defaults if empty.
+    opponent (Dict[str, Any]): The base opponent ("name", "hp", "abilities").
+    results_path (str): The results table; rows are appended as they finish.
+    fights (int): Fights per configuration.
+    processes (Optional[int]): Worker processes, the CPU count if None.
+    seed (int): Seed shared by all configurations.
+    engine (str): "scalar" (combat_simulator) or "vector" (vector_combat).
+    player_policy (str): Policy name for the player.
+    opponent_policy (str): Policy name for the opponent.
+    progress (bool): Print a line per finished configuration.
+
+    Returns:
+    List[Dict[str, Any]]: Every row of the table with this setup, earlier runs included.
+    """
+    setup = setup_id(loadout, opponent, fights, seed, engine, player_policy, opponent_policy)
+    rows = [row for row in load_results(results_path) if row.get("setup") == setup]
+    done = {row["id"] for row in rows}
+    tasks = []
+    for params in configs:
+        key = config_id(params, setup)
+        if key not in done:
+            done.add(key)
+            tasks.append((params, setup, loadout, opponent, fights, seed, engine,
+                          player_policy, opponent_policy))
+    if progress and rows:
+        print(f"Resuming: {len(rows)} configurations done, {len(tasks)} to go")
+
+    writer = _ResultsWriter(results_path)
+    processes = min(processes or os.cpu_count() or 1, max(len(tasks), 1))
+    if processes <= 1:
+        results = map(_evaluate, tasks)
+        _collect(results, rows, writer, len(tasks), progress)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            _collect(pool.imap_unordered(_evaluate, tasks), rows, writer, len(tasks), progress)
+    return rows
+
+
+def _collect(results, rows: List[Dict[str, Any]], writer: _ResultsWriter, total: int, progress: bool) -> None:
+    for finished, row in enumerate(results, 1):
+        row["params"] = json.loads(json.dumps(row["params"]))  # As it reads back from the table
+        writer.write(row)
+        rows.append(row)
+        if progress:
+            print(f"[{finished}/{total}] {row['id']} win rate {row['win_rate']:.1%} "
+                  f"{_format_params(row['params'])}")
+
+
+# --- Summary ---
+
+def rank(rows: List[Dict[str, Any]], band: Tuple[float, float] = DEFAULT_BAND) -> List[Dict[str, Any]]:
+    """Keep the configurations whose win rate is in the band, closest to its middle first."""
+    low, high = band
+    middle = (low + high) / 2
+    matching = [row for row in rows if low <= row["win_rate"] <= high]
+    return sorted(matching, key=lambda row: (abs(row["win_rate"] - middle), row["mean_turns"]))
+
+
+def _format_params(params: Dict[str, Any]) -> str:
+    return ", ".join(f"{path}={tuple(value) if isinstance(value, list) else value}"
+                     for path, value in sorted(params.items()))
+
+
+def print_summary(rows: List[Dict[str, Any]], band: Tuple[float, float] = DEFAULT_BAND,
+                  limit: int = 10) -> None:
+    """Print the best configurations in the win-rate band."""
+    ranked = rank(rows, band)
+    print(f"\n{len(ranked)} of {len(rows)} configurations win {band[0]:.0%}-{band[1]:.0%} of fights")
+    print(f"{'#':>3} {'win rate':>9} {'turns':>6} {'taken':>7}  parameters")
+    for position, row in enumerate(ranked[:limit], 1):
+        print(f"{position:>3} {row['win_rate']:>9.1%} {row['mean_turns']:>6.1f} "
+              f"{row['damage_taken_mean']:>7.1f}  {_format_params(row['params'])}")
+
+
+def main():
+    results_path = sys.argv[1] if len(sys.argv) > 1 else "sweep_results.jsonl"
+    fights = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    opponent = {"name": "Pirate Captain", "hp": 300, "abilities": {
+        "Cutlass Slash": {"damage_range": (15, 25)},
+        "Pistol Shot": {"damage_range": (25, 40), "cooldown": 2},
+    }}
+    space = {
+        "opponent.hp": [300, 350, 400, 450, 500],
+        "opponent.abilities.Pistol Shot.cooldown": [1, 2, 3],
+        "player.abilities.Sword Strike.damage_range": [(15, 35), (20, 40), (25, 45)],
+    }
+    rows = run_sweep(grid(space), {}, opponent, results_path, fights, processes)
+    print_summary(rows)
+
+
+if __name__ == '__main__':
+    main()
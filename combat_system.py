@@ -1,18 +1,202 @@
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional
+import heapq
+import itertools
 import random
 import json
 import requests
 
+from combat_replay import OPPONENT, PLAYER, ReplayRecorder
+
+# Player loadout used when none is given. Cooldowns, stuns and buffs are only
+# in play for loadouts and opponents that define them
+DEFAULT_PLAYER_HP = 300
+DEFAULT_PLAYER_ABILITIES = {
+    "Sword Strike": {"damage_range": (20, 40), "description": "A powerful sword attack"},
+    "Shield Bash": {"damage_range": (10, 20), "description": "A stunning shield attack"},
+    "War Cry": {"damage_range": (0, 0), "description": "Boost damage for 2 turns"},
+}
+
+# Opponent defaults; opponent abilities given as descriptions only use the default damage
+DEFAULT_OPPONENT_HP = 100
+DEFAULT_OPPONENT_DAMAGE = (15, 25)
+
+class _Clock:
+    """A turn counter shared by the timers of one entity."""
+    __slots__ = ("now",)
+
+    def __init__(self):
+        self.now = 0
+
+
+class _Countdown:
+    """
+    An ability's current_cooldown, kept as the turn it is ready again.
+
+    Once the ability belongs to an entity, the remaining cooldown is that
+    turn minus the entity's cooldown clock, so update_cooldowns only has to
+    advance the clock instead of touching every ability.
+    """
+
+    def __set_name__(self, owner, name):
+        self.attribute = f"_{name}"
+
+    def __get__(self, ability, owner=None) -> int:
+        if ability is None:
+            return 0  # Default value for the dataclass field
+        value = ability.__dict__[self.attribute]
+        clock = ability.__dict__.get("_clock")
+        return max(value - clock.now, 0) if clock is not None else value
+
+    def __set__(self, ability, turns: int) -> None:
+        clock = ability.__dict__.get("_clock")
+        ability.__dict__[self.attribute] = turns + clock.now if clock is not None else turns
+
+
 @dataclass
 class Ability:
     name: str
     damage_range: tuple[int, int]
     cooldown: int = 0
-    current_cooldown: int = 0
+    current_cooldown: int = _Countdown()
     special_effects: Dict[str, any] = field(default_factory=dict)
     description: str = ""
 
+    def _bind(self, clock: Optional[_Clock]) -> None:
+        """Count the cooldown against an entity's clock (or none)."""
+        remaining = self.current_cooldown
+        self.__dict__["_clock"] = clock
+        self.current_cooldown = remaining
+
+
+class _AbilityTable(dict):
+    """The abilities of an entity, bound to its cooldown clock as they are added."""
+
+    def __init__(self, clock: _Clock, abilities: Dict[str, Ability]):
+        super().__init__()
+        self.clock = clock
+        self.update(abilities)
+
+    def __setitem__(self, name: str, ability: Ability) -> None:
+        ability._bind(self.clock)
+        super().__setitem__(name, ability)
+
+    def update(self, *args, **kwargs) -> None:
+        for name, ability in dict(*args, **kwargs).items():
+            self[name] = ability
+
+
+class _Timers(MutableMapping):
+    """
+    Timed entries of an entity (status effects or buffs), kept as expiry turns.
+
+    Every entry is also pushed on the entity's expiry heap; expire() pops
+    only what is due, and entries replaced or removed earlier are skipped
+    when their stale heap items come up.
+    """
+
+    def __init__(self, clock: _Clock, heap: list, counter):
+        self.clock = clock
+        self.heap = heap
+        self.counter = counter
+        self.expiry: Dict[str, int] = {}
+
+    def _schedule(self, key: str, duration: int) -> None:
+        turn = self.clock.now + duration
+        self.expiry[key] = turn
+        heapq.heappush(self.heap, (turn, next(self.counter), self, key))
+
+    def __delitem__(self, key: str) -> None:
+        del self.expiry[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.expiry)
+
+    def __len__(self) -> int:
+        return len(self.expiry)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.expiry
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def remaining(self, key: str) -> int:
+        return self.expiry[key] - self.clock.now
+
+
+class _StatusEffects(_Timers):
+    """Effect name -> remaining turns."""
+
+    def __getitem__(self, effect: str) -> int:
+        return self.remaining(effect)
+
+    def __setitem__(self, effect: str, duration: int) -> None:
+        self._schedule(effect, duration)
+
+
+class _BuffEntry(MutableMapping):
+    """
+    A live {"effect": ..., "duration": remaining turns} view of one buff.
+
+    Reads and writes go to the buff itself: setting "duration" reschedules
+    its expiry and any other key changes the stored entry.
+    """
+
+    def __init__(self, buffs: '_Buffs', name: str):
+        self.buffs = buffs
+        self.name = name
+
+    def __getitem__(self, key: str) -> any:
+        if key == "duration":
+            return self.buffs.remaining(self.name)
+        return self.buffs.entries[self.name][key]
+
+    def __setitem__(self, key: str, value: any) -> None:
+        if key == "duration":
+            self.buffs._schedule(self.name, value)
+        else:
+            self.buffs.entries[self.name][key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in ("duration", "effect"):
+            raise KeyError(f"A buff's {key} cannot be removed")
+        del self.buffs.entries[self.name][key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield "duration"
+        yield from self.buffs.entries[self.name]
+
+    def __len__(self) -> int:
+        return len(self.buffs.entries[self.name]) + 1
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class _Buffs(_Timers):
+    """Buff name -> {"effect": ..., "duration": remaining turns}, as live views."""
+
+    def __init__(self, clock: _Clock, heap: list, counter):
+        super().__init__(clock, heap, counter)
+        # Buff name -> its entry without the duration
+        self.entries: Dict[str, Dict[str, any]] = {}
+
+    def __getitem__(self, name: str) -> _BuffEntry:
+        if name not in self.expiry:
+            raise KeyError(name)
+        return _BuffEntry(self, name)
+
+    def __setitem__(self, name: str, data: Dict[str, any]) -> None:
+        self.entries[name] = {key: value for key, value in data.items() if key != "duration"}
+        self._schedule(name, data["duration"])
+
+    def __delitem__(self, name: str) -> None:
+        super().__delitem__(name)
+        del self.entries[name]
+
+
 @dataclass
 class CombatEntity:
     name: str
@@ -21,6 +205,21 @@ class CombatEntity:
     abilities: Dict[str, Ability]
     status_effects: Dict[str, int] = field(default_factory=dict)
     buffs: Dict[str, Dict[str, any]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # Cooldowns and effects count down against clocks instead of being
+        # decremented one by one; effects are removed from a heap keyed on
+        # the turn they expire
+        self._cooldown_clock = _Clock()
+        self._effect_clock = _Clock()
+        self._expiry_heap: list = []
+        counter = itertools.count()
+        self.abilities = _AbilityTable(self._cooldown_clock, self.abilities)
+        status_effects, buffs = self.status_effects, self.buffs
+        self.status_effects = _StatusEffects(self._effect_clock, self._expiry_heap, counter)
+        self.status_effects.update(status_effects)
+        self.buffs = _Buffs(self._effect_clock, self._expiry_heap, counter)
+        self.buffs.update(buffs)
     
     def is_alive(self) -> bool:
         return self.current_health > 0
@@ -38,58 +237,113 @@ class CombatEntity:
         self.buffs[buff_name] = {"effect": effect, "duration": duration}
     
     def update_cooldowns(self):
-        for ability in self.abilities.values():
-            if ability.current_cooldown > 0:
-                ability.current_cooldown -= 1
+        self._cooldown_clock.now += 1
     
     def update_status_effects(self):
-        # Update duration of status effects and remove expired ones
-        expired = []
-        for effect, duration in self.status_effects.items():
-            if duration <= 1:
-                expired.append(effect)
-            else:
-                self.status_effects[effect] = duration - 1
-        
-        for effect in expired:
-            del self.status_effects[effect]
-        
-        # Update buffs
-        expired_buffs = []
-        for buff_name, buff_data in self.buffs.items():
-            if buff_data["duration"] <= 1:
-                expired_buffs.append(buff_name)
-            else:
-                buff_data["duration"] -= 1
-        
-        for buff in expired_buffs:
-            del self.buffs[buff]
+        # Count down status effects and buffs, removing those that ran out
+        self._effect_clock.now += 1
+        now, heap = self._effect_clock.now, self._expiry_heap
+        while heap and heap[0][0] <= now:
+            turn, _, timers, key = heapq.heappop(heap)
+            if timers.expiry.get(key) == turn:
+                del timers[key]
+
+    def ready_abilities(self) -> List[str]:
+        """Get the names of the abilities that are off cooldown."""
+        return [name for name, ability in self.abilities.items() if ability.current_cooldown == 0]
+
+    def damage_multiplier(self) -> float:
+        """Get the combined damage multiplier of the active buffs."""
+        multiplier = 1.0
+        for entry in self.buffs.entries.values():
+            multiplier *= entry["effect"].get("damage_multiplier", 1.0)
+        return multiplier
+
+
+def build_abilities(definitions: Dict[str, any], default_damage=DEFAULT_OPPONENT_DAMAGE) -> Dict[str, Ability]:
+    """
+    Build abilities from their definitions.
+
+    Args:
+    definitions (Dict[str, any]): Ability name -> either a description string or a dict with
+        damage_range, cooldown, special_effects and description.
+    default_damage: The damage range of abilities given as a description only.
+
+    Returns:
+    Dict[str, Ability]: The abilities by name.
+    """
+    abilities = {}
+    for name, definition in definitions.items():
+        if isinstance(definition, Ability):
+            abilities[name] = definition
+        elif isinstance(definition, dict):
+            abilities[name] = Ability(
+                name,
+                tuple(definition.get("damage_range", default_damage)),
+                cooldown=definition.get("cooldown", 0),
+                special_effects=dict(definition.get("special_effects", {})),
+                description=definition.get("description", ""))
+        else:
+            abilities[name] = Ability(name, tuple(default_damage), description=definition)
+    return abilities
+
+
+def random_policy(combat: 'CombatSystem', actor: CombatEntity, target: CombatEntity,
+                  rng: random.Random) -> Optional[str]:
+    """Choose a ready ability at random."""
+    ready = actor.ready_abilities()
+    return rng.choice(ready) if ready else None
+
+# An action policy picks the ability an entity uses: (combat, actor, target, rng) -> ability name
+ActionPolicy = Callable[['CombatSystem', CombatEntity, CombatEntity, random.Random], Optional[str]]
+
 
 class CombatSystem:
-    def __init__(self, player: Dict[str, any], opponent: Dict[str, any]):
-        """Initialize combat system with player and opponent."""
-        # Convert player and opponent to combat entities
+    def __init__(self, player: Dict[str, any], opponent: Dict[str, any],
+                 rng: Optional[random.Random] = None,
+                 player_abilities: Optional[Dict[str, any]] = None,
+                 player_hp: Optional[int] = None,
+                 opponent_policy: Optional[ActionPolicy] = None,
+                 seed: Optional[int] = None):
+        """
+        Initialize combat system with player and opponent.
+
+        Args:
+        player (Dict[str, any]): The player; only the name is used.
+        opponent (Dict[str, any]): The opponent with name, hp and abilities (see build_abilities).
+        rng (Optional[random.Random]): Source of the damage rolls and opponent choices.
+        player_abilities (Optional[Dict[str, any]]): The player's loadout, DEFAULT_PLAYER_ABILITIES if None.
+        player_hp (Optional[int]): The player's health, DEFAULT_PLAYER_HP if None.
+        opponent_policy (Optional[ActionPolicy]): How the opponent picks abilities, random_policy if None.
+        seed (Optional[int]): Seed of the fight's random generator when rng is not given;
+            a random seed is drawn if None. Recorded in the replay.
+        """
+        player_hp = player_hp or DEFAULT_PLAYER_HP
         self.player = CombatEntity(
             name=player["name"],
-            max_health=300,  # Default player health
-            current_health=300,
-            abilities={
-                "Sword Strike": Ability("Sword Strike", (20, 40), description="A powerful sword attack"),
-                "Shield Bash": Ability("Shield Bash", (10, 20), description="A stunning shield attack"),
-                "War Cry": Ability("War Cry", (0, 0), description="Boost damage for 2 turns")
-            }
+            max_health=player_hp,
+            current_health=player_hp,
+            abilities=build_abilities(player_abilities or DEFAULT_PLAYER_ABILITIES)
         )
         
         self.opponent = CombatEntity(
             name=opponent["name"],
-            max_health=opponent.get("hp", 100),
-            current_health=opponent.get("hp", 100),
-            abilities={name: Ability(name, (15, 25), description=desc) 
-                      for name, desc in opponent.get("abilities", {}).items()}
+            max_health=opponent.get("hp", DEFAULT_OPPONENT_HP),
+            current_health=opponent.get("hp", DEFAULT_OPPONENT_HP),
+            abilities=build_abilities(opponent.get("abilities", {}))
         )
         
+        if rng is None:
+            seed = seed if seed is not None else random.getrandbits(63)
+            rng = random.Random(seed)
+        self.seed = seed
+        self.rng = rng
+        self.opponent_policy = opponent_policy or random_policy
         self.turn_number = 1
         self.combat_log = []
+        self.replay = ReplayRecorder(self, seed)
+        # Background solve of this fight's win table (see get_win_chance)
+        self._odds_request = None
         self.dialogue_history = []
         
     def handle_dialogue(self, message: str) -> str:
@@ -115,30 +369,93 @@ class CombatSystem:
             ability = self.player.abilities[action]
             if ability.current_cooldown > 0:
                 return f"{action} is on cooldown for {ability.current_cooldown} more turns!"
-                
-            # Calculate and apply damage
-            damage = random.randint(*ability.damage_range)
-            self.opponent.apply_damage(damage)
-            
-            # Apply cooldown
-            ability.current_cooldown = ability.cooldown
-            
+
+            turn = self.execute_turn(action)
+
             # Generate result message
-            result = f"You use {action} and deal {damage} damage to {self.opponent.name}!"
-            
-            # Handle opponent turn
-            if self.opponent.is_alive():
-                # Choose random opponent ability
-                opp_ability = random.choice(list(self.opponent.abilities.values()))
-                opp_damage = random.randint(*opp_ability.damage_range)
-                self.player.apply_damage(opp_damage)
-                result += f"\n\n{self.opponent.name} uses {opp_ability.name} and deals {opp_damage} damage to you!"
-            
-            # Update turn counter
-            self.turn_number += 1
+            result = f"You use {action} and deal {turn['player_damage']} damage to {self.opponent.name}!"
+            if turn["opponent_stunned"]:
+                result += f"\n\n{self.opponent.name} is stunned and cannot act!"
+            elif turn["opponent_action"]:
+                result += (f"\n\n{self.opponent.name} uses {turn['opponent_action']} and deals "
+                           f"{turn['opponent_damage']} damage to you!")
             return result
             
         return "Invalid action!"
+
+    def execute_turn(self, action: str) -> Dict[str, any]:
+        """
+        Play one turn: the player uses an ability, then the opponent answers if it can.
+
+        Args:
+        action (str): The name of a ready player ability.
+
+        Returns:
+        Dict[str, any]: The turn record, also appended to combat_log.
+        """
+        player_damage = self._use_ability(self.player, self.opponent, action)
+
+        opponent_action, opponent_damage, stunned = None, 0, False
+        if self.opponent.is_alive():
+            if "stun" in self.opponent.status_effects:
+                stunned = True
+            else:
+                opponent_action = self.opponent_policy(self, self.opponent, self.player, self.rng)
+            if opponent_action is not None:
+                opponent_damage = self._use_ability(self.opponent, self.player, opponent_action)
+            else:
+                self._end_action(self.opponent, None)
+                self.replay.record(self.turn_number, OPPONENT, None, 0,
+                                   self.player.current_health, self.opponent.current_health)
+
+        record = {
+            "turn": self.turn_number,
+            "player_action": action,
+            "player_damage": player_damage,
+            "opponent_action": opponent_action,
+            "opponent_damage": opponent_damage,
+            "opponent_stunned": stunned,
+            "player_hp": self.player.current_health,
+            "opponent_hp": self.opponent.current_health,
+        }
+        self.combat_log.append(record)
+        self.turn_number += 1
+        return record
+
+    def _use_ability(self, actor: CombatEntity, target: CombatEntity, name: str) -> int:
+        """Roll and apply an ability's damage and effects, returning the damage dealt."""
+        ability = actor.abilities[name]
+        roll = self.rng.randint(*ability.damage_range)
+        damage = int(roll * actor.damage_multiplier())
+        target.apply_damage(damage)
+        self._end_action(actor, ability)
+        self.replay.record(self.turn_number, PLAYER if actor is self.player else OPPONENT, name, roll,
+                           self.player.current_health, self.opponent.current_health)
+
+        effects = ability.special_effects
+        if "stun" in effects:
+            target.apply_status_effect("stun", effects["stun"])
+        if "buff" in effects:
+            buff = effects["buff"]
+            actor.apply_buff(buff.get("name", name), buff.get("effect", {}), buff.get("duration", 1))
+        return damage
+
+    def save_replay(self, path: Optional[str] = None) -> str:
+        """Write the fight so far as a binary replay (see combat_replay.py), returning its path."""
+        return self.replay.save(path)
+
+    @staticmethod
+    def _end_action(actor: CombatEntity, ability: Optional[Ability]) -> None:
+        """
+        Count down an entity's effects and cooldowns after it acted (or lost its action).
+
+        Effects applied by this action are added afterwards, so a stun of 1 costs
+        the target exactly its next action and a 2-turn buff lasts for the next two.
+        """
+        actor.update_status_effects()
+        actor.update_cooldowns()
+        if ability is not None:
+            ability.current_cooldown = ability.cooldown
         
     def is_combat_finished(self) -> bool:
         """Check if the combat is finished."""
@@ -159,8 +476,29 @@ class CombatSystem:
             "ability_descriptions": {
                 name: ability.description
                 for name, ability in self.player.abilities.items()
-            }
+            },
+            "win_chance": self.get_win_chance()
         }
+
+    def get_win_chance(self) -> Optional[float]:
+        """
+        Get the player's exact chance of winning with best play.
+
+        Never solves on this thread: the first call starts solving the fight's
+        table in the background, and until it is ready (or when the fight is
+        too large to solve, or over) the chance is None. The odds assume the
+        opponent picks its abilities at random, so they are also None against
+        any other opponent policy, such as the search of harder difficulties.
+        """
+        if self.is_combat_finished() or self.opponent_policy is not random_policy:
+            return None
+        from combat_odds import cached_win_chance, request_table
+        chance = cached_win_chance(self)
+        if chance is None:
+            if self._odds_request is None:
+                self._odds_request = request_table(self)
+            return None
+        return round(chance, 3)
         
     def get_status_string(self) -> str:
         """Get a detailed status string."""
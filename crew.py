@@ -1,8 +1,28 @@
 """
 Module for handling crew management, morale, and rest mechanics.
+
+Time passing is computed in closed form: rest and morale decay linearly
+(clamped to 0-100), so advance_crew_time() jumps any number of hours at
+once and solves for the hours at which status thresholds are crossed,
+with the same result as advancing hour by hour. advance_crews() does the
+same for arrays of crews.
+
+plan_crew_activities() searches the sequence of activities that best brings
+rest and morale to target levels within a credit budget and a time window.
+It runs a dynamic program over hours and credits spent, and results are
+cached per (rounded levels, budget, window, targets).
+
+The activity log is a bounded ring buffer with running totals per activity
+(see crew_log), so it stays the same size in saves however long a game runs.
 """
+import math
 import random
-from typing import Dict, List
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from crew_log import CrewLog
 
 # Crew status effects and their impacts
 CREW_STATUS_EFFECTS = {
@@ -14,6 +34,22 @@ CREW_STATUS_EFFECTS = {
     "Demoralized": {"morale_mod": -15, "performance_mod": 0.6}
 }
 
+# Statuses in the order of their codes in advance_crews()
+CREW_STATUSES = tuple(CREW_STATUS_EFFECTS)
+
+# Natural decay of rest and morale per hour
+REST_DECAY_PER_HOUR = 0.5
+MORALE_DECAY_PER_HOUR = 0.2
+
+# Status thresholds: "Well Rested" and "Rested" need rest and morale at or above
+# their level, "Exhausted" and "Tired" apply once either is at or below theirs
+STATUS_THRESHOLDS = {
+    "Well Rested": 80,
+    "Rested": 60,
+    "Exhausted": 30,
+    "Tired": 50
+}
+
 # Activities and their effects
 CREW_ACTIVITIES = {
     "Shore Leave": {
@@ -71,34 +107,143 @@ def initialize_crew(player: Dict) -> None:
             'activity_log': [],
             'current_activity': None
         }
+        CrewLog.of(player['crew'])
 
-def update_crew_status(player: Dict, hours_passed: int) -> None:
-    """Update crew status based on time passed and conditions."""
+def _band_status(rest: float, morale: float) -> Optional[str]:
+    """Status the levels call for; None between Rested and Tired, where the status is kept."""
+    if rest >= STATUS_THRESHOLDS["Well Rested"] and morale >= STATUS_THRESHOLDS["Well Rested"]:
+        return "Well Rested"
+    if rest >= STATUS_THRESHOLDS["Rested"] and morale >= STATUS_THRESHOLDS["Rested"]:
+        return "Rested"
+    if rest <= STATUS_THRESHOLDS["Exhausted"] or morale <= STATUS_THRESHOLDS["Exhausted"]:
+        return "Exhausted"
+    if rest <= STATUS_THRESHOLDS["Tired"] or morale <= STATUS_THRESHOLDS["Tired"]:
+        return "Tired"
+    return None
+
+def _levels_after(rest: float, morale: float, hours: float) -> Tuple[float, float]:
+    """Rest and morale after hours of decay."""
+    return (max(0, min(100, rest - hours * REST_DECAY_PER_HOUR)),
+            max(0, min(100, morale - hours * MORALE_DECAY_PER_HOUR)))
+
+def _hours_until(rest: float, morale: float, level: float) -> float:
+    """Hours of decay until rest or morale first reaches a level."""
+    return min((rest - level) / REST_DECAY_PER_HOUR, (morale - level) / MORALE_DECAY_PER_HOUR)
+
+def crew_status_changes(crew: Dict, hours: float) -> List[Tuple[float, str]]:
+    """
+    Get the status changes over the next hours of decay.
+
+    Status is checked after every whole hour and at the end, as if
+    update_crew_status were called hour by hour, but the thresholds are
+    solved for instead of stepped through, so the cost does not depend on hours.
+
+    Returns:
+    List[Tuple[float, str]]: (hour, new status) for every change, in order.
+    """
+    rest, morale, status = crew['rest'], crew['morale'], crew['status']
+    whole = math.floor(hours)
+
+    # Status can only change at the first check and around each threshold crossing
+    checks = {min(1, hours), hours}
+    for level in STATUS_THRESHOLDS.values():
+        crossing = _hours_until(rest, morale, level)
+        if math.isfinite(crossing):
+            for check in (math.floor(crossing), math.floor(crossing) + 1):
+                if 1 <= check <= whole:
+                    checks.add(check)
+
+    changes = []
+    for check in sorted(checks):
+        new_status = _band_status(*_levels_after(rest, morale, check)) or status
+        if new_status != status:
+            changes.append((check, new_status))
+            status = new_status
+    return changes
+
+def advance_crew_time(player: Dict, hours: float) -> List[Tuple[float, str]]:
+    """
+    Advance the crew by any number of hours at constant cost.
+
+    Returns:
+    List[Tuple[float, str]]: (hour, new status) for every status change on the way.
+    """
     if 'crew' not in player:
         initialize_crew(player)
-    
+
     crew = player['crew']
-    crew['hours_since_rest'] += hours_passed
-    
-    # Natural decay of rest and morale over time
-    rest_decay = hours_passed * 0.5  # Lose 0.5 rest points per hour
-    morale_decay = hours_passed * 0.2  # Lose 0.2 morale points per hour
-    
-    crew['rest'] = max(0, min(100, crew['rest'] - rest_decay))
-    crew['morale'] = max(0, min(100, crew['morale'] - morale_decay))
-    
-    # Update status based on rest and morale levels
-    if crew['rest'] >= 80 and crew['morale'] >= 80:
-        crew['status'] = "Well Rested"
-    elif crew['rest'] >= 60 and crew['morale'] >= 60:
-        crew['status'] = "Rested"
-    elif crew['rest'] <= 30 or crew['morale'] <= 30:
-        crew['status'] = "Exhausted"
-    elif crew['rest'] <= 50 or crew['morale'] <= 50:
-        crew['status'] = "Tired"
-
-def perform_crew_activity(player: Dict, activity_name: str) -> Dict:
-    """Perform a crew activity and return the results."""
+    changes = crew_status_changes(crew, hours)
+    crew['hours_since_rest'] += hours
+    crew['rest'], crew['morale'] = _levels_after(crew['rest'], crew['morale'], hours)
+    if changes:
+        crew['status'] = changes[-1][1]
+    return changes
+
+def update_crew_status(player: Dict, hours_passed: int) -> None:
+    """Update crew status based on time passed and conditions."""
+    advance_crew_time(player, hours_passed)
+
+def advance_crews(rest: np.ndarray, morale: np.ndarray, status: np.ndarray,
+                  hours) -> Dict[str, np.ndarray]:
+    """
+    Advance many crews at once.
+
+    Args:
+    rest (np.ndarray): Rest of each crew.
+    morale (np.ndarray): Morale of each crew.
+    status (np.ndarray): Status code of each crew, an index into CREW_STATUSES.
+    hours: Hours to advance, one number or one per crew.
+
+    Returns:
+    Dict[str, np.ndarray]: The new "rest", "morale" and "status", plus
+        "crossings": the hours from now at which rest or morale reaches each
+        threshold in STATUS_THRESHOLDS (negative if it already has).
+    """
+    rest = np.asarray(rest, dtype=np.float64)
+    morale = np.asarray(morale, dtype=np.float64)
+    status = np.asarray(status)
+    hours = np.broadcast_to(np.asarray(hours, dtype=np.float64), rest.shape)
+
+    def band(at):
+        r = np.clip(rest - at * REST_DECAY_PER_HOUR, 0, 100)
+        m = np.clip(morale - at * MORALE_DECAY_PER_HOUR, 0, 100)
+        level = STATUS_THRESHOLDS
+        return r, m, np.select(
+            [(r >= level["Well Rested"]) & (m >= level["Well Rested"]),
+             (r >= level["Rested"]) & (m >= level["Rested"]),
+             (r <= level["Exhausted"]) | (m <= level["Exhausted"]),
+             (r <= level["Tired"]) | (m <= level["Tired"])],
+            [CREW_STATUSES.index(name) for name in ("Well Rested", "Rested", "Exhausted", "Tired")],
+            default=-1)
+
+    new_rest, new_morale, final = band(hours)
+    # Decay is monotone and slow, so a crew between Rested and Tired at the end
+    # was Rested on the way there if it was Rested or better at the first check
+    _, _, first = band(np.minimum(hours, 1))
+    rested = (first == CREW_STATUSES.index("Well Rested")) | (first == CREW_STATUSES.index("Rested"))
+    kept = np.where(rested, CREW_STATUSES.index("Rested"), status)
+    return {
+        "rest": new_rest,
+        "morale": new_morale,
+        "status": np.where(final >= 0, final, kept),
+        "crossings": {name: np.minimum((rest - level) / REST_DECAY_PER_HOUR,
+                                       (morale - level) / MORALE_DECAY_PER_HOUR)
+                      for name, level in STATUS_THRESHOLDS.items()},
+    }
+
+def perform_crew_activity(player: Dict, activity_name: str,
+                          archive_path: Optional[str] = None) -> Dict:
+    """
+    Perform a crew activity and return the results.
+
+    Args:
+    player (Dict): The player's data.
+    activity_name (str): A key of CREW_ACTIVITIES.
+    archive_path (Optional[str]): JSONL file for log entries pushed out of the crew's log.
+
+    Returns:
+    Dict: Whether it succeeded, a message and the effects.
+    """
     if activity_name not in CREW_ACTIVITIES:
         return {"success": False, "message": "Invalid activity"}
     
@@ -122,9 +267,10 @@ def perform_crew_activity(player: Dict, activity_name: str) -> Dict:
     player['resources']['credits'] -= activity['cost']
     
     # Log the activity
-    crew['activity_log'].append({
+    CrewLog.of(crew, archive_path=archive_path).append({
         "activity": activity_name,
         "duration": activity['duration'],
+        "cost": activity['cost'],
         "effects": {
             "rest": activity['rest'],
             "morale": activity['morale']
@@ -145,6 +291,140 @@ def perform_crew_activity(player: Dict, activity_name: str) -> Dict:
         }
     }
 
+# Planned activity sequences kept, oldest dropped first
+PLAN_CACHE_SIZE = 4096
+
+# Default planning window in hours and target levels
+DEFAULT_PLAN_WINDOW = 24
+DEFAULT_PLAN_TARGETS = (80, 80)
+
+@dataclass
+class ActivityPlan:
+    """A sequence of crew activities and where it leaves the crew."""
+    activities: List[str]
+    cost: int
+    hours: int             # Hours spent on activities
+    rest: float            # Levels at the end of the window
+    morale: float
+    status: str
+    meets_targets: bool
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+# (rest, morale, budget, window, target rest, target morale) -> activity names
+_plans: Dict[Tuple, Tuple[str, ...]] = {}
+
+def _after_activity(rest: float, morale: float, activity: Dict) -> Tuple[float, float]:
+    """Levels after performing an activity and the decay during it."""
+    rest = max(0, min(100, rest + activity['rest']))
+    morale = max(0, min(100, morale + activity['morale']))
+    return _levels_after(rest, morale, activity['duration'])
+
+def _shortfall(rest: float, morale: float, targets: Tuple[float, float]) -> float:
+    return max(0.0, targets[0] - rest) + max(0.0, targets[1] - morale)
+
+def _best_sequence(rest: float, morale: float, budget: int, window: int,
+                   targets: Tuple[float, float]) -> Tuple[str, ...]:
+    """
+    Find the activities leaving the smallest shortfall at the end of the window.
+
+    States are grouped by hours spent. A state is dropped when another one
+    with the same hours has spent no more and has at least its rest and
+    morale, since clamping and decay never reverse that order. Ties go to
+    the cheaper and then the shorter sequence.
+    """
+    activities = sorted(CREW_ACTIVITIES.items(), key=lambda item: item[1]['duration'])
+    # hours spent -> [(credits spent, rest, morale, sequence)]
+    frontiers: Dict[int, List[Tuple[int, float, float, Tuple[str, ...]]]] = {0: [(0, rest, morale, ())]}
+    best_key, best = None, ()
+    for hours in range(window + 1):
+        for spent, r, m, sequence in frontiers.pop(hours, ()):
+            key = (round(_shortfall(*_levels_after(r, m, window - hours), targets), 9), spent, len(sequence))
+            if best_key is None or key < best_key:
+                best_key, best = key, sequence
+            for name, activity in activities:
+                end, cost = hours + activity['duration'], spent + activity['cost']
+                if end > window or cost > budget:
+                    continue
+                state = (cost, *_after_activity(r, m, activity), sequence + (name,))
+                frontier = frontiers.setdefault(end, [])
+                if any(c <= state[0] and fr >= state[1] and fm >= state[2] for c, fr, fm, _ in frontier):
+                    continue
+                frontier[:] = [entry for entry in frontier
+                               if not (state[0] <= entry[0] and state[1] >= entry[1] and state[2] >= entry[2])]
+                frontier.append(state)
+    return best
+
+def _max_spend(window: int) -> int:
+    """The most credits any sequence of activities fitting in the window can cost."""
+    # most[h]: the most a sequence taking at most h hours can cost
+    most = [0] * (window + 1)
+    for hours in range(1, window + 1):
+        most[hours] = max([most[hours - 1]] + [most[hours - a['duration']] + a['cost']
+                                               for a in CREW_ACTIVITIES.values() if 0 < a['duration'] <= hours])
+    return most[window]
+
+def plan_crew_activities(player: Dict, window_hours: int = DEFAULT_PLAN_WINDOW,
+                         target_rest: float = DEFAULT_PLAN_TARGETS[0],
+                         target_morale: float = DEFAULT_PLAN_TARGETS[1],
+                         credits: Optional[int] = None) -> ActivityPlan:
+    """
+    Plan the activities that best bring the crew to target rest and morale.
+
+    Args:
+    player (Dict): The player, with crew and resources.
+    window_hours (int): Hours available; levels are judged at the end of them.
+    target_rest (float): Rest to reach.
+    target_morale (float): Morale to reach.
+    credits (Optional[int]): Credits to spend, the player's credits by default.
+
+    Returns:
+    ActivityPlan: The activities in order and where they leave the crew.
+    """
+    if 'crew' not in player:
+        initialize_crew(player)
+    crew = player['crew']
+    if credits is None:
+        credits = player.get('resources', {}).get('credits', 0)
+    window = max(0, int(window_hours))
+    # More credits than the window can spend make no difference to the plan
+    budget = max(0, min(int(credits), _max_spend(window)))
+    targets = (target_rest, target_morale)
+
+    key = (round(crew['rest']), round(crew['morale']), budget, window, target_rest, target_morale)
+    sequence = _plans.get(key)
+    if sequence is None:
+        if len(_plans) >= PLAN_CACHE_SIZE:
+            del _plans[next(iter(_plans))]
+        sequence = _plans[key] = _best_sequence(key[0], key[1], budget, window, targets)
+
+    # Play the plan from the exact levels
+    simulated = {'rest': crew['rest'], 'morale': crew['morale'], 'status': crew['status']}
+    hours = 0
+    for name in sequence:
+        activity = CREW_ACTIVITIES[name]
+        simulated['rest'] = max(0, min(100, simulated['rest'] + activity['rest']))
+        simulated['morale'] = max(0, min(100, simulated['morale'] + activity['morale']))
+        for _, status in crew_status_changes(simulated, activity['duration'])[-1:]:
+            simulated['status'] = status
+        simulated['rest'], simulated['morale'] = _levels_after(simulated['rest'], simulated['morale'],
+                                                               activity['duration'])
+        hours += activity['duration']
+    for _, status in crew_status_changes(simulated, window - hours)[-1:]:
+        simulated['status'] = status
+    rest, morale = _levels_after(simulated['rest'], simulated['morale'], window - hours)
+
+    return ActivityPlan(
+        activities=list(sequence),
+        cost=sum(CREW_ACTIVITIES[name]['cost'] for name in sequence),
+        hours=hours,
+        rest=rest,
+        morale=morale,
+        status=simulated['status'],
+        meets_targets=round(_shortfall(rest, morale, targets), 9) == 0
+    )
+
 def get_available_activities(player: Dict) -> List[Dict]:
     """Get list of available activities based on current location and resources."""
     available = []
@@ -165,6 +445,7 @@ def get_crew_status_report(player: Dict) -> Dict:
     
     crew = player['crew']
     status_effect = CREW_STATUS_EFFECTS[crew['status']]
+    log = CrewLog.of(crew)
     
     return {
         "morale": crew['morale'],
@@ -172,7 +453,8 @@ def get_crew_status_report(player: Dict) -> Dict:
         "status": crew['status'],
         "hours_since_rest": crew['hours_since_rest'],
         "performance_modifier": status_effect['performance_mod'],
-        "recent_activities": crew['activity_log'][-3:] if crew['activity_log'] else [],
+        "recent_activities": log.recent(3),
+        "activity_totals": log.totals,
         "current_effects": {
             "morale_mod": status_effect['morale_mod'],
             "performance_mod": status_effect['performance_mod']
@@ -196,6 +478,9 @@ def display_crew_status(player: Dict) -> None:
             print(f"- {activity['activity']} "
                   f"(Rest: {activity['effects']['rest']:+d}, "
                   f"Morale: {activity['effects']['morale']:+d})")
+        totals = report['activity_totals']
+        print(f"Logged: {totals['count']} activities, {totals['hours']} hours, "
+              f"{totals['credits']} credits spent")
     
     # Show available activities
     available = get_available_activities(player)
@@ -204,3 +489,9 @@ def display_crew_status(player: Dict) -> None:
         for i, activity in enumerate(available, 1):
             print(f"{i}. {activity['name']} - {activity['description']}")
             print(f"   Cost: {activity['cost']} credits, Duration: {activity['duration']} hours")
+
+    plan = plan_crew_activities(player)
+    if plan.activities:
+        print(f"\nSuggested for the next {DEFAULT_PLAN_WINDOW} hours: {', '.join(plan.activities)}")
+        print(f"   Cost: {plan.cost} credits, leaves the crew {plan.status} "
+              f"(Rest: {plan.rest:.0f}%, Morale: {plan.morale:.0f}%)")
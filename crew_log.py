@@ -0,0 +1,130 @@
+"""
+Crew Log Module
+=============
+
+Bounded crew activity log with running totals.
+
+The crew activity log used to be a list that grew with every activity and
+was written out in full with every save, although reports only read the
+last few entries. It is now a fixed-capacity ring buffer stored in the crew:
+
+    {"capacity": 50, "head": 7, "entries": [...],
+     "totals": {"count": 312, "credits": 41200, "hours": 1830,
+                "activities": {"Movie Night": {"count": 40, "hours": 120, "credits": 800,
+                                               "rest": 400, "morale": 800}, ...}}}
+
+Once the buffer is full, a new entry overwrites the oldest one at "head",
+so a save diff touches one slot instead of shifting the whole list. The
+totals are updated as each entry is logged, so reports never scan the
+history. An overwritten entry can be appended to an archive journal
+(JSONL) instead of being dropped.
+
+List logs from older saves are converted the first time CrewLog.of() sees
+them. The totals are counted from the whole list, and entries beyond the
+capacity go to the archive if one is given. Entries logged without a cost
+are given the activity's cost from CREW_ACTIVITIES.
+
+Usage:
+-----
+```python
+log = CrewLog.of(player['crew'], archive_path="saves/strijder-activities.jsonl")
+log.append({"activity": "Movie Night", "duration": 3, "cost": 20,
+            "effects": {"rest": 10, "morale": 20}})
+log.recent(3)                     # Newest last
+log.totals["activities"]["Movie Night"]["count"]
+```
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import journal
+
+# Entries kept in a crew's log
+DEFAULT_CAPACITY = 50
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"count": 0, "credits": 0, "hours": 0, "activities": {}}
+
+
+class CrewLog:
+    """A ring buffer view over a crew's stored activity log."""
+
+    def __init__(self, data: Dict[str, Any], archive_path: Optional[str] = None):
+        self.data = data
+        self.archive_path = archive_path
+
+    @classmethod
+    def of(cls, crew: Dict[str, Any], capacity: int = DEFAULT_CAPACITY,
+           archive_path: Optional[str] = None) -> 'CrewLog':
+        """Get a crew's log, converting a list log in place."""
+        data = crew.get('activity_log')
+        if not isinstance(data, dict):
+            from crew import CREW_ACTIVITIES
+            log = cls({"capacity": capacity, "head": 0, "entries": [], "totals": _empty_totals()},
+                      archive_path)
+            for entry in data or []:
+                # Older saves logged no cost; use the activity's listed cost
+                if "cost" not in entry and entry.get("activity") in CREW_ACTIVITIES:
+                    entry = dict(entry, cost=CREW_ACTIVITIES[entry["activity"]]["cost"])
+                log.append(entry)
+            crew['activity_log'] = log.data
+            return log
+        return cls(data, archive_path)
+
+    @property
+    def capacity(self) -> int:
+        return self.data["capacity"]
+
+    @property
+    def totals(self) -> Dict[str, Any]:
+        """Counts and totals over every activity ever logged."""
+        return self.data["totals"]
+
+    def __len__(self) -> int:
+        return len(self.data["entries"])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Entries held, oldest first."""
+        entries, head = self.data["entries"], self.data["head"]
+        yield from entries[head:]
+        yield from entries[:head]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Log an entry, overwriting (and archiving) the oldest if the log is full."""
+        entries = self.data["entries"]
+        if len(entries) < self.capacity:
+            entries.append(entry)
+        else:
+            head = self.data["head"]
+            if self.archive_path:
+                journal.append_entry(self.archive_path, entries[head])
+            entries[head] = entry
+            self.data["head"] = (head + 1) % self.capacity
+        self._count(entry)
+
+    def _count(self, entry: Dict[str, Any]) -> None:
+        totals = self.data["totals"]
+        duration = entry.get("duration", 0)
+        cost = entry.get("cost", 0)
+        effects = entry.get("effects", {})
+        totals["count"] += 1
+        totals["hours"] += duration
+        totals["credits"] += cost
+        activity = totals["activities"].setdefault(
+            entry.get("activity", "Unknown"), {"count": 0, "hours": 0, "credits": 0, "rest": 0, "morale": 0})
+        activity["count"] += 1
+        activity["hours"] += duration
+        activity["credits"] += cost
+        activity["rest"] += effects.get("rest", 0)
+        activity["morale"] += effects.get("morale", 0)
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """The newest entries, oldest of them first."""
+        if count <= 0:
+            return []
+        entries, head = self.data["entries"], self.data["head"]
+        if head >= count:
+            return entries[head - count:head]
+        # The newest entries wrap around the end of the buffer
+        return entries[head:][-(count - head):] + entries[:head]
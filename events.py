@@ -2,6 +2,9 @@ from utilities import get_valid_input
 import random
 import json
 import os
+from game_state_store import get_store
+from item_catalog import Inventory
+from treasure_map import discover_treasure
 from items import generate_random_item, generate_quest_reward, add_item_to_inventory, add_credits, generate_treasure
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
@@ -189,8 +192,6 @@ class EventSystem:
                 player['resources'] = {'fuel': 100}
             if 'credits' not in player:
                 player['credits'] = 1000
-            if 'inventory' not in player:
-                player['inventory'] = []
 
             # Apply costs
             player['resources']['fuel'] = max(0, player['resources']['fuel'] + choice.costs.get('fuel', 0))
@@ -199,7 +200,9 @@ class EventSystem:
 
             # Apply rewards
             player['credits'] += choice.rewards.get('credits', 0)
-            player['inventory'].extend(choice.rewards.get('items', []))
+            inventory = Inventory.of(player)
+            for item in choice.rewards.get('items', []):
+                inventory.add(item)
 
             # Handle morale changes
             if choice.morale_change is not None:
@@ -316,9 +319,11 @@ class CombatEvent(StoryEvent):
     
     def initialize_combat(self, player, opponent):
         """Initialize the combat system with player and opponent."""
+        from combat_ai import opponent_policy_for
         from combat_system import CombatSystem
         self.opponent = opponent
-        self.combat_system = CombatSystem(player, opponent)
+        self.combat_system = CombatSystem(
+            player, opponent, opponent_policy=opponent_policy_for(opponent.get("difficulty", "Normal")))
         
     def handle_combat_turn(self, player_action, player_input=None):
         """Handle a single turn of combat."""
@@ -363,47 +368,26 @@ class CombatEvent(StoryEvent):
         return llm_service.generate_text(prompt)
 
 def load_game_state():
-    """Load the game state from a JSON file."""
-    save_file = "game_state.json"
-    if os.path.exists(save_file):
-        with open(save_file, 'r') as f:
-            return json.load(f)
-    return {"completed_scenarios": [], "current_scenario": None}
+    """Get a copy of the game state held by the shared store."""
+    return get_store().to_dict()
 
 def save_game_state(state):
-    """Save the game state to a JSON file."""
-    with open("game_state.json", 'w') as f:
-        json.dump(state, f)
+    """Replace the game state held by the shared store and write a snapshot."""
+    get_store().replace(state)
 
 def mark_scenario_complete(scenario_id):
     """Mark a scenario as completed and save the state."""
-    game_state = load_game_state()
-    if scenario_id not in game_state["completed_scenarios"]:
-        game_state["completed_scenarios"].append(scenario_id)
-    save_game_state(game_state)
+    get_store().mark_scenario_complete(scenario_id)
 
 def get_next_available_scenario():
     """Get the next available scenario based on completion status and prerequisites."""
-    game_state = load_game_state()
-    completed = set(game_state["completed_scenarios"])
-    
-    available_scenarios = []
-    for scenario in STORY_SCENARIOS.values():
-        if scenario["id"] not in completed:  # Not completed yet
-            if scenario["required_previous"] is None:  # No prerequisites
-                available_scenarios.append(scenario)
-            else:  # Check if prerequisites are met
-                if all(req in completed for req in scenario["required_previous"]):
-                    available_scenarios.append(scenario)
-    
+    available_scenarios = get_store().available_scenarios(STORY_SCENARIOS)
     return random.choice(available_scenarios) if available_scenarios else None
 
 def generate_starting_conflict():
     """Generate a starting conflict scenario with skill integration."""
-    game_state = load_game_state()
-    
     # If starting conflict is already completed, move to random events
-    if "starting_conflict" in game_state.get("completed_scenarios", []):
+    if get_store().is_completed("starting_conflict"):
         return generate_random_event()
     
     # Create the starting conflict event
@@ -543,11 +527,9 @@ def calculate_event_rewards(choice, player, success=True):
 def handle_special_reward(player, special_reward):
     """Handle special rewards like maps, blueprints, etc."""
     if special_reward == "map_fragment":
-        if "discovered_locations" not in player:
-            player["discovered_locations"] = []
-        # Generate a new treasure and add its location
+        # Generate a new treasure and add it to the player's map
         treasure = generate_treasure("Normal")
-        player["discovered_locations"].append(treasure.to_dict())
+        discover_treasure(player, treasure)
         print(f"\nSpecial Reward: Found a map fragment revealing {treasure.name}!")
         print(f"Description: {treasure.description}")
         print(f"Location: X:{treasure.location['x']:.1f}, Y:{treasure.location['y']:.1f}, Z:{treasure.location['z']:.1f}")
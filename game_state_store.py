@@ -0,0 +1,222 @@
+"""
+Game State Store Module
+=====================
+
+In-memory game state with incremental persistence.
+
+The store keeps completed scenarios as a set and the current scenario in
+memory, so scenario lookups on the hot path never touch disk. Changes are
+appended to a small journal next to the snapshot and folded into the
+snapshot every compact_every changes:
+
+game_state.json          # Snapshot: {"completed_scenarios": [...], "current_scenario": ...}
+game_state.log.jsonl     # Changes since the snapshot, one per line
+
+Replaying the journal is idempotent, so a crash between writing a new
+snapshot and truncating the journal loses nothing.
+
+Scenario tables (the STORY_SCENARIOS of events.py and story_manager.py) are
+indexed by ScenarioIndex, which tracks how many requirements of each
+scenario are still missing and updates only the dependents of a scenario
+when it is completed.
+
+Usage:
+-----
+```python
+store = get_store()
+scenario = store.index_for(STORY_SCENARIOS).first_available()
+store.set_current_scenario(scenario)
+store.mark_scenario_complete(scenario["id"])
+```
+"""
+
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import journal
+import serializers
+from persistence_writer import atomic_write
+
+# Fold the journal into the snapshot after this many changes
+DEFAULT_COMPACT_EVERY = 50
+
+
+def scenario_requirements(scenario: Dict[str, Any]) -> List[str]:
+    """Get the ids a scenario requires, whichever table format it comes from."""
+    if "requirements" in scenario:
+        return list(scenario["requirements"] or [])
+    return list(scenario.get("required_previous") or [])
+
+
+class ScenarioIndex:
+    """Incrementally maintained set of scenarios whose requirements are met."""
+
+    def __init__(self, scenarios: Iterable[Dict[str, Any]], completed: Set[str]):
+        # Keep the table alive so its id cannot be reused while it is indexed
+        self.table = scenarios
+        if isinstance(scenarios, dict):
+            scenarios = scenarios.values()
+        self.scenarios = list(scenarios)
+        self._order = {scenario["id"]: position for position, scenario in enumerate(self.scenarios)}
+        self._by_id = {scenario["id"]: scenario for scenario in self.scenarios}
+        self._completed = set(completed)
+        self._missing: Dict[str, int] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        for scenario in self.scenarios:
+            requirements = set(scenario_requirements(scenario))
+            self._missing[scenario["id"]] = len(requirements - completed)
+            for requirement in requirements:
+                self._dependents.setdefault(requirement, []).append(scenario["id"])
+        self._available = {
+            scenario_id for scenario_id, missing in self._missing.items()
+            if missing == 0 and scenario_id not in completed
+        }
+
+    def on_complete(self, scenario_id: str) -> None:
+        """Update the index after a scenario was completed for the first time."""
+        self._completed.add(scenario_id)
+        self._available.discard(scenario_id)
+        for dependent in self._dependents.get(scenario_id, []):
+            self._missing[dependent] -= 1
+            # A dependent may have been completed before its prerequisite
+            if self._missing[dependent] == 0 and dependent not in self._completed:
+                self._available.add(dependent)
+
+    def available(self) -> List[Dict[str, Any]]:
+        """Get the scenarios whose requirements are met, in table order."""
+        return [self._by_id[scenario_id]
+                for scenario_id in sorted(self._available, key=self._order.__getitem__)]
+
+    def first_available(self) -> Optional[Dict[str, Any]]:
+        """Get the first available scenario in table order."""
+        if not self._available:
+            return None
+        return self._by_id[min(self._available, key=self._order.__getitem__)]
+
+
+class GameStateStore:
+    def __init__(self, path: str = "game_state.json", compact_every: int = DEFAULT_COMPACT_EVERY):
+        """Initialize the store and load the saved state from path."""
+        self.path = path
+        self.log_path = f"{os.path.splitext(path)[0]}.log.jsonl"
+        self.compact_every = compact_every
+        self.completed_scenarios: List[str] = []
+        self.current_scenario: Optional[Dict[str, Any]] = None
+        self._completed: Set[str] = set()
+        self._indexes: Dict[int, ScenarioIndex] = {}
+        self._pending = 0
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self) -> None:
+        """Load the snapshot and replay the change journal."""
+        with self._lock:
+            self._indexes = {}
+            state = {}
+            if os.path.exists(self.path):
+                state = serializers.load(self.path) or {}
+            self.completed_scenarios = []
+            self._completed = set()
+            self.current_scenario = state.get("current_scenario")
+            for scenario_id in state.get("completed_scenarios", []):
+                self._complete(scenario_id)
+
+            self._pending = 0
+            for change in journal.iter_entries(self.log_path):
+                self._apply(change)
+                self._pending += 1
+
+    def _apply(self, change: Dict[str, Any]) -> None:
+        """Apply one journal change to the in-memory state."""
+        if change["op"] == "complete":
+            self._complete(change["id"])
+            self.current_scenario = None
+        elif change["op"] == "current":
+            self.current_scenario = change["scenario"]
+
+    def _complete(self, scenario_id: str) -> bool:
+        """Record a completed scenario, returning False if it already was."""
+        if scenario_id in self._completed:
+            return False
+        self._completed.add(scenario_id)
+        self.completed_scenarios.append(scenario_id)
+        for index in self._indexes.values():
+            index.on_complete(scenario_id)
+        return True
+
+    def _record(self, change: Dict[str, Any]) -> None:
+        """Append a change to the journal, compacting when it grows too long."""
+        journal.append_entry(self.log_path, change)
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def is_completed(self, scenario_id: str) -> bool:
+        """Check if a scenario has been completed."""
+        return scenario_id in self._completed
+
+    def index_for(self, scenarios: Iterable[Dict[str, Any]]) -> ScenarioIndex:
+        """Get the availability index for a scenario table (list or dict), building it on first use."""
+        key = id(scenarios)
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = ScenarioIndex(scenarios, self._completed)
+            return self._indexes[key]
+
+    def available_scenarios(self, scenarios: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Get the scenarios of a table whose requirements are met."""
+        return self.index_for(scenarios).available()
+
+    def mark_scenario_complete(self, scenario_id: str) -> None:
+        """Mark a scenario as complete and clear it as the current scenario."""
+        with self._lock:
+            self._complete(scenario_id)
+            self.current_scenario = None
+            self._record({"op": "complete", "id": scenario_id})
+
+    def set_current_scenario(self, scenario: Optional[Dict[str, Any]]) -> None:
+        """Set the scenario the player is currently playing."""
+        with self._lock:
+            if scenario == self.current_scenario:
+                return
+            self.current_scenario = scenario
+            self._record({"op": "current", "scenario": scenario})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the game state in the format of the snapshot file."""
+        return {
+            "completed_scenarios": list(self.completed_scenarios),
+            "current_scenario": self.current_scenario
+        }
+
+    def replace(self, state: Dict[str, Any]) -> None:
+        """Replace the whole state, e.g. from a legacy save_game_state call."""
+        with self._lock:
+            self.completed_scenarios = []
+            self._completed = set()
+            self._indexes = {}
+            self.current_scenario = state.get("current_scenario")
+            for scenario_id in state.get("completed_scenarios", []):
+                self._complete(scenario_id)
+            self.compact()
+
+    def compact(self) -> None:
+        """Write a fresh snapshot and empty the change journal."""
+        with self._lock:
+            atomic_write(self.path, serializers.default_serializer.dumps(self.to_dict()))
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self._pending = 0
+
+
+# Stores shared by the game, one per state file
+_stores: Dict[str, GameStateStore] = {}
+
+
+def get_store(path: str = "game_state.json") -> GameStateStore:
+    """Get the shared store for a game state file, loading it on first use."""
+    key = os.path.abspath(path)
+    if key not in _stores:
+        _stores[key] = GameStateStore(path)
+    return _stores[key]
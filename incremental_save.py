@@ -0,0 +1,366 @@
+"""
+Incremental Save Module
+=====================
+
+Delta-encoded saves for large, slowly changing documents such as the player
+save.
+
+A save is stored as a base snapshot plus an append-only log of structural
+diffs:
+
+[name].json         # Base snapshot, written by a Serializer (see serializers.py)
+[name].delta.jsonl  # Header line, then one line per save holding the diff against the previous one
+
+Each diff is a list of JSON-Patch-like operations ("add", "remove",
+"replace") addressed with JSON Pointer paths. Appending to a list, the most
+common change for histories and logs, becomes a single "add" at "/-". The
+log is folded into a fresh snapshot once it grows past a size limit or a
+fraction of the snapshot size, so loading never has to replay an unbounded
+log. Write volume per save scales with the size of the change rather than
+the size of the document.
+
+The first line of the log records a hash of the snapshot it applies to, so a
+log left behind by an interrupted snapshot is ignored instead of replayed
+twice. It also records the snapshot's version, and every logged save the
+version it bumped the document to; the version is never stored in the
+document itself.
+
+Saves are safe with several writers (threads, web workers, the CLI): each
+save holds the file lock of the snapshot (see concurrency.py) and bumps the
+version counter of the save (see version). Loads hold the lock too, so
+they never see (or cut off) half of another writer's save. When the version on disk moved
+on since the document being saved was loaded, our changes are merged on top
+of the newer document instead of overwriting it. compare_and_swap and
+update offer strict versioned writes and locked read-modify-write.
+
+Usage:
+-----
+```python
+save_file = get_save_file("strijder.json")
+player = save_file.load()
+player['resources']['credits'] -= 100
+save_file.save(player)  # Appends a single "replace" operation
+```
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import serializers
+from concurrency import ConflictError, file_lock, strip_legacy_version, three_way_merge
+from json_patch import apply_patch, diff
+from persistence_writer import append_bytes, atomic_write
+from serializers import Serializer
+
+# Fold the log into a new snapshot once it is larger than this many bytes
+DEFAULT_MAX_LOG_BYTES = 1024 * 1024
+# ...or once it is larger than this fraction of the snapshot
+DEFAULT_MAX_LOG_RATIO = 1.0
+
+
+class IncrementalSaveFile:
+    """A JSON document saved as a snapshot plus a log of diffs."""
+
+    def __init__(self, snapshot_path: str, max_log_bytes: int = DEFAULT_MAX_LOG_BYTES,
+                 max_log_ratio: float = DEFAULT_MAX_LOG_RATIO, serializer: Optional[Serializer] = None,
+                 conflict: str = "ours"):
+        self.snapshot_path = snapshot_path
+        self.conflict = conflict
+        self.serializer = serializer or serializers.default_serializer
+        self.log_path = f"{os.path.splitext(snapshot_path)[0]}.delta.jsonl"
+        self.max_log_bytes = max_log_bytes
+        self.max_log_ratio = max_log_ratio
+        self._last_saved = None
+        self._version = 0
+        # What the caller's document is based on, when that is not what is on disk
+        self._base = None
+        self._loaded = False
+        self._snapshot_size = 0
+        self._snapshot_hash = None
+        self._snapshot_stat = None
+        self._log_size = 0
+        self._lock = threading.RLock()
+
+    def exists(self) -> bool:
+        """Check if a snapshot exists on disk."""
+        return os.path.exists(self.snapshot_path)
+
+    def _stat(self):
+        """Identify the snapshot and log on disk to notice writes made elsewhere."""
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        try:
+            log = os.stat(self.log_path)
+            log_stat = (log.st_mtime_ns, log.st_size)
+        except FileNotFoundError:
+            log_stat = None
+        return (stat.st_mtime_ns, stat.st_size, log_stat)
+
+    @property
+    def version(self) -> int:
+        """Version of the document as last loaded or saved, bumped by every save that changed it."""
+        return self._version
+
+    @property
+    def diverged(self) -> bool:
+        """True when saves had to merge changes made elsewhere that the caller has not loaded yet."""
+        return self._base is not None
+
+    def load(self) -> Optional[Any]:
+        """
+        Load the snapshot and replay the delta log on top of it.
+
+        Holds the file lock while reading, so the snapshot and log are never
+        read halfway through another writer's save, and a torn or stale log
+        is only cut off or removed when no one is writing it.
+        """
+        with self._lock:
+            self._base = None
+            if not self.exists():
+                return self._load()
+            with file_lock(self.snapshot_path):
+                return self._load()
+
+    def _load(self) -> Optional[Any]:
+        # Only called with the file lock held, unless there is no snapshot
+        self._snapshot_stat = self._stat()
+        if not self.exists():
+            self._last_saved = None
+            self._version = 0
+            self._loaded = True
+            return None
+
+        with open(self.snapshot_path, 'rb') as f:
+            raw = f.read()
+        document = serializers.loads(raw)
+        self._snapshot_size = len(raw)
+        self._snapshot_hash = hashlib.sha1(raw).hexdigest()
+        self._log_size = 0
+        version = 0
+
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb') as f:
+                lines = f.readlines()
+            header = json.loads(lines[0]) if lines else {}
+            if header.get("base") == self._snapshot_hash:
+                self._log_size = len(lines[0])
+                version = header.get("version", 0)
+                for line in lines[1:]:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final line from an interrupted save, cut it off
+                        with open(self.log_path, 'r+b') as f:
+                            f.truncate(self._log_size)
+                        break
+                    document = apply_patch(document, entry["ops"])
+                    version = entry.get("version", version + 1)
+                    self._log_size += len(line)
+            else:
+                os.remove(self.log_path)
+
+        # Saves from before the version moved out of the document
+        self._version = max(version, strip_legacy_version(document))
+        self._last_saved = json.loads(json.dumps(document))
+        self._loaded = True
+        return document
+
+    def save(self, document: Any, conflict: Optional[str] = None) -> int:
+        """
+        Save a document, appending only what changed since the last save.
+
+        Args:
+        document (Any): The document to save.
+        conflict (Optional[str]): How to settle fields that were also changed by
+            another writer: "ours", "theirs" or "raise" (see concurrency.py).
+
+        Returns:
+        int: The number of bytes written.
+        """
+        with self._lock, file_lock(self.snapshot_path):
+            current = json.loads(json.dumps(document))
+            self._refresh()
+            if self._base is not None:
+                merged = three_way_merge(self._base, current, self._last_saved, conflict or self.conflict)
+                self._base = current
+                current = merged
+            return self._save(current)
+
+    def _refresh(self) -> None:
+        """Reload the disk state if another writer changed it, remembering what we were based on."""
+        if self._loaded and self._stat() == self._snapshot_stat:
+            return
+        was_loaded, known, known_version = self._loaded, self._last_saved, self._version
+        self._load()
+        if (was_loaded and self._base is None and self._last_saved is not None
+                and self._version != known_version):
+            # Someone else saved since our last load or save
+            self._base = known if known is not None else {}
+
+    def compare_and_swap(self, document: Any, expected_version: int) -> int:
+        """
+        Save a document only if the version on disk is still expected_version.
+
+        Raises:
+        ConflictError: If another writer saved a different version first.
+        """
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            found = self._version
+            if found != expected_version:
+                raise ConflictError([f"version is {found}, expected {expected_version}"])
+            self._base = None
+            return self._save(json.loads(json.dumps(document)))
+
+    def update(self, mutate: Callable[[Any], Any]) -> Any:
+        """
+        Read, modify and write the document while holding its file lock.
+
+        mutate receives the current document and either changes it in place
+        or returns a replacement. Returns the saved document.
+        """
+        with self._lock, file_lock(self.snapshot_path):
+            self._base = None
+            document = self._load()
+            result = mutate(document)
+            if result is not None:
+                document = result
+            self._save(json.loads(json.dumps(document)))
+            return document
+
+    def _save(self, current: Any) -> int:
+        strip_legacy_version(current)
+        if self._last_saved is None:
+            return self._snapshot(current, self._version + 1)
+
+        ops = diff(self._last_saved, current)
+        if not ops:
+            return 0
+        version = self._version + 1
+
+        line = (json.dumps({"saved_at": datetime.now().isoformat(), "version": version, "ops": ops},
+                           separators=(',', ':')) + '\n').encode('utf-8')
+        if self._should_snapshot(len(line)):
+            return self._snapshot(current, version)
+
+        written = 0
+        if self._log_size == 0:
+            written += self._write_log_header()
+        written += append_bytes(self.log_path, line)
+        self._log_size += written
+        self._version = version
+        self._last_saved = current
+        self._snapshot_stat = self._stat()
+        return written
+
+    def replay_log(self, apply: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """
+        Feed the operations of each logged save to apply, without loading the snapshot.
+
+        Used by lazy loaders that read the snapshot themselves; a log that does
+        not belong to the snapshot on disk is ignored.
+        """
+        with self._lock:
+            if not os.path.exists(self.log_path):
+                return
+            with open(self.log_path, 'rb') as f:
+                try:
+                    header = json.loads(f.readline())
+                except json.JSONDecodeError:
+                    return
+                if header.get("base") != self._current_snapshot_hash():
+                    return
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    apply(entry["ops"])
+
+    def _current_snapshot_hash(self) -> Optional[str]:
+        """Hash the snapshot on disk, reusing the known hash if the file is unchanged."""
+        stat = self._stat()
+        if stat is not None and stat == self._snapshot_stat and self._snapshot_hash:
+            return self._snapshot_hash
+        digest = hashlib.sha1()
+        with open(self.snapshot_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _should_snapshot(self, pending: int) -> bool:
+        """Check if appending pending bytes would push the log past its limits."""
+        log_size = self._log_size + pending
+        return (log_size > self.max_log_bytes
+                or log_size > self.max_log_ratio * self._snapshot_size)
+
+    def _write_log_header(self) -> int:
+        """Start a new log tied to the current snapshot and its version."""
+        header = (json.dumps({"base": self._snapshot_hash, "version": self._version}) + '\n').encode('utf-8')
+        with open(self.log_path, 'wb') as f:
+            f.write(header)
+        return len(header)
+
+    def snapshot(self, document: Any) -> int:
+        """Write a full snapshot and discard the delta log."""
+        with self._lock, file_lock(self.snapshot_path):
+            current = json.loads(json.dumps(document))
+            strip_legacy_version(current)
+            return self._snapshot(current, self._version + 1)
+
+    def _snapshot(self, current: Any, version: int) -> int:
+        raw = self.serializer.dumps(current)
+        atomic_write(self.snapshot_path, raw)
+        self._last_saved = current
+        self._version = version
+        self._loaded = True
+        self._snapshot_size = len(raw)
+        self._snapshot_hash = hashlib.sha1(raw).hexdigest()
+        # A fresh log holding only the header records the snapshot's version
+        self._log_size = self._write_log_header()
+        self._snapshot_stat = self._stat()
+        return len(raw) + self._log_size
+
+    def delete(self) -> bool:
+        """Delete the snapshot and its log."""
+        with self._lock, file_lock(self.snapshot_path):
+            existed = self.exists()
+            for path in (self.snapshot_path, self.log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._last_saved = None
+            self._version = 0
+            self._base = None
+            self._snapshot_stat = None
+            self._loaded = True
+            return existed
+
+
+# One save file object per path so the last saved state is shared by callers
+_save_files: Dict[str, IncrementalSaveFile] = {}
+
+
+def get_save_file(path: str, serializer: Optional[Serializer] = None) -> IncrementalSaveFile:
+    """Get the shared incremental save file for a snapshot path."""
+    key = os.path.abspath(path)
+    if key not in _save_files:
+        _save_files[key] = IncrementalSaveFile(path, serializer=serializer)
+    elif serializer is not None:
+        _save_files[key].serializer = serializer
+    return _save_files[key]
+
+
+def load_document(path: str) -> Optional[Any]:
+    """Load a snapshot and its delta log from disk."""
+    return get_save_file(path).load()
+
+
+def save_document(path: str, document: Any) -> int:
+    """Save a document incrementally, returning the bytes written."""
+    return get_save_file(path).save(document)
@@ -1,28 +1,44 @@
 """
 Inventory Management System for RPG Game
+
+The module-level helpers work on a player name and load/save the save file
+for every call. Multi-step changes should go through a PlayerSession, which
+works on the in-memory player and writes the save once per committed
+transaction:
+
+Inventories are counted through item_catalog.Inventory, so membership and
+counts do not scan the inventory; list inventories from older saves are
+converted on first use. Read-only queries go through players.peek(), so
+they leave the heavy sections of a save (such as the conversation history)
+on disk.
+
+```python
+session = PlayerSession.open("strijder")
+if session.purchase("Ghost Blade Energy Sword", 12000):
+    print(session.player['resources']['credits'])
+```
 """
-from typing import Dict, List, Optional, Union
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+import copy
 import json
 import os
 
+from item_catalog import Inventory
+from player_repository import players
+
 def load_player_data(name: str) -> Optional[Dict]:
-    """Load player data from JSON file."""
+    """Load player data through the shared player repository."""
     try:
-        file_path = f"{name}.json"
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                return json.load(f)
+        return players.get(name)
     except Exception as e:
         print(f"Error loading player data: {e}")
     return None
 
 def save_player_data(player_data: Dict) -> bool:
-    """Save player data to JSON file."""
+    """Save player data through the shared player repository, returning False if the write failed."""
     try:
-        file_path = f"{player_data['name']}.json"
-        with open(file_path, 'w') as f:
-            json.dump(player_data, f, indent=4)
-        return True
+        return players.save(player_data, wait=True)
     except Exception as e:
         print(f"Error saving player data: {e}")
         return False
@@ -33,12 +49,7 @@ def add_item_to_inventory(player_name: str, item: str, quantity: int = 1) -> boo
     if not player_data:
         return False
     
-    if 'inventory' not in player_data:
-        player_data['inventory'] = []
-    
-    for _ in range(quantity):
-        player_data['inventory'].append(item)
-    
+    Inventory.of(player_data).add(item, quantity)
     return save_player_data(player_data)
 
 def remove_item_from_inventory(player_name: str, item: str, quantity: int = 1) -> bool:
@@ -47,32 +58,37 @@ def remove_item_from_inventory(player_name: str, item: str, quantity: int = 1) -
     if not player_data or 'inventory' not in player_data:
         return False
     
-    removed = 0
-    for _ in range(quantity):
-        if item in player_data['inventory']:
-            player_data['inventory'].remove(item)
-            removed += 1
-    
+    removed = Inventory.of(player_data).remove(item, quantity)
     if removed > 0:
         return save_player_data(player_data)
     return False
 
+def _peek_player(player_name: str) -> Optional[Mapping]:
+    """Get a read-only view of a player, without decoding the heavy parts of its save."""
+    try:
+        return players.peek(player_name)
+    except Exception as e:
+        print(f"Error loading player data: {e}")
+        return None
+
+def _inventory_of(player_name: str) -> Optional[Inventory]:
+    player_data = _peek_player(player_name)
+    return Inventory.of(player_data) if player_data else None
+
 def get_inventory(player_name: str) -> List[str]:
-    """Get the player's current inventory."""
-    player_data = load_player_data(player_name)
-    if player_data and 'inventory' in player_data:
-        return player_data['inventory']
-    return []
+    """Get the player's current inventory, one entry per copy."""
+    inventory = _inventory_of(player_name)
+    return inventory.entries() if inventory else []
 
 def has_item(player_name: str, item: str) -> bool:
     """Check if player has a specific item."""
-    inventory = get_inventory(player_name)
-    return item in inventory
+    inventory = _inventory_of(player_name)
+    return bool(inventory) and item in inventory
 
 def get_item_count(player_name: str, item: str) -> int:
     """Get the count of a specific item in inventory."""
-    inventory = get_inventory(player_name)
-    return inventory.count(item)
+    inventory = _inventory_of(player_name)
+    return inventory.count(item) if inventory else 0
 
 def modify_credits(player_name: str, amount: int) -> bool:
     """Modify player's credits (positive for adding, negative for subtracting)."""
@@ -94,24 +110,155 @@ def modify_credits(player_name: str, amount: int) -> bool:
 
 def can_afford(player_name: str, cost: int) -> bool:
     """Check if player can afford a purchase."""
-    player_data = load_player_data(player_name)
+    player_data = _peek_player(player_name)
     if not player_data or 'resources' not in player_data:
         return False
     return player_data['resources'].get('credits', 0) >= cost
 
 def purchase_item(player_name: str, item: str, cost: int) -> bool:
     """Handle a complete purchase transaction."""
-    if not can_afford(player_name, cost):
-        return False
-    
-    # First deduct credits
-    if not modify_credits(player_name, -cost):
+    session = PlayerSession.open(player_name)
+    if not session:
         return False
-    
-    # Then add item to inventory
-    if not add_item_to_inventory(player_name, item):
-        # Rollback credits if adding item fails
-        modify_credits(player_name, cost)
+    return session.purchase(item, cost)
+
+def purchase_items(player_name: str, purchases: List[Tuple[str, int]]) -> bool:
+    """Buy several (item, cost) pairs at once; either all succeed or none do."""
+    session = PlayerSession.open(player_name)
+    if not session:
         return False
-    
-    return True
+    return session.purchase_many(purchases)
+
+
+class Transaction:
+    """Handle for an open PlayerSession transaction."""
+    def __init__(self):
+        self.rolled_back = False
+
+    def rollback(self) -> None:
+        """Discard every change made since the transaction started."""
+        self.rolled_back = True
+
+
+class PlayerSession:
+    """
+    In-memory inventory and credits operations on a loaded player.
+
+    Changes made inside transaction() are applied to the player dict
+    immediately and either committed with a single save or rolled back in
+    memory. Operations called outside a transaction commit on their own.
+    """
+
+    # Player fields touched by session operations, snapshotted for rollback
+    TRANSACTION_FIELDS = ('resources', 'inventory')
+
+    def __init__(self, player_data: Dict, save: Callable[[Dict], bool] = None):
+        self.player = player_data
+        self._save = save or save_player_data
+        self._depth = 0
+
+    @classmethod
+    def open(cls, player_name: str, save: Callable[[Dict], bool] = None) -> Optional['PlayerSession']:
+        """Load a player from disk and start a session on it."""
+        player_data = load_player_data(player_name)
+        if not player_data:
+            return None
+        return cls(player_data, save)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Group several operations into one all-or-nothing change."""
+        outermost = self._depth == 0
+        snapshot = {
+            key: copy.deepcopy(self.player[key])
+            for key in self.TRANSACTION_FIELDS if key in self.player
+        }
+        transaction = Transaction()
+        self._depth += 1
+        try:
+            yield transaction
+        except Exception:
+            self._restore(snapshot)
+            raise
+        finally:
+            self._depth -= 1
+
+        if transaction.rolled_back:
+            self._restore(snapshot)
+        elif outermost:
+            if not self._save(self.player):
+                self._restore(snapshot)
+                transaction.rolled_back = True
+
+    def _restore(self, snapshot: Dict) -> None:
+        """Put the snapshotted fields back into the player."""
+        for key in self.TRANSACTION_FIELDS:
+            if key in snapshot:
+                self.player[key] = snapshot[key]
+            else:
+                self.player.pop(key, None)
+
+    @property
+    def credits(self) -> int:
+        """The player's current credits."""
+        return self.player.get('resources', {}).get('credits', 0)
+
+    def can_afford(self, cost: int) -> bool:
+        """Check if the player can afford a purchase."""
+        return self.credits >= cost
+
+    @property
+    def inventory(self) -> Inventory:
+        """The player's counted inventory."""
+        return Inventory.of(self.player)
+
+    def get_inventory(self) -> List[str]:
+        """Get the player's current inventory, one entry per copy."""
+        return self.inventory.entries()
+
+    def has_item(self, item: str) -> bool:
+        """Check if player has a specific item."""
+        return item in self.inventory
+
+    def get_item_count(self, item: str) -> int:
+        """Get the count of a specific item in inventory."""
+        return self.inventory.count(item)
+
+    def modify_credits(self, amount: int) -> bool:
+        """Modify credits (positive for adding, negative for subtracting)."""
+        with self.transaction() as transaction:
+            resources = self.player.setdefault('resources', {})
+            resources.setdefault('credits', 0)
+            if amount < 0 and abs(amount) > resources['credits']:
+                transaction.rollback()
+            else:
+                resources['credits'] += amount
+        return not transaction.rolled_back
+
+    def add_item(self, item: str, quantity: int = 1) -> bool:
+        """Add an item to the player's inventory."""
+        with self.transaction() as transaction:
+            self.inventory.add(item, quantity)
+        return not transaction.rolled_back
+
+    def remove_item(self, item: str, quantity: int = 1) -> bool:
+        """Remove up to quantity copies of an item from the inventory."""
+        with self.transaction() as transaction:
+            if self.inventory.remove(item, quantity) == 0:
+                transaction.rollback()
+        return not transaction.rolled_back
+
+    def purchase(self, item: str, cost: int) -> bool:
+        """Deduct the cost and add the item, saving once."""
+        return self.purchase_many([(item, cost)])
+
+    def purchase_many(self, purchases: List[Tuple[str, int]]) -> bool:
+        """Buy several (item, cost) pairs in one transaction and one save."""
+        with self.transaction() as transaction:
+            total = sum(cost for _, cost in purchases)
+            if not self.modify_credits(-total):
+                transaction.rollback()
+            else:
+                for item, _ in purchases:
+                    self.add_item(item)
+        return not transaction.rolled_back
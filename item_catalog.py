@@ -0,0 +1,228 @@
+"""
+Item Catalog Module
+=================
+
+Interned item definitions and counted inventories.
+
+Inventories used to be lists mixing plain names ("Medkit") and full
+Item.to_dict() dicts, so membership tests and counts scanned the whole list
+and every duplicate was stored again. The catalog now interns each distinct
+item once. Each definition gets an integer ID, and its name, type, rarity,
+attributes and value are computed once and shared by every inventory in the
+process.
+
+An inventory is a multiset: a JSON object that maps an item key to a count.
+The key of a named item is its name. The key of a full item is the compact
+canonical JSON of its dict, so attributes and value survive a save. Lookups,
+counts, additions and removals are O(1), and a thousand Stim Packs cost as
+much as one.
+
+Saves with list inventories are converted the first time Inventory.of()
+sees them. The conversion is loss-free: every entry is kept and counted, in
+order of first appearance.
+
+Usage:
+-----
+```python
+inventory = Inventory.of(player)          # Converts a list inventory in place
+inventory.add("Stim Packs", 3)
+inventory.add(generate_random_item("Rare"))
+if inventory.count("Stim Packs") >= 2:
+    inventory.remove("Stim Packs", 2)
+print(format_inventory(player))           # "Stim Packs, Phase Blade (Rare)"
+definition = CATALOG[CATALOG.intern("Stim Packs")]
+```
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from items import RARITY_VALUE_MULTIPLIERS, Item
+
+# A plain name, an Item.to_dict() dict or an Item
+ItemLike = Union[str, Dict[str, Any], Item]
+
+
+@dataclass(frozen=True)
+class ItemDefinition:
+    """One interned item."""
+    id: int
+    key: str
+    name: str
+    item_type: Optional[str]
+    rarity: Optional[str]
+    attributes: Tuple[Tuple[str, Any], ...]
+    value: int
+    entry: Union[str, Dict[str, Any]]  # The inventory entry it was interned from
+
+    @property
+    def label(self) -> str:
+        """Display name, with the rarity of full items."""
+        return f"{self.name} ({self.rarity})" if self.rarity else self.name
+
+
+def item_key(item: ItemLike) -> str:
+    """Get the inventory key of an item."""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, Item):
+        item = item.to_dict()
+    return json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def _entry_of_key(key: str) -> Union[str, Dict[str, Any]]:
+    """Turn an inventory key back into the entry it stands for."""
+    if key.startswith('{'):
+        try:
+            entry = json.loads(key)
+            if isinstance(entry, dict):
+                return entry
+        except ValueError:
+            pass
+    return key
+
+
+def _value_of(entry: Dict[str, Any]) -> int:
+    """Value of a full item, computed as Item does when it was not stored."""
+    if isinstance(entry.get("value"), (int, float)):
+        return int(entry["value"])
+    attributes = entry.get("attributes") or {}
+    base = RARITY_VALUE_MULTIPLIERS.get(entry.get("rarity"), 0) * 100
+    return base + sum(v for v in attributes.values() if isinstance(v, (int, float)))
+
+
+class ItemCatalog:
+    """Interns item definitions and hands out integer IDs."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._definitions: List[ItemDefinition] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._definitions)
+
+    def __getitem__(self, item_id: int) -> ItemDefinition:
+        return self._definitions[item_id]
+
+    def find(self, item: ItemLike) -> Optional[int]:
+        """Get the ID of an item without interning it."""
+        return self._ids.get(item_key(item))
+
+    def intern(self, item: ItemLike) -> int:
+        """Get the ID of an item, adding its definition on first sight."""
+        return self.intern_key(item_key(item))
+
+    def intern_key(self, key: str) -> int:
+        """Get the ID of an inventory key, adding its definition on first sight."""
+        item_id = self._ids.get(key)
+        if item_id is not None:
+            return item_id
+        with self._lock:
+            if key not in self._ids:
+                self._definitions.append(self._define(len(self._definitions), key))
+                self._ids[key] = len(self._definitions) - 1
+            return self._ids[key]
+
+    def definition(self, item: ItemLike) -> ItemDefinition:
+        """Get the interned definition of an item."""
+        return self._definitions[self.intern(item)]
+
+    @staticmethod
+    def _define(item_id: int, key: str) -> ItemDefinition:
+        entry = _entry_of_key(key)
+        if isinstance(entry, str):
+            return ItemDefinition(item_id, key, entry, None, None, (), 0, entry)
+        attributes = entry.get("attributes") or {}
+        return ItemDefinition(item_id, key, str(entry.get("name", key)), entry.get("type"),
+                              entry.get("rarity"), tuple(attributes.items()), _value_of(entry), entry)
+
+
+# The catalog shared by every inventory in the process
+CATALOG = ItemCatalog()
+
+
+def migrate_inventory(entries: List[ItemLike]) -> Dict[str, int]:
+    """Count a list inventory into the keyed form, keeping every entry."""
+    counts: Dict[str, int] = {}
+    for entry in entries:
+        key = item_key(entry)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class Inventory:
+    """A counted view over an inventory dict of item key -> count."""
+
+    def __init__(self, counts: Dict[str, int], catalog: ItemCatalog = CATALOG):
+        self.counts = counts
+        self.catalog = catalog
+
+    @classmethod
+    def of(cls, player: Dict[str, Any], catalog: ItemCatalog = CATALOG) -> 'Inventory':
+        """Get a player's inventory, converting a list inventory in place."""
+        inventory = player.get('inventory')
+        if not isinstance(inventory, dict):
+            inventory = player['inventory'] = migrate_inventory(inventory or [])
+        return cls(inventory, catalog)
+
+    def __contains__(self, item: ItemLike) -> bool:
+        return item_key(item) in self.counts
+
+    def __len__(self) -> int:
+        """Number of distinct items."""
+        return len(self.counts)
+
+    def __iter__(self) -> Iterator[Tuple[ItemDefinition, int]]:
+        for key, count in self.counts.items():
+            yield self.catalog[self.catalog.intern_key(key)], count
+
+    def count(self, item: ItemLike) -> int:
+        """Number of copies of an item."""
+        return self.counts.get(item_key(item), 0)
+
+    def total(self) -> int:
+        """Number of items, copies included."""
+        return sum(self.counts.values())
+
+    def add(self, item: ItemLike, quantity: int = 1) -> int:
+        """Add copies of an item, returning its catalog ID."""
+        key = item_key(item)
+        if quantity > 0:
+            self.counts[key] = self.counts.get(key, 0) + quantity
+        return self.catalog.intern_key(key)
+
+    def remove(self, item: ItemLike, quantity: int = 1) -> int:
+        """Remove up to quantity copies of an item, returning how many were removed."""
+        key = item_key(item)
+        held = self.counts.get(key, 0)
+        removed = min(held, max(quantity, 0))
+        if removed == held and removed:
+            del self.counts[key]
+        elif removed:
+            self.counts[key] = held - removed
+        return removed
+
+    def ids(self) -> Dict[int, int]:
+        """The inventory as catalog ID -> count."""
+        return {self.catalog.intern_key(key): count for key, count in self.counts.items()}
+
+    def entries(self) -> List[Union[str, Dict[str, Any]]]:
+        """The inventory as a list with one entry per copy, as it was stored before."""
+        return [definition.entry for definition, count in self for _ in range(count)]
+
+    def labels(self) -> List[str]:
+        """Display names, with counts above one."""
+        return [definition.label if count == 1 else f"{definition.label} x{count}"
+                for definition, count in self]
+
+    def value(self) -> int:
+        """Total value of the inventory."""
+        return sum(definition.value * count for definition, count in self)
+
+
+def format_inventory(player: Dict[str, Any]) -> str:
+    """Format a player's inventory for display."""
+    return ', '.join(Inventory.of(player).labels())
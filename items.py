@@ -3,7 +3,9 @@ Module for handling items, equipment, and rewards in the RPG game.
 """
 import random
 import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 # Item rarity levels and their probabilities
 RARITY_LEVELS = {
@@ -60,6 +62,42 @@ ITEM_TYPES = {
     }
 }
 
+# Value multiplier of each rarity
+RARITY_VALUE_MULTIPLIERS = {
+    "Common": 1,
+    "Uncommon": 2,
+    "Rare": 5,
+    "Epic": 10,
+    "Legendary": 25
+}
+
+# Treasure size and minimum item rarity per difficulty
+DIFFICULTY_SETTINGS = {
+    "Easy": {"items": (1, 3), "min_rarity": "Common"},
+    "Normal": {"items": (2, 4), "min_rarity": "Uncommon"},
+    "Hard": {"items": (3, 5), "min_rarity": "Rare"},
+    "Epic": {"items": (4, 6), "min_rarity": "Epic"}
+}
+
+# Credit and experience multiplier of quest rewards per difficulty
+DIFFICULTY_MULTIPLIERS = {
+    "Easy": 1,
+    "Normal": 2,
+    "Hard": 3,
+    "Epic": 5
+}
+
+TREASURE_ADJECTIVES = ["Ancient", "Hidden", "Secret", "Lost", "Forgotten"]
+TREASURE_TYPES = ["Cache", "Vault", "Stash", "Trove", "Hoard"]
+
+SPECIAL_REWARDS = [
+    "map_fragment",
+    "rare_blueprint",
+    "faction_reputation",
+    "special_weapon",
+    "unique_ability"
+]
+
 class Item:
     def __init__(self, name: str, item_type: str, rarity: str, attributes: Dict = None):
         self.name = name
@@ -70,14 +108,7 @@ class Item:
         
     def _calculate_value(self) -> int:
         """Calculate item value based on rarity and attributes."""
-        rarity_multiplier = {
-            "Common": 1,
-            "Uncommon": 2,
-            "Rare": 5,
-            "Epic": 10,
-            "Legendary": 25
-        }
-        base_value = rarity_multiplier[self.rarity] * 100
+        base_value = RARITY_VALUE_MULTIPLIERS[self.rarity] * 100
         attr_value = sum(self.attributes.values()) if self.attributes else 0
         return base_value + attr_value
 
@@ -91,35 +122,105 @@ class Item:
             "value": self.value
         }
 
+def _alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """Build a Vose alias table: column i keeps itself with probability prob[i], else alias[i]."""
+    count = len(weights)
+    total = sum(weights)
+    scaled = [w * count / total for w in weights]
+    prob, alias = [1.0] * count, list(range(count))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less], alias[less] = scaled[less], more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return prob, alias
+
+class LootTable:
+    """
+    Item generation compiled once from rarity weights and item types.
+
+    Rarities are drawn in O(1) from an alias table per minimum rarity, and
+    draw_many() generates a batch of items with one NumPy call per column.
+    Without a seed, draws use the random module (and batches are seeded from
+    it), so random.seed() still makes loot reproducible.
+    """
+
+    def __init__(self, rarity_levels: Dict[str, float] = RARITY_LEVELS,
+                 item_types: Dict[str, Dict] = ITEM_TYPES, seed: Optional[int] = None):
+        self.rarities = tuple(rarity_levels)
+        self.rarity_index = {rarity: i for i, rarity in enumerate(self.rarities)}
+        self.types = tuple(item_types)
+        self.attributes = tuple(tuple(item_types[t].get("attributes", ())) for t in self.types)
+        # names[type][rarity] -> example names
+        self.names = tuple(tuple(tuple(item_types[t]["examples"][r]) for r in self.rarities)
+                           for t in self.types)
+
+        weights = [rarity_levels[r] for r in self.rarities]
+        # Alias tables over rarities[i:] for every minimum rarity index i
+        self._alias = [_alias_table(weights[i:]) for i in range(len(self.rarities))]
+        self._alias_arrays = [(np.array(prob), np.array(alias)) for prob, alias in self._alias]
+        self._name_counts = np.array([[len(names) for names in by_rarity] for by_rarity in self.names])
+
+        self.rng = random.Random(seed) if seed is not None else random
+        self.generator = np.random.default_rng(seed) if seed is not None else None
+
+    def _minimum(self, min_rarity: str) -> int:
+        if min_rarity not in self.rarity_index:
+            raise ValueError(f"Unknown rarity: {min_rarity}")
+        return self.rarity_index[min_rarity]
+
+    def draw_rarity(self, min_rarity: str = "Common") -> int:
+        """Draw the index of a rarity at least min_rarity."""
+        offset = self._minimum(min_rarity)
+        prob, alias = self._alias[offset]
+        x = self.rng.random() * len(prob)
+        column = int(x)
+        return offset + (column if x - column < prob[column] else alias[column])
+
+    def draw(self, min_rarity: str = "Common") -> Item:
+        """Generate one item with a rarity at least min_rarity."""
+        rarity = self.draw_rarity(min_rarity)
+        uniform = self.rng.random
+        type_index = int(uniform() * len(self.types))
+        names = self.names[type_index][rarity]
+        name = names[int(uniform() * len(names))]
+        multiplier = rarity + 1
+        attributes = {attr: (int(uniform() * 10) + 1) * multiplier for attr in self.attributes[type_index]}
+        return Item(name, self.types[type_index], self.rarities[rarity], attributes)
+
+    def draw_many(self, count: int, min_rarity: str = "Common") -> List[Item]:
+        """Generate count items with a rarity at least min_rarity."""
+        offset = self._minimum(min_rarity)
+        generator = self.generator or np.random.default_rng(self.rng.getrandbits(64))
+        prob, alias = self._alias_arrays[offset]
+
+        x = generator.random(count) * len(prob)
+        column = x.astype(np.intp)
+        rarities = offset + np.where(x - column < prob[column], column, alias[column])
+        types = generator.integers(0, len(self.types), count)
+        names = (generator.random(count) * self._name_counts[types, rarities]).astype(np.intp)
+        width = max(len(attrs) for attrs in self.attributes)
+        values = generator.integers(1, 11, (count, width)) * (rarities[:, None] + 1)
+
+        items = []
+        for rarity, type_index, name, row in zip(rarities.tolist(), types.tolist(),
+                                                 names.tolist(), values.tolist()):
+            attributes = dict(zip(self.attributes[type_index], row))
+            items.append(Item(self.names[type_index][rarity][name], self.types[type_index],
+                              self.rarities[rarity], attributes))
+        return items
+
+LOOT_TABLE = LootTable()
+
 def generate_random_item(min_rarity: str = "Common") -> Item:
     """Generate a random item with specified minimum rarity."""
-    # Filter rarities based on minimum
-    rarities = list(RARITY_LEVELS.keys())
-    min_idx = rarities.index(min_rarity)
-    possible_rarities = rarities[min_idx:]
-    
-    # Select rarity based on weighted probabilities
-    rarity = random.choices(
-        possible_rarities,
-        [RARITY_LEVELS[r] for r in possible_rarities]
-    )[0]
-    
-    # Select item type and generate attributes
-    item_type = random.choice(list(ITEM_TYPES.keys()))
-    item_data = ITEM_TYPES[item_type]
-    
-    # Generate name from examples or create a new one
-    name = random.choice(item_data["examples"][rarity])
-    
-    # Generate random attributes
-    attributes = {}
-    if "attributes" in item_data:
-        for attr in item_data["attributes"]:
-            base_value = random.randint(1, 10)
-            rarity_multiplier = rarities.index(rarity) + 1
-            attributes[attr] = base_value * rarity_multiplier
-    
-    return Item(name, item_type, rarity, attributes)
+    return LOOT_TABLE.draw(min_rarity)
+
+def generate_random_items(count: int, min_rarity: str = "Common") -> List[Item]:
+    """Generate a batch of random items with specified minimum rarity."""
+    return LOOT_TABLE.draw_many(count, min_rarity)
 
 class Treasure:
     def __init__(self, name: str, description: str, contents: List[Item], location: Dict[str, float]):
@@ -143,22 +244,14 @@ class Treasure:
 
 def generate_treasure(difficulty: str = "Normal") -> Treasure:
     """Generate a treasure with appropriate rewards based on difficulty."""
-    difficulty_settings = {
-        "Easy": {"items": (1, 3), "min_rarity": "Common"},
-        "Normal": {"items": (2, 4), "min_rarity": "Uncommon"},
-        "Hard": {"items": (3, 5), "min_rarity": "Rare"},
-        "Epic": {"items": (4, 6), "min_rarity": "Epic"}
-    }
-    
-    settings = difficulty_settings[difficulty]
+    settings = DIFFICULTY_SETTINGS[difficulty]
     num_items = random.randint(*settings["items"])
     
     # Generate items
-    items = [generate_random_item(settings["min_rarity"]) for _ in range(num_items)]
+    items = generate_random_items(num_items, settings["min_rarity"])
     
     # Generate treasure name and description
-    treasure_types = ["Cache", "Vault", "Stash", "Trove", "Hoard"]
-    treasure_name = f"{random.choice(['Ancient', 'Hidden', 'Secret', 'Lost', 'Forgotten'])} {random.choice(treasure_types)}"
+    treasure_name = f"{random.choice(TREASURE_ADJECTIVES)} {random.choice(TREASURE_TYPES)}"
     description = f"A {difficulty.lower()} difficulty treasure containing {num_items} items."
     
     # Random location in 3D space
@@ -172,10 +265,8 @@ def generate_treasure(difficulty: str = "Normal") -> Treasure:
 
 def add_item_to_inventory(player: Dict, item: Item) -> None:
     """Add an item to the player's inventory."""
-    if "inventory" not in player:
-        player["inventory"] = []
-    
-    player["inventory"].append(item.to_dict())
+    from item_catalog import Inventory
+    Inventory.of(player).add(item)
     print(f"\nAcquired: {item.name} ({item.rarity})")
     if item.attributes:
         print("Attributes:")
@@ -195,34 +286,16 @@ def add_credits(player: Dict, amount: int) -> None:
 
 def generate_quest_reward(difficulty: str = "Normal") -> Dict:
     """Generate a quest reward including items, credits, and possibly special rewards."""
-    difficulty_multiplier = {
-        "Easy": 1,
-        "Normal": 2,
-        "Hard": 3,
-        "Epic": 5
-    }
-    
-    multiplier = difficulty_multiplier[difficulty]
+    multiplier = DIFFICULTY_MULTIPLIERS[difficulty]
     
     reward = {
         "credits": random.randint(100, 500) * multiplier,
-        "items": [generate_random_item(difficulty_settings[difficulty]["min_rarity"])
-                 for difficulty_settings in [{"Easy": {"min_rarity": "Common"},
-                                           "Normal": {"min_rarity": "Uncommon"},
-                                           "Hard": {"min_rarity": "Rare"},
-                                           "Epic": {"min_rarity": "Epic"}}]],
+        "items": [generate_random_item(DIFFICULTY_SETTINGS[difficulty]["min_rarity"])],
         "experience": random.randint(50, 200) * multiplier
     }
     
     # Chance for special reward
     if random.random() < 0.2:  # 20% chance
-        special_rewards = [
-            "map_fragment",
-            "rare_blueprint",
-            "faction_reputation",
-            "special_weapon",
-            "unique_ability"
-        ]
-        reward["special_reward"] = random.choice(special_rewards)
+        reward["special_reward"] = random.choice(SPECIAL_REWARDS)
     
     return reward
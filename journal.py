@@ -0,0 +1,319 @@
+"""
+Journal Module
+==============
+
+Append-only JSONL journals for unbounded histories such as NPC conversation
+logs and story progression.
+
+Each journal is a plain text file holding one JSON document per line. Appending
+an entry writes a single line at the end of the file, so the cost of an append
+does not depend on how long the history already is. Reading the most recent
+entries walks the file backwards block by block and never parses the older
+part of the history.
+
+RotatingJournal adds size-based rotation for logs that are only ever read as
+a stream: once the active file passes max_bytes it is renamed to a numbered
+archive, optionally compressed, and the oldest archives beyond max_archives
+are dropped.
+
+Usage:
+-----
+```python
+append_entry("npcs/eva.conversation_history.jsonl", {"content": "Hello"})
+recent = read_tail("npcs/eva.conversation_history.jsonl", 3)
+kept = compact("npcs/eva.conversation_history.jsonl", keep_last=500)
+
+log = RotatingJournal("characters/ab/cd/vex.history.jsonl", compression="gzip")
+log.append({"timestamp": "2024-01-01T00:00:00", "stats": {"location": "docks"}})
+docks = list(log.iter_entries(since="2024-01-01", match={"stats.location": "docks"}))
+```
+"""
+
+import gzip
+import json
+import lzma
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from persistence_writer import append_bytes
+
+# Size of the blocks read from the end of a journal by read_tail
+TAIL_BLOCK_SIZE = 8192
+
+# Rotate a RotatingJournal once its active file is larger than this
+DEFAULT_ROTATE_BYTES = 1024 * 1024
+
+# Archive compressions: file suffix and opener of each
+ARCHIVE_COMPRESSIONS = {
+    None: ("", open),
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+}
+
+
+def _encode(entry: Dict[str, Any]) -> bytes:
+    """Encode a journal entry as a single newline-terminated line."""
+    return (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    """Decode a journal line, returning None for blank or torn lines."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+
+
+def append_entry(path: str, entry: Dict[str, Any]) -> None:
+    """Append a single entry to the journal at path."""
+    append_entries(path, [entry])
+
+
+def encode_entries(entries: Iterable[Dict[str, Any]]) -> bytes:
+    """Encode entries as the lines append_entries would write."""
+    return b''.join(_encode(entry) for entry in entries)
+
+
+def _ends_torn(path: str) -> bool:
+    """Whether the journal's last line lacks its newline, as after a crash mid-append."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+    except FileNotFoundError:
+        return False
+
+
+def append_lines(path: str, payload: bytes) -> int:
+    """
+    Append encoded lines to the journal at path.
+
+    A last line left without its newline by a crash mid-append is terminated
+    first, so it stays a separate torn line that readers skip instead of
+    running into the new entries.
+
+    Args:
+    path (str): The journal file.
+    payload (bytes): Lines as returned by encode_entries.
+
+    Returns:
+    int: The number of bytes written.
+    """
+    if _ends_torn(path):
+        payload = b'\n' + payload
+    return append_bytes(path, payload)
+
+
+def append_entries(path: str, entries: Iterable[Dict[str, Any]]) -> None:
+    """Append several entries to the journal at path with one write."""
+    payload = encode_entries(entries)
+    if not payload:
+        return
+    append_lines(path, payload)
+
+
+def iter_entries(path: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over all entries of a journal, oldest first."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            entry = _decode(line)
+            if entry is not None:
+                yield entry
+
+
+def read_tail(path: str, count: int) -> List[Dict[str, Any]]:
+    """Return the last count entries of a journal, oldest first."""
+    if count <= 0 or not os.path.exists(path):
+        return []
+
+    entries: List[Dict[str, Any]] = []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0 and len(entries) < count:
+            read_size = min(TAIL_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b'\n')
+            # The first piece may be the end of a line that starts in an earlier block
+            remainder = lines.pop(0) if position > 0 else b''
+            for line in reversed(lines):
+                entry = _decode(line)
+                if entry is not None:
+                    entries.append(entry)
+                    if len(entries) == count:
+                        break
+
+    entries.reverse()
+    return entries
+
+
+def count_entries(path: str) -> int:
+    """Count the entries of a journal without keeping them in memory."""
+    return sum(1 for _ in iter_entries(path))
+
+
+def compact(path: str, keep_last: Optional[int] = None) -> int:
+    """
+    Rewrite a journal offline, dropping torn lines and optionally old entries.
+
+    Args:
+    path (str): The journal to compact.
+    keep_last (Optional[int]): Keep only this many of the most recent entries.
+
+    Returns:
+    int: The number of entries left in the journal.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    if keep_last is None:
+        entries = list(iter_entries(path))
+    else:
+        entries = read_tail(path, keep_last)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(b''.join(_encode(entry) for entry in entries))
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def _field(entry: Dict[str, Any], dotted: str) -> Any:
+    """Look up a dotted field such as "stats.location" in an entry."""
+    value: Any = entry
+    for part in dotted.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class RotatingJournal:
+    """An append-only journal that rotates into numbered, optionally compressed archives."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_ROTATE_BYTES,
+                 compression: Optional[str] = None, max_archives: Optional[int] = None):
+        if compression not in ARCHIVE_COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.max_archives = max_archives
+        self._base = path[:-len(".jsonl")] if path.endswith(".jsonl") else path
+        self._archive_name = re.compile(
+            re.escape(os.path.basename(self._base)) + r"\.(\d+)\.jsonl(\.gz|\.xz)?$")
+        self._size: Optional[int] = None
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Append an entry, rotating first if the active file is full."""
+        self.append_encoded(_encode(entry))
+
+    def append_encoded(self, payload: bytes) -> None:
+        """Append lines produced by encode_entries."""
+        if self._size is None:
+            self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            # Only a previous process can have left a torn last line
+            if _ends_torn(self.path):
+                payload = b'\n' + payload
+        if self._size and self._size + len(payload) > self.max_bytes:
+            self.rotate()
+            payload = payload.lstrip(b'\n')
+        self._size += append_bytes(self.path, payload)
+
+    def archives(self) -> List[str]:
+        """List the archive files, oldest first."""
+        directory = os.path.dirname(self.path) or "."
+        if not os.path.isdir(directory):
+            return []
+        numbered = []
+        for filename in os.listdir(directory):
+            found = self._archive_name.match(filename)
+            if found:
+                numbered.append((int(found.group(1)), os.path.join(directory, filename)))
+        return [path for _, path in sorted(numbered)]
+
+    def rotate(self) -> Optional[str]:
+        """Move the active file into a new archive, returning the archive path."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+
+        archives = self.archives()
+        number = int(self._archive_name.match(os.path.basename(archives[-1])).group(1)) + 1 if archives else 1
+        suffix, opener = ARCHIVE_COMPRESSIONS[self.compression]
+        archive = f"{self._base}.{number:06d}.jsonl{suffix}"
+
+        if self.compression is None:
+            os.replace(self.path, archive)
+        else:
+            temp_path = f"{archive}.tmp"
+            with open(self.path, 'rb') as source, opener(temp_path, 'wb') as target:
+                while True:
+                    block = source.read(TAIL_BLOCK_SIZE * 8)
+                    if not block:
+                        break
+                    target.write(block)
+            os.replace(temp_path, archive)
+            os.remove(self.path)
+        self._size = 0
+
+        if self.max_archives is not None:
+            archives.append(archive)
+            for old in archives[:-self.max_archives] if self.max_archives else archives:
+                os.remove(old)
+        return archive
+
+    def _iter_file(self, path: str) -> Iterator[Dict[str, Any]]:
+        """Iterate over the entries of the active file or an archive."""
+        opener = gzip.open if path.endswith(".gz") else lzma.open if path.endswith(".xz") else open
+        try:
+            with opener(path, 'rb') as f:
+                for line in f:
+                    entry = _decode(line)
+                    if entry is not None:
+                        yield entry
+        except FileNotFoundError:
+            # Rotated or dropped while we were reading
+            return
+
+    def iter_entries(self, since: Optional[str] = None, until: Optional[str] = None,
+                     match: Optional[Dict[str, Any]] = None,
+                     predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                     time_field: str = "timestamp") -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over all entries, oldest first, archives included.
+
+        Args:
+        since (Optional[str]): Skip entries whose timestamp sorts before this (ISO format).
+        until (Optional[str]): Stop at the first entry whose timestamp sorts after this.
+        match (Optional[Dict[str, Any]]): Dotted fields that must have the given values.
+        predicate (Optional[Callable]): Keeps only entries it accepts.
+        time_field (str): The field holding the entry's ISO timestamp.
+
+        Yields:
+        Dict[str, Any]: The matching entries, one at a time.
+        """
+        for path in self.archives() + [self.path]:
+            for entry in self._iter_file(path):
+                timestamp = entry.get(time_field, "")
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp > until:
+                    # Entries are appended in time order, nothing later can match
+                    return
+                if match and any(_field(entry, key) != value for key, value in match.items()):
+                    continue
+                if predicate is not None and not predicate(entry):
+                    continue
+                yield entry
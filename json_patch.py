@@ -0,0 +1,96 @@
+"""
+JSON Patch Module
+===============
+
+Structural diffs between JSON documents.
+
+diff produces JSON-Patch-like operations ("add", "remove", "replace")
+addressed with JSON Pointer paths, and apply_patch applies them. Appending
+to a list, the most common change for histories and logs, becomes a single
+"add" at "/-". Used by the incremental saves (incremental_save.py) and by
+the merge of concurrent changes (concurrency.py).
+"""
+
+from typing import Any, Dict, List
+
+
+def _escape(key: str) -> str:
+    """Escape a key for use in a JSON Pointer."""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    """Undo JSON Pointer escaping."""
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Compute the operations that turn old into new.
+
+    Args:
+    old (Any): The previously saved JSON value.
+    new (Any): The JSON value about to be saved.
+    path (str): JSON Pointer of the values being compared.
+
+    Returns:
+    List[Dict[str, Any]]: Operations for apply_patch, empty if nothing changed.
+    """
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+
+    if isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff(old[key], value, child))
+        return ops
+
+    if isinstance(new, list):
+        if len(new) == len(old):
+            ops = []
+            for index, (old_item, new_item) in enumerate(zip(old, new)):
+                ops.extend(diff(old_item, new_item, f"{path}/{index}"))
+            return ops
+        if len(new) > len(old) and new[:len(old)] == old:
+            return [{"op": "add", "path": f"{path}/-", "value": item} for item in new[len(old):]]
+        return [{"op": "replace", "path": path, "value": new}]
+
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def apply_patch(document: Any, ops: List[Dict[str, Any]]) -> Any:
+    """Apply operations produced by diff to a document, returning the result."""
+    for op in ops:
+        if op["path"] == "":
+            document = op["value"]
+            continue
+
+        tokens = [_unescape(token) for token in op["path"].split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if op["op"] == "add" and last == '-':
+                parent.append(op["value"])
+            elif op["op"] == "add":
+                parent.insert(int(last), op["value"])
+            elif op["op"] == "remove":
+                del parent[int(last)]
+            else:
+                parent[int(last)] = op["value"]
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = op["value"]
+    return document
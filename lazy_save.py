@@ -0,0 +1,295 @@
+"""
+Lazy Save Module
+==============
+
+Lazy, streaming loads of large saves.
+
+Saves written with the sections codec (see serializers.py) start with a
+table of contents, so a reader can decode the small core fields of a save
+and leave heavy sections (conversation history, NPC snapshots, activity
+logs, discovered locations) on disk until they are first used:
+
+- LazyDocument is a mapping whose heavy values are loaded on first access;
+  `in`, len() and iteration over keys never load anything.
+- Large dictionaries are nested tables and become nested LazyDocuments,
+  unless they are heavy themselves (such as npcs) and deferred whole.
+- iter_section streams the items of a heavy list one at a time, reading
+  and decompressing the file in blocks, so a multi-megabyte history is
+  never held in memory at once.
+- Changes from the delta log of an incremental save are kept per section
+  and applied when that section is loaded.
+
+Saves in any other format are loaded eagerly and wrapped, so callers do not
+need to know how a save was written. No file stays open between reads: each
+deferred section opens the snapshot when it is loaded and fails with a
+SerializationError if the snapshot was replaced in the meantime. Use
+materialize() to get a plain dictionary.
+
+Usage:
+-----
+```python
+save = load_lazy("characters/ab/cd/strijder.json")
+level = save['character']['level']                  # Reads the core fields only
+for message in save.iter_section('conversation_history'):
+    ...                                             # Streams the history
+```
+"""
+
+import json
+import os
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import serializers
+from concurrency import LEGACY_VERSION_FIELD
+from incremental_save import apply_patch, get_save_file
+from serializers import (HEADER_SIZE, SECTION_JSON, SECTION_LINES, SECTION_TABLE,
+                         DEFAULT_HEAVY_SECTIONS, SerializationError, Serializer)
+
+# Bytes read from disk at a time while streaming a section
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# JSON sections up to this size are decoded with the core fields
+EAGER_SECTION_BYTES = 16 * 1024
+
+
+class _SaveFile:
+    """
+    A snapshot file shared by the sections of one LazyDocument tree.
+
+    The file is not held open: each section read opens it again and checks
+    that it is still the snapshot the table of contents was read from.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.identity = self._identity(os.stat(path))
+        self.closed = False
+
+    @staticmethod
+    def _identity(stat: os.stat_result) -> tuple:
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def open(self) -> Iterator[Any]:
+        """Open the snapshot for a series of reads."""
+        if self.closed:
+            raise ValueError(f"{self.path} was closed")
+        with open(self.path, 'rb') as f:
+            if self._identity(os.fstat(f.fileno())) != self.identity:
+                raise SerializationError(f"{self.path} was replaced since it was opened; load it again")
+            yield f
+
+    def read(self, offset: int, size: int, f=None) -> bytes:
+        """Read size bytes at offset, from f if the snapshot is already open."""
+        if f is None:
+            with self.open() as f:
+                return self.read(offset, size, f)
+        f.seek(offset)
+        return f.read(size)
+
+    def close(self) -> None:
+        """Refuse further reads."""
+        self.closed = True
+
+
+class _Section:
+    """A section that has not been read yet, with the changes waiting for it."""
+
+    def __init__(self, source: _SaveFile, kind: str, offset: int, size: int,
+                 compression: Optional[str]):
+        self.source = source
+        self.kind = kind
+        self.offset = offset
+        self.size = size
+        self.compression = compression
+        self.pending: List[Dict[str, Any]] = []
+
+    def iter_lines(self) -> Iterator[Any]:
+        """Stream the items of a lines section from disk."""
+        decompress = serializers.decompressor(self.compression)
+        position, end = self.offset, self.offset + self.size
+        remainder = b''
+        with self.source.open() as f:
+            while position < end:
+                block = self.source.read(position, min(STREAM_BLOCK_SIZE, end - position), f)
+                position += len(block)
+                if decompress is not None:
+                    block = decompress.decompress(block)
+                lines = (remainder + block).split(b'\n')
+                remainder = lines.pop()
+                for line in lines:
+                    if line:
+                        yield json.loads(line)
+        if remainder:
+            yield json.loads(remainder)
+
+    def load(self) -> Any:
+        """Read and decode the section, then apply the changes waiting for it."""
+        if self.kind == SECTION_LINES:
+            value = list(self.iter_lines())
+        else:
+            body = self.source.read(self.offset, self.size)
+            value = serializers.decode_section(self.kind, body, self.compression)
+        return apply_patch(value, self.pending) if self.pending else value
+
+
+def _reroot(op: Dict[str, Any], tokens: List[str]) -> Dict[str, Any]:
+    """Copy an operation with its path made relative to a section."""
+    path = ''.join('/' + token.replace('~', '~0').replace('/', '~1') for token in tokens)
+    return dict(op, path=path)
+
+
+class LazyDocument(MutableMapping):
+    """A save whose heavy sections are read from disk on first access."""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self._data: Dict[str, Any] = dict(data or {})
+        self._lazy: Dict[str, _Section] = {}
+        self._source: Optional[_SaveFile] = None
+
+    @classmethod
+    def _open_table(cls, source: _SaveFile, start: int, heavy, f) -> 'LazyDocument':
+        """Read a section table at start from the open snapshot f, decoding the small sections right away."""
+        prefix = source.read(start, 10, f)
+        length, used = serializers._read_varint(prefix, 0)
+        table_start = start + used
+        entries, _ = serializers.read_section_table(
+            prefix[:used] + source.read(table_start, length, f))
+        data_start = table_start + length
+
+        document = cls()
+        document._source = source
+        for key, kind, offset, size, compression in entries:
+            if kind == SECTION_TABLE and key not in heavy:
+                document._data[key] = cls._open_table(source, data_start + offset, heavy, f)
+            elif kind == SECTION_JSON and key not in heavy and size <= EAGER_SECTION_BYTES:
+                body = source.read(data_start + offset, size, f)
+                document._data[key] = serializers.decode_section(kind, body, compression)
+            else:
+                document._lazy[key] = _Section(source, kind, data_start + offset, size, compression)
+        return document
+
+    # --- Mapping ---
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._lazy:
+            self._data[key] = self._lazy.pop(key).load()
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._drop_lazy(key)
+        self._data[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._lazy:
+            self._drop_lazy(key)
+        else:
+            del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data or key in self._lazy
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._data)
+        yield from list(self._lazy)
+
+    def __len__(self) -> int:
+        return len(self._data) + len(self._lazy)
+
+    def __repr__(self) -> str:
+        return f"LazyDocument(loaded={sorted(self._data)}, deferred={sorted(self._lazy)})"
+
+    def _drop_lazy(self, key: str) -> None:
+        """Forget a deferred section that is being replaced or removed."""
+        self._lazy.pop(key, None)
+
+    # --- Lazy access ---
+
+    def is_loaded(self, key: str) -> bool:
+        """Check if a section has been read from disk."""
+        return key not in self._lazy
+
+    def iter_section(self, key: str) -> Iterator[Any]:
+        """Iterate over a list section, streaming it from disk if it was not loaded yet."""
+        section = self._lazy.get(key)
+        if section is None or section.pending or section.kind != SECTION_LINES:
+            return iter(self[key])
+        return section.iter_lines()
+
+    def materialize(self) -> Dict[str, Any]:
+        """Load every section and return the save as plain dictionaries."""
+        result = {}
+        for key in list(self):
+            value = self[key]
+            result[key] = value.materialize() if isinstance(value, LazyDocument) else value
+        return result
+
+    def close(self) -> None:
+        """Let go of the save file; deferred sections can no longer be loaded."""
+        if self._source is not None:
+            self._source.close()
+
+    # --- Delta log ---
+
+    def apply_ops(self, ops: List[Dict[str, Any]]) -> None:
+        """Apply delta log operations, deferring those that touch unloaded sections."""
+        for op in ops:
+            tokens = [token.replace('~1', '/').replace('~0', '~') for token in op["path"].split('/')[1:]]
+            if not tokens:
+                for key in list(self._lazy):
+                    self._drop_lazy(key)
+                self._data = dict(op["value"])
+                continue
+            self._apply_op(tokens, op)
+
+    def _apply_op(self, tokens: List[str], op: Dict[str, Any]) -> None:
+        key = tokens[0]
+        if len(tokens) == 1:
+            if op["op"] == "remove" and key in self._lazy:
+                self._drop_lazy(key)
+            elif op["op"] == "remove":
+                self._data.pop(key, None)
+            else:
+                self[key] = op["value"]
+        elif key in self._lazy:
+            self._lazy[key].pending.append(_reroot(op, tokens[1:]))
+        elif isinstance(self._data.get(key), LazyDocument):
+            self._data[key]._apply_op(tokens[1:], op)
+        else:
+            self._data[key] = apply_patch(self._data[key], [_reroot(op, tokens[1:])])
+
+
+def open_snapshot(path: str, heavy=DEFAULT_HEAVY_SECTIONS) -> LazyDocument:
+    """Open a snapshot file lazily, falling back to an eager load for other formats."""
+    with open(path, 'rb') as f:
+        header = serializers.read_header(f.read(HEADER_SIZE))
+    if header is None or header["codec"] != "sections":
+        return LazyDocument(serializers.load(path))
+
+    source = _SaveFile(path)
+    with source.open() as f:
+        return LazyDocument._open_table(source, HEADER_SIZE, heavy, f)
+
+
+def load_lazy(path: str, heavy=DEFAULT_HEAVY_SECTIONS,
+              serializer: Optional[Serializer] = None) -> Optional[LazyDocument]:
+    """
+    Load an incremental save lazily, replaying its delta log per section.
+
+    Args:
+    path (str): The snapshot path of the save.
+    heavy: Top-level and nested keys whose sections are only read on access.
+    serializer (Optional[Serializer]): The serializer the save is written with.
+
+    Returns:
+    Optional[LazyDocument]: The save, or None if it does not exist.
+    """
+    save_file = get_save_file(path, serializer)
+    if not save_file.exists():
+        return None
+    document = open_snapshot(path, heavy)
+    save_file.replay_log(document.apply_ops)
+    document.pop(LEGACY_VERSION_FIELD, None)
+    return document
@@ -7,6 +7,7 @@ from mistralai.models.chat_completion import ChatMessage
 from config import config
 from character_manager import CharacterManager
 from npc_manager import NPCManager
+from item_catalog import Inventory, format_inventory
 from datetime import datetime
 
 # Initialize colorama for Windows compatibility
@@ -96,7 +97,7 @@ class LLMService:
         ]
         
         if player.get('inventory'):
-            state.append(f"Inventory: {', '.join(player['inventory'])}")
+            state.append(f"Inventory: {format_inventory(player)}")
             
         if player.get('relationships'):
             rels = [f"{name} ({data.get('status', 'Neutral')})" 
@@ -262,8 +263,7 @@ Remember: You are actively narrating a scene. Never break character or include m
             return
 
         # Initialize required dictionaries
-        if 'inventory' not in self.current_character:
-            self.current_character['inventory'] = []
+        inventory = Inventory.of(self.current_character)
         if 'relationships' not in self.current_character:
             self.current_character['relationships'] = {}
         if 'npcs' not in self.current_character:
@@ -298,8 +298,8 @@ Remember: You are actively narrating a scene. Never break character or include m
         }
         
         for item_text, item_name in items_to_check.items():
-            if item_text in response.lower() and item_name not in self.current_character['inventory']:
-                self.current_character['inventory'].append(item_name)
+            if item_text in response.lower() and item_name not in inventory:
+                inventory.add(item_name)
 
         # Update relationships and NPC descriptions
         for npc_key, npc_data in npc_descriptions.items():
@@ -459,7 +459,7 @@ Remember: You are actively narrating a scene. Never break character or include m
             "description": npc_data["data"]["description"],
             "current_relationship": npc_data["relationships"].get("player", {}).get("status", "neutral"),
             "last_interaction": npc_data["relationships"].get("player", {}).get("last_interaction", None),
-            "recent_events": [event for event in npc_data["story_progression"][-3:]]  # Get last 3 events
+            "recent_events": self.npc_manager.get_recent_story_events(npc_id, 3)  # Get last 3 events
         }
 
     def update_npc_after_interaction(self, npc_id: str, interaction_data: Dict[str, Any]):
@@ -16,6 +16,7 @@ from events import (
 )
 from character_creation import character_creation
 from utilities import get_valid_input
+from combat_replay import replays_enabled
 from crew import (
     initialize_crew,
     update_crew_status,
@@ -27,19 +28,16 @@ from time_manager import TimeManager
 from relationship_manager import RelationshipManager
 from llm_service import LLMService
 from story_manager import (
-    load_game_state,
-    save_game_state,
     get_next_available_scenario,
     generate_story_event,
     mark_scenario_complete
 )
-from inventory_manager import (
-    purchase_item,
-    can_afford,
-    get_inventory,
-    modify_credits
-)
+from inventory_manager import PlayerSession
+from item_catalog import Inventory, format_inventory
+from treasure_map import display_nearest_caches
 from status_manager import StatusManager
+from player_repository import players
+from game_state_store import get_store
 import os
 import json
 import random
@@ -74,7 +72,7 @@ def display_player_summary(player):
     if 'skills' in player:
         print(f"{GREEN}Skills: {RESET}{', '.join(player['skills'])}")
     if 'inventory' in player:
-        print(f"{GREEN}Inventory: {RESET}{', '.join(player['inventory'])}")
+        print(f"{GREEN}Inventory: {RESET}{format_inventory(player)}")
 
     # Physical attributes
     if 'physical_attributes' in player:
@@ -113,8 +111,7 @@ def display_player_summary(player):
 def make_decision(player, npc):
     """Allow the player to make a decision, influenced by skills, traits, and relationships."""
     # Check if we should skip the distress signal scenario
-    game_state = load_game_state()
-    if "starting_conflict" in game_state["completed_scenarios"]:
+    if get_store().is_completed("starting_conflict"):
         return None
 
     # Initialize personality if it doesn't exist
@@ -285,6 +282,7 @@ def handle_event(player, event=None, time_manager=None, relationship_manager=Non
         while True:
             print("\nCommands:")
             print("- Type 'status' to view your status")
+            print("- Type 'caches' to list the nearest unclaimed caches")
             print("- Type 'quit' to exit")
             print("- Or simply describe what you want to do")
             action = input("\nWhat would you like to do?: ").strip().lower()
@@ -295,6 +293,9 @@ def handle_event(player, event=None, time_manager=None, relationship_manager=Non
             elif action == 'status':
                 display_status(player, scene)
                 continue
+            elif action == 'caches':
+                display_nearest_caches(player)
+                continue
             elif action == 'nsfw':  # Keep the functionality but don't show it in commands
                 toggle_nsfw(player)
                 continue
@@ -302,17 +303,17 @@ def handle_event(player, event=None, time_manager=None, relationship_manager=Non
             # Handle purchases
             if any(word in action.lower() for word in ['buy', 'purchase', "i'll take", 'get']):
                 if 'ghost blade' in action.lower():
-                    if can_afford(player['name'], 12000):
-                        if purchase_item(player['name'], 'Ghost Blade Energy Sword', 12000):
+                    session = PlayerSession(player, save=save_inventory_change)
+                    if session.can_afford(12000):
+                        if session.purchase('Ghost Blade Energy Sword', 12000):
                             print("Purchase successful! The Ghost Blade has been added to your inventory.")
-                            player = load_player_data(player['name'])  # Reload player data
                     else:
                         print("You don't have enough credits for this purchase.")
                 elif 'neon slasher' in action.lower():
-                    if can_afford(player['name'], 15000):
-                        if purchase_item(player['name'], 'Neon Slasher Energy Sword', 15000):
+                    session = PlayerSession(player, save=save_inventory_change)
+                    if session.can_afford(15000):
+                        if session.purchase('Neon Slasher Energy Sword', 15000):
                             print("Purchase successful! The Neon Slasher has been added to your inventory.")
-                            player = load_player_data(player['name'])  # Reload player data
                     else:
                         print("You don't have enough credits for this purchase.")
                 
@@ -423,6 +424,8 @@ def handle_combat_event(player, event, llm_service):
                 print("-" * 20)
                 print(f"{player['name']} HP: {state['player_hp']}/{state['player_max_hp']}")
                 print(f"{event.opponent['name']} HP: {state['opponent_hp']}/{state['opponent_max_hp']}")
+                if state.get('win_chance') is not None:
+                    print(f"Win chance: {state['win_chance']:.0%}")
                 
                 # Get available actions
                 actions = event.get_available_actions()
@@ -441,6 +444,8 @@ def handle_combat_event(player, event, llm_service):
                 
                 # Check if combat is finished
                 if event.is_combat_finished():
+                    if replays_enabled():
+                        event.combat_system.save_replay()
                     state = event.get_combat_state()
                     if state['player_hp'] <= 0:
                         print(f"\nYou have been defeated by {event.opponent['name']}!")
@@ -472,9 +477,7 @@ def add_credits(player: dict, amount: int) -> None:
 
 def add_item_to_inventory(player: dict, item: str) -> None:
     """Add an item to player's inventory."""
-    if 'inventory' not in player:
-        player['inventory'] = []
-    player['inventory'].append(item)
+    Inventory.of(player).add(item)
 
 
 def display_status(player, last_scene=None):
@@ -488,8 +491,8 @@ def display_status(player, last_scene=None):
     
     if player.get('inventory'):
         print(f"\n{CYAN}=== INVENTORY ==={RESET}")
-        for item in player['inventory']:
-            print(f"- {item}")
+        for label in Inventory.of(player).labels():
+            print(f"- {label}")
     
     if last_scene:
         print(f"\n{CYAN}=== LAST SCENE ==={RESET}")
@@ -507,6 +510,7 @@ def display_status(player, last_scene=None):
 
     print(f"\n{CYAN}Commands:{RESET}")
     print("- Type 'status' to view your status")
+    print("- Type 'caches' to list the nearest unclaimed caches")
     print("- Type 'quit' to exit")
     print("- Or simply describe what you want to do")
 
@@ -518,7 +522,7 @@ def initialize_player(name, role):
         'role': role,
         'health': 100,
         'credits': 1000,
-        'inventory': [],
+        'inventory': {},
         'relationships': {},
         'current_location': 'Night City - Downtown',
         'nsfw_enabled': False,  # Default to safe content
@@ -536,28 +540,32 @@ def toggle_nsfw(player):
     save_player_data(player)
 
 
-def save_player_data(player):
-    """Save player data to a JSON file."""
+def save_player_data(player, wait=False):
+    """Save player data to a JSON file; with wait, return False if the write failed."""
     try:
         # Convert current event to dict if it exists
         if 'current_event' in player and hasattr(player['current_event'], 'to_dict'):
             player['current_event'] = player['current_event'].to_dict()
             
-        save_path = os.path.join(os.getcwd(), f"{player['name'].lower()}.json")
-        with open(save_path, 'w') as f:
-            json.dump(player, f, indent=4)
-        print(f"Character saved as '{os.path.basename(save_path)}'!")
+        if not players.save(player, wait=wait):
+            print("Error saving character: the write failed")
+            return False
+        print(f"Character saved as '{os.path.basename(players.path_for(player['name']))}'!")
         return True
     except Exception as e:
         print(f"Error saving character: {str(e)}")
         return False
 
+def save_inventory_change(player):
+    """Save a purchase and wait for the write, so a failed save rolls it back."""
+    return save_player_data(player, wait=True)
+
 def load_player_data(name):
-    """Load player data from a JSON file."""
+    """Load player data through the shared player repository."""
     try:
-        load_path = os.path.join(os.getcwd(), f"{name.lower()}.json")
-        with open(load_path, 'r') as f:
-            player = json.load(f)
+        player = players.get(name)
+        if player is None:
+            raise FileNotFoundError(players.path_for(name))
             
         # Convert event dict back to GameEvent if it exists
         if 'current_event' in player:
@@ -605,19 +613,19 @@ def main():
         player = default_player()  # Use default player if no save exists
         save_player_data(player)
     
-    # Initialize status manager with current state
+    # Initialize status manager with current state and show changes as they happen
     status_manager.update_state(player)
+    players.subscribe(lambda name, changed, source: status_manager.update_state(changed))
     
-    # Load game state
-    game_state = load_game_state()
-    if not game_state:
-        game_state = {"completed_scenarios": [], "current_scenario": None}
+    # Load game state; the store keeps it in memory and persists changes as they happen
+    game_state = get_store()
     
     # Main game loop
     scene = None  # Initialize scene variable
     while True:
         print("\nCommands:")
         print("- Type 'status' to view your status")
+        print("- Type 'caches' to list the nearest unclaimed caches")
         print("- Type 'quit' to exit")
         print("- Or simply describe what you want to do")
         action = input("\nWhat would you like to do?: ").strip().lower()
@@ -628,6 +636,9 @@ def main():
         elif action == 'status':
             display_status(player, scene)
             continue
+        elif action == 'caches':
+            display_nearest_caches(player)
+            continue
         elif action == 'nsfw':  # Keep the functionality but don't show it in commands
             toggle_nsfw(player)
             continue
@@ -635,19 +646,17 @@ def main():
         # Handle purchases
         if any(word in action.lower() for word in ['buy', 'purchase', "i'll take", 'get']):
             if 'ghost blade' in action.lower():
-                if can_afford(player['name'], 12000):
-                    if purchase_item(player['name'], 'Ghost Blade Energy Sword', 12000):
+                session = PlayerSession(player, save=save_inventory_change)
+                if session.can_afford(12000):
+                    if session.purchase('Ghost Blade Energy Sword', 12000):
                         print("Purchase successful! The Ghost Blade has been added to your inventory.")
-                        player = load_player_data(player['name'])  # Reload player data
-                        status_manager.update_state(player)  # Show status changes
                 else:
                     print("You don't have enough credits for this purchase.")
             elif 'neon slasher' in action.lower():
-                if can_afford(player['name'], 15000):
-                    if purchase_item(player['name'], 'Neon Slasher Energy Sword', 15000):
+                session = PlayerSession(player, save=save_inventory_change)
+                if session.can_afford(15000):
+                    if session.purchase('Neon Slasher Energy Sword', 15000):
                         print("Purchase successful! The Neon Slasher has been added to your inventory.")
-                        player = load_player_data(player['name'])  # Reload player data
-                        status_manager.update_state(player)  # Show status changes
                 else:
                     print("You don't have enough credits for this purchase.")
             
@@ -663,28 +672,26 @@ def main():
             scene = llm_service.generate_response(action, action_context)
             print("\n" + scene)
             
-            # Check for any state changes after LLM response
-            new_player = load_player_data(player['name'])
-            if new_player != player:
-                player = new_player
-                status_manager.update_state(player)
+            # Pick up edits made to the save outside the game; in-game changes are
+            # reported to the status manager by the repository subscription
+            players.poll()
         
         # Display player status
         display_player_summary(player)
         
         # Get next story event or random event
-        if not game_state["current_scenario"]:
+        if not game_state.current_scenario:
             # Get next story scenario if available
-            next_scenario = get_next_available_scenario()
+            next_scenario = get_next_available_scenario(game_state)
             if next_scenario:
-                game_state["current_scenario"] = next_scenario
+                game_state.set_current_scenario(next_scenario)
                 event = generate_story_event(next_scenario, player)
             else:
                 # Fall back to random events if no story scenarios available
                 event = generate_random_event()
         else:
             # Continue current scenario
-            event = generate_story_event(game_state["current_scenario"], player)
+            event = generate_story_event(game_state.current_scenario, player)
         
         # Handle event based on type
         if isinstance(event, CombatEvent):
@@ -694,19 +701,16 @@ def main():
                 break
             
             # Update scenario progress after combat
-            if game_state["current_scenario"]:
-                mark_scenario_complete(game_state["current_scenario"])
-                game_state["current_scenario"] = None
+            if game_state.current_scenario:
+                mark_scenario_complete(game_state.current_scenario["id"], game_state)
         else:
             result = handle_event(player, event, time_manager, relationship_manager, llm_service)
-            if result and game_state["current_scenario"]:
+            if result and game_state.current_scenario:
                 # Story event completed successfully
-                mark_scenario_complete(game_state["current_scenario"])
-                game_state["current_scenario"] = None
+                mark_scenario_complete(game_state.current_scenario["id"], game_state)
         
-        # Save game state
+        # Save player; game state changes were persisted as they were made
         save_player_data(player)
-        save_game_state(game_state)
         
         # Ask to continue
         if get_valid_input("\nContinue playing? (yes/no): ", ["yes", "no"]) != "yes":
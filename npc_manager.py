@@ -4,24 +4,155 @@ NPC Manager Module
 
 Handles the management of Non-Player Characters (NPCs) in the game world.
 Stores and manages NPC data, relationships, and story progression.
+
+Storage Layout:
+-------------
+npcs/
+├── index.jsonl                              # Id, last_saved and location of every NPC
+└── [ab]/[cd]/                               # Shard picked by a hash of the id (see storage.py)
+    ├── [npc_id].json                        # Head document with the scalar fields (see serializers.py)
+    ├── [npc_id].story_progression.jsonl     # Append-only story progression journal
+    └── [npc_id].conversation_history.jsonl  # Append-only conversation journal
+
+The unbounded histories live in append-only journals so that adding an entry
+costs the same no matter how long the NPC has been around. Use the
+get_recent_* methods to read the last few entries, and compact_npc to tidy
+the journals offline.
+
+Head documents and journal entries are snapshotted on the caller's thread and
+written by the background writer (see persistence_writer.py); reads of an
+NPC wait for its pending writes first. Head writes hold the NPC's file lock
+and merge with changes another process saved since the head was loaded
+(see concurrency.py).
 """
 
 import os
 import json
-from typing import Dict, Any, Optional, List
+from itertools import islice
+from typing import Dict, Any, Optional, List, Iterator, Set
 from datetime import datetime
 
+import journal
+import serializers
+from concurrency import file_lock, strip_legacy_version, three_way_merge
+from persistence_writer import atomic_write, writer
+from serializers import Serializer
+from storage import ShardedDirectory
+
+# History fields stored in journals instead of the head document
+JOURNAL_FIELDS = ("story_progression", "conversation_history")
+
 class NPCManager:
-    def __init__(self, npcs_directory: str = "npcs"):
+    def __init__(self, npcs_directory: str = "npcs", serializer: Optional[Serializer] = None):
         """Initialize the NPC manager."""
-        self.npcs_directory = npcs_directory
-        if not os.path.exists(npcs_directory):
-            os.makedirs(npcs_directory)
+        self.serializer = serializer or serializers.default_serializer
+        # NPCs whose head is in the current format, on disk or queued
+        self._known: Set[str] = set()
+        # Heads as last loaded, the base for merging concurrent changes
+        self._bases: Dict[str, Dict[str, Any]] = {}
+        self.storage = ShardedDirectory(npcs_directory, describe=self._describe_head)
+        self.npcs_directory = self.storage.directory
+
+    def _npc_path(self, npc_id: str, create: bool = False) -> str:
+        """Get the path of an NPC's head document."""
+        return self.storage.path_for(npc_id, ".json", create)
+
+    def _journal_path(self, npc_id: str, field: str) -> str:
+        """Get the path of one of an NPC's history journals."""
+        return self.storage.path_for(npc_id, f".{field}.jsonl")
+
+    @staticmethod
+    def _index_meta(npc_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the metadata the storage index keeps for an NPC."""
+        return {
+            "last_saved": npc_data.get("last_updated"),
+            "location": npc_data.get("data", {}).get("location")
+        }
+
+    def _describe_head(self, npc_id: str, path: str) -> Optional[Dict[str, Any]]:
+        """Read the index metadata of an NPC while the index is rebuilt."""
+        return self._index_meta(serializers.load(path))
+
+    def _write_head(self, npc_id: str, npc_data: Dict[str, Any]) -> None:
+        """Queue a write of an NPC's head document."""
+        npc_path = self._npc_path(npc_id, create=True)
+        self._known.add(npc_id)
+        snapshot = json.loads(json.dumps(npc_data))
+        writer.submit(npc_path, self._store_head, npc_path, self._bases.pop(npc_id, None), snapshot,
+                      coalesce=True)
+        self.storage.record(npc_id, self._index_meta(npc_data))
+
+    def _store_head(self, npc_path: str, base: Optional[Dict[str, Any]], npc_data: Dict[str, Any]) -> int:
+        """Write a head under its file lock, merging changes saved elsewhere since base was loaded."""
+        with file_lock(npc_path):
+            theirs = serializers.load(npc_path) if os.path.exists(npc_path) else None
+            strip_legacy_version(theirs)
+            if theirs is not None and base is not None and theirs != base:
+                npc_data = three_way_merge(base, npc_data, theirs)
+            return atomic_write(npc_path, self.serializer.dumps(npc_data))
+
+    def _append_journal(self, npc_id: str, field: str, entry: Dict[str, Any]) -> None:
+        """Queue an append to one of an NPC's history journals."""
+        writer.submit(self._npc_path(npc_id), journal.append_lines,
+                      self._journal_path(npc_id, field), journal.encode_entries([entry]))
+
+    def _exists(self, npc_id: str) -> bool:
+        """Check if an NPC exists, without waiting on disk for NPCs seen before."""
+        return npc_id in self._known or self._load_head(npc_id) is not None
+
+    def _readable(self, npc_id: str) -> bool:
+        """Check if an NPC exists and wait for its pending writes, before its journals are read."""
+        if not self._exists(npc_id):
+            return False
+        writer.wait(self._npc_path(npc_id))
+        return True
+
+    def _load_head(self, npc_id: str) -> Optional[Dict[str, Any]]:
+        """Load an NPC's head document, moving legacy inline histories into journals."""
+        npc_path = self._npc_path(npc_id)
+        writer.wait(npc_path)
+        if not os.path.exists(npc_path):
+            return None
+
+        npc_data = serializers.load(npc_path)
+        strip_legacy_version(npc_data)
+        if any(field in npc_data for field in JOURNAL_FIELDS):
+            try:
+                npc_data = writer.submit(npc_path, self._migrate_head, npc_id, npc_path).result()
+            except Exception as e:
+                # The head keeps its histories and is migrated on a later load
+                print(f"Error migrating NPC {npc_id}: {e}")
+                return npc_data
+        self._bases[npc_id] = json.loads(json.dumps(npc_data))
+        self._known.add(npc_id)
+        return npc_data
+
+    def _migrate_head(self, npc_id: str, npc_path: str) -> Dict[str, Any]:
+        """
+        Move a head's inline histories into journals under its file lock.
+
+        Runs on the writer. The journals are appended before the head is
+        rewritten, and a history already at the start of its journal (from a
+        migration cut short) is not appended again, so a retry never
+        duplicates entries.
+        """
+        with file_lock(npc_path):
+            npc_data = serializers.load(npc_path)
+            strip_legacy_version(npc_data)
+            legacy_fields = [field for field in JOURNAL_FIELDS if field in npc_data]
+            if not legacy_fields:
+                return npc_data  # Migrated by another process
+            for field in legacy_fields:
+                history = npc_data.pop(field)
+                path = self._journal_path(npc_id, field)
+                if list(islice(journal.iter_entries(path), len(history))) != history:
+                    journal.append_entries(path, history)
+            atomic_write(npc_path, self.serializer.dumps(npc_data))
+            return npc_data
 
     def create_npc(self, npc_id: str, data: Dict[str, Any]) -> bool:
         """Create a new NPC with initial data."""
-        npc_path = os.path.join(self.npcs_directory, f"{npc_id}.json")
-        if os.path.exists(npc_path):
+        if self._exists(npc_id):
             return False
 
         npc_data = {
@@ -29,56 +160,54 @@ class NPCManager:
             "created_at": datetime.now().isoformat(),
             "last_updated": datetime.now().isoformat(),
             "data": data,
-            "story_progression": [],
-            "relationships": {},
-            "conversation_history": []
+            "relationships": {}
         }
 
-        with open(npc_path, 'w', encoding='utf-8') as f:
-            json.dump(npc_data, f, indent=4)
+        self._write_head(npc_id, npc_data)
         return True
 
     def get_npc(self, npc_id: str) -> Optional[Dict[str, Any]]:
-        """Get NPC data by ID."""
-        npc_path = os.path.join(self.npcs_directory, f"{npc_id}.json")
-        if not os.path.exists(npc_path):
+        """
+        Get NPC data by ID.
+
+        Returns the head document only; histories are read through
+        get_recent_story_events, get_recent_conversations and the iter_* methods.
+        """
+        npc_data = self._load_head(npc_id)
+        if not npc_data:
             return None
 
-        with open(npc_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # Journal appends do not touch the head, so pick up their latest timestamp
+        for field in JOURNAL_FIELDS:
+            latest = journal.read_tail(self._journal_path(npc_id, field), 1)
+            if latest and latest[0].get("timestamp", "") > npc_data.get("last_updated", ""):
+                npc_data["last_updated"] = latest[0]["timestamp"]
+        return npc_data
 
     def update_npc(self, npc_id: str, data: Dict[str, Any]) -> bool:
         """Update NPC data."""
-        npc_data = self.get_npc(npc_id)
+        npc_data = self._load_head(npc_id)
         if not npc_data:
             return False
 
         npc_data["data"].update(data)
         npc_data["last_updated"] = datetime.now().isoformat()
 
-        npc_path = os.path.join(self.npcs_directory, f"{npc_id}.json")
-        with open(npc_path, 'w', encoding='utf-8') as f:
-            json.dump(npc_data, f, indent=4)
+        self._write_head(npc_id, npc_data)
         return True
 
     def add_story_event(self, npc_id: str, event: Dict[str, Any]) -> bool:
         """Add a story progression event for the NPC."""
-        npc_data = self.get_npc(npc_id)
-        if not npc_data:
+        if not self._exists(npc_id):
             return False
 
         event["timestamp"] = datetime.now().isoformat()
-        npc_data["story_progression"].append(event)
-        npc_data["last_updated"] = datetime.now().isoformat()
-
-        npc_path = os.path.join(self.npcs_directory, f"{npc_id}.json")
-        with open(npc_path, 'w', encoding='utf-8') as f:
-            json.dump(npc_data, f, indent=4)
+        self._append_journal(npc_id, "story_progression", event)
         return True
 
     def update_relationship(self, npc_id: str, other_id: str, relationship_data: Dict[str, Any]) -> bool:
         """Update relationship between NPCs or with the player."""
-        npc_data = self.get_npc(npc_id)
+        npc_data = self._load_head(npc_id)
         if not npc_data:
             return False
 
@@ -95,15 +224,12 @@ class NPCManager:
             ]
         }
 
-        npc_path = os.path.join(self.npcs_directory, f"{npc_id}.json")
-        with open(npc_path, 'w', encoding='utf-8') as f:
-            json.dump(npc_data, f, indent=4)
+        self._write_head(npc_id, npc_data)
         return True
 
     def add_conversation(self, npc_id: str, conversation_data: Dict[str, Any]) -> bool:
         """Add a conversation entry to NPC's history."""
-        npc_data = self.get_npc(npc_id)
-        if not npc_data:
+        if not self._exists(npc_id):
             return False
 
         conversation_entry = {
@@ -114,15 +240,56 @@ class NPCManager:
             "important_points": conversation_data.get("important_points", [])
         }
 
-        npc_data["conversation_history"].append(conversation_entry)
-        npc_data["last_updated"] = datetime.now().isoformat()
+        self._append_journal(npc_id, "conversation_history", conversation_entry)
+        return True
+
+    def get_recent_story_events(self, npc_id: str, count: int = 3) -> List[Dict[str, Any]]:
+        """Get the last count story progression events, oldest first."""
+        if not self._readable(npc_id):
+            return []
+        return journal.read_tail(self._journal_path(npc_id, "story_progression"), count)
+
+    def get_recent_conversations(self, npc_id: str, count: int = 3) -> List[Dict[str, Any]]:
+        """Get the last count conversation entries, oldest first."""
+        if not self._readable(npc_id):
+            return []
+        return journal.read_tail(self._journal_path(npc_id, "conversation_history"), count)
+
+    def iter_story_events(self, npc_id: str) -> Iterator[Dict[str, Any]]:
+        """Iterate over an NPC's full story progression, oldest first."""
+        if not self._readable(npc_id):
+            return iter(())
+        return journal.iter_entries(self._journal_path(npc_id, "story_progression"))
+
+    def iter_conversations(self, npc_id: str) -> Iterator[Dict[str, Any]]:
+        """Iterate over an NPC's full conversation history, oldest first."""
+        if not self._readable(npc_id):
+            return iter(())
+        return journal.iter_entries(self._journal_path(npc_id, "conversation_history"))
 
-        npc_path = os.path.join(self.npcs_directory, f"{npc_id}.json")
-        with open(npc_path, 'w', encoding='utf-8') as f:
-            json.dump(npc_data, f, indent=4)
+    def compact_npc(self, npc_id: str, keep_last: Optional[int] = None) -> bool:
+        """
+        Compact an NPC's journals offline.
+
+        Migrates legacy inline histories, drops torn lines left by interrupted
+        writes and, when keep_last is given, trims each journal to its most
+        recent entries.
+        """
+        if not self._readable(npc_id):
+            return False
+
+        for field in JOURNAL_FIELDS:
+            journal.compact(self._journal_path(npc_id, field), keep_last)
         return True
 
+    def compact_all(self, keep_last: Optional[int] = None) -> int:
+        """Compact the journals of every NPC, returning how many were compacted."""
+        return sum(1 for npc_id in self.list_npcs() if self.compact_npc(npc_id, keep_last))
+
     def list_npcs(self) -> List[str]:
         """List all available NPCs."""
-        return [f.split('.')[0] for f in os.listdir(self.npcs_directory) 
-                if f.endswith('.json')]
+        return self.storage.names()
+
+    def search_npcs(self, predicate=None, **equals) -> List[str]:
+        """Find NPCs by indexed metadata, e.g. search_npcs(location='docks')."""
+        return self.storage.search(predicate, **equals)
@@ -0,0 +1,257 @@
+"""
+Persistence Writer Module
+=======================
+
+Background writer thread for save files.
+
+Saving on the thread that serves the player (the game loop or a Flask
+request) makes every disk latency spike show up as a slow turn. Callers
+instead take a snapshot of what they want to save (encoded bytes or a deep
+copy) and submit the write to the shared writer, which runs writes one at
+a time, in submission order, on a dedicated thread.
+
+- Backpressure: the queue is bounded; submit blocks while it is full
+  (or raises WriteQueueFull once its timeout runs out).
+- Coalescing: full-document saves submitted with coalesce=True replace a
+  queued write for the same key, so a burst of saves costs one write.
+- Read-your-writes: wait(key) blocks until the writes queued for a key are
+  done; loaders call it before reading a file that may have a write pending.
+- Errors: every submit returns a Future, failures are reported through
+  on_error, and flush() raises a PersistenceError for failures since the
+  previous flush.
+
+atomic_write and append_bytes implement the file side: full files are
+written to a temp file, optionally fsynced and renamed over the target.
+How often fsync is called is controlled by FSYNC_POLICY:
+
+- "always":    fsync full files, their directory and every append
+- "snapshots": fsync full files and their directory, not appends (default)
+- "never":     leave flushing to the OS
+
+Usage:
+-----
+```python
+data = serializer.dumps(npc_data)  # Snapshot on the caller's thread
+writer.submit(path, atomic_write, path, data, coalesce=True)
+writer.flush()  # Barrier for shutdown and tests
+```
+"""
+
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+FSYNC_POLICIES = ("always", "snapshots", "never")
+FSYNC_POLICY = "snapshots"
+
+# Writes that may be queued before submit starts blocking
+DEFAULT_MAX_QUEUE = 256
+
+
+class PersistenceError(IOError):
+    """Raised by flush when queued writes failed."""
+
+    def __init__(self, errors: List[Tuple[str, BaseException]]):
+        self.errors = errors
+        key, error = errors[0]
+        more = f" (and {len(errors) - 1} more)" if len(errors) > 1 else ""
+        super().__init__(f"Failed to write {key}: {error}{more}")
+
+
+class WriteQueueFull(PersistenceError):
+    """Raised by submit when the queue stayed full for the whole timeout."""
+
+    def __init__(self, key: str):
+        self.errors = []
+        IOError.__init__(self, f"Write queue full, could not queue {key}")
+
+
+def _fsync_directory(path: str) -> None:
+    """Make a rename in the directory of path durable, where the platform allows it."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes) -> int:
+    """Replace the file at path with data via temp file and rename."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        if FSYNC_POLICY != "never":
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    if FSYNC_POLICY != "never":
+        _fsync_directory(path)
+    return len(data)
+
+
+def append_bytes(path: str, data: bytes) -> int:
+    """Append data to the file at path."""
+    with open(path, 'ab') as f:
+        f.write(data)
+        if FSYNC_POLICY == "always":
+            f.flush()
+            os.fsync(f.fileno())
+    return len(data)
+
+
+class _Write:
+    __slots__ = ("key", "fn", "args", "future")
+
+    def __init__(self, key: str, fn: Callable[..., Any], args: tuple):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+
+
+def _report_error(key: str, error: BaseException) -> None:
+    """Default error callback: tell the player the save failed."""
+    print(f"Error saving {key}: {error}")
+
+
+class PersistenceWriter:
+    def __init__(self, max_queue: int = DEFAULT_MAX_QUEUE, name: str = "persistence-writer",
+                 on_error: Optional[Callable[[str, BaseException], None]] = _report_error):
+        """Initialize the writer; its thread starts with the first submitted write."""
+        self.name = name
+        self.on_error = on_error
+        self._queue: "queue.Queue[_Write]" = queue.Queue(maxsize=max_queue)
+        self._pending: Dict[str, int] = {}
+        self._coalescable: Dict[str, _Write] = {}
+        self._errors: List[Tuple[str, BaseException]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread if it is not running yet."""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, key: str, fn: Callable[..., Any], *args: Any,
+               coalesce: bool = False, timeout: Optional[float] = None) -> Future:
+        """
+        Queue fn(*args) to run on the writer thread.
+
+        Args:
+        key (str): What is written, usually the file path; orders wait(key).
+        fn (Callable): The write; its arguments must not be mutated afterwards.
+        coalesce (bool): Replace a queued, not yet started write with the same key.
+        timeout (Optional[float]): Seconds to wait for room in a full queue, None for no limit.
+
+        Returns:
+        Future: Resolves to the return value of fn, or its exception.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Persistence writer is closed")
+            if coalesce and key in self._coalescable:
+                queued = self._coalescable[key]
+                queued.fn, queued.args = fn, args
+                return queued.future
+
+            write = _Write(key, fn, args)
+            self._pending[key] = self._pending.get(key, 0) + 1
+            if coalesce:
+                self._coalescable[key] = write
+
+        self._ensure_started()
+        try:
+            self._queue.put(write, timeout=timeout)
+        except queue.Full:
+            error = WriteQueueFull(key)
+            with self._cond:
+                self._forget(write)
+            write.future.set_exception(error)
+            raise error
+        return write.future
+
+    def _forget(self, write: _Write) -> None:
+        """Drop the bookkeeping of a write that finished or was never queued."""
+        if self._coalescable.get(write.key) is write:
+            del self._coalescable[write.key]
+        self._pending[write.key] -= 1
+        if not self._pending[write.key]:
+            del self._pending[write.key]
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        """Writer thread: run queued writes in order."""
+        while True:
+            write = self._queue.get()
+            with self._cond:
+                # Stop coalescing into a write once it has started
+                if self._coalescable.get(write.key) is write:
+                    del self._coalescable[write.key]
+                fn, args = write.fn, write.args
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                with self._cond:
+                    self._errors.append((write.key, e))
+                    self._forget(write)
+                write.future.set_exception(e)
+                if self.on_error:
+                    try:
+                        self.on_error(write.key, e)
+                    except Exception:
+                        pass
+            else:
+                with self._cond:
+                    self._forget(write)
+                write.future.set_result(result)
+
+    def pending(self, key: Optional[str] = None) -> int:
+        """Count the writes queued or running, for one key or all of them."""
+        with self._cond:
+            if key is None:
+                return sum(self._pending.values())
+            return self._pending.get(key, 0)
+
+    def wait(self, key: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Wait until the writes for key (or all writes) are done, returning False on timeout."""
+        if threading.current_thread() is self._thread:
+            # A write waiting for writes queued behind it would never finish
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: not (self._pending.get(key) if key else self._pending),
+                                       timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait for every queued write and raise PersistenceError if any failed since the last flush."""
+        if not self.wait(timeout=timeout):
+            raise TimeoutError(f"{self.pending()} writes still pending")
+        with self._cond:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise PersistenceError(errors)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Refuse new writes and wait for the queued ones."""
+        with self._cond:
+            self._closed = True
+        self.wait(timeout=timeout)
+
+
+# Writer shared by the game; writes still queued at exit are finished first
+writer = PersistenceWriter()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    writer.close()
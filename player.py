@@ -1,6 +1,10 @@
 import json
+import os
 import random
 
+from item_catalog import format_inventory, migrate_inventory
+from player_repository import players
+
 # Default Player Template
 default_player = {
     "name": "",
@@ -26,7 +30,7 @@ default_player = {
     "strengths": [],
     "weaknesses": [],
     "skills": [],
-    "inventory": [],
+    "inventory": {},
     "relationships": {},
     "personality": {
         "alignment": "Neutral",
@@ -57,27 +61,21 @@ random_weaknesses = ["Fear of Heights", "Weakness for Beautiful Women", "Allergy
 
 # --- Utility Functions ---
 def load_player_data(name=None):
-    """Load player data from a JSON file."""
+    """Load player data through the shared player repository."""
     if name is None:
         return None
         
-    filename = f"{name}.json"
     try:
-        with open(filename, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+        return players.get(name)
     except json.JSONDecodeError:
-        print(f"Error: {filename} is corrupted")
+        print(f"Error: {players.path_for(name)} is corrupted")
         return None
 
 def save_player_data(player):
-    """Save player data to a JSON file."""
+    """Save player data through the shared player repository."""
     if player["name"]:
-        filename = f"{player['name'].lower()}.json"
-        with open(filename, "w") as file:
-            json.dump(player, file, indent=4)
-        print(f"Character saved as '{filename}'!")
+        players.save(player)
+        print(f"Character saved as '{os.path.basename(players.path_for(player['name']))}'!")
     else:
         print("Character name is missing. Cannot save data.")
 
@@ -113,8 +111,8 @@ def initialize_inventory(player):
         "scientist": ["Lab Kit", "Energy Scanner", "Tablet"],
         "pilot": ["Blaster", "Toolkit", "Space Map"]
     }
-    player["inventory"] = role_based_inventory.get(player["role"].lower(), ["Basic Supplies"])
-    print(f"\nStarting Inventory: {', '.join(player['inventory'])}")
+    player["inventory"] = migrate_inventory(role_based_inventory.get(player["role"].lower(), ["Basic Supplies"]))
+    print(f"\nStarting Inventory: {format_inventory(player)}")
 
 def initialize_relationships(player):
     """Set up initial NPC relationships for the player."""
@@ -0,0 +1,243 @@
+"""
+Player Repository Module
+======================
+
+Single place where player saves are loaded and saved.
+
+The repository keeps an identity map with one live player dict per character
+name, so every part of the game that asks for a player gets the same object
+instead of its own stale copy. Saves go through the incremental save format
+(see incremental_save.py), file names are always lower case, and anyone
+interested in player changes can subscribe instead of reloading the save
+from disk to compare.
+
+peek() reads a save lazily for read-only views such as status screens and
+listings: core fields are decoded, heavy sections stay on disk until used
+(see lazy_save.py).
+
+save() snapshots the player and hands the write to the background writer
+(see persistence_writer.py), so a slow disk does not stall the turn; loads
+wait for a pending write of the same character. save(player, wait=True)
+blocks until the write is done and returns False if it failed, for callers
+such as inventory transactions that roll back on a failed save.
+
+Edits made to a save file outside the game are picked up by a file-watch
+fallback: get() and poll() compare the file's modification time and size
+with what the repository last read or wrote, and reload the live object in
+place when they differ. The edits are merged (see concurrency.py) with any
+changes made in memory since the last load or save, so an unsaved change
+such as this turn's credits is not lost. Where both changed the same
+field, the in-memory value is kept and the conflict is reported.
+
+Usage:
+-----
+```python
+player = players.get("strijder")
+unsubscribe = players.subscribe(lambda name, player, source: print(name, source))
+player['resources']['credits'] += 100
+players.save(player)  # Subscribers are told about the change
+```
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import serializers
+from concurrency import ConflictError, three_way_merge
+from incremental_save import get_save_file
+from lazy_save import load_lazy
+from persistence_writer import writer
+from serializers import Serializer
+from storage import storage_root
+
+# Callback signature: (character name, live player dict, change source)
+# where the source is one of "save", "external" or "changed"
+ChangeCallback = Callable[[str, Dict[str, Any], str], None]
+
+
+class PlayerRepository:
+    def __init__(self, directory: Optional[str] = None, serializer: Optional[Serializer] = None):
+        """Initialize the repository; saves go to directory, or the storage root if None."""
+        self.directory = directory
+        self.serializer = serializer or serializers.sections_serializer
+        self._players: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Optional[Tuple[int, int]]] = {}
+        # The document each live player was last loaded from or saved as
+        self._bases: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[ChangeCallback] = []
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(name: str) -> str:
+        """Normalize a character name into the identity map key."""
+        return name.lower()
+
+    def path_for(self, name: str) -> str:
+        """Get the save file path for a character."""
+        directory = self.directory if self.directory is not None else (storage_root() or os.getcwd())
+        return os.path.join(directory, f"{self.key(name)}.json")
+
+    def _stat(self, path: str) -> Optional[Tuple[int, int]]:
+        """Identify the current version of a save file on disk."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get the live player object for a character, loading it on first use."""
+        key = self.key(name)
+        writer.wait(self.path_for(name))
+        with self._lock:
+            if key in self._players:
+                self._reload_if_changed(key)
+                return self._players.get(key)
+            return self.load(name)
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """Explicitly (re)load a character from disk into its live object, keeping unsaved changes."""
+        key = self.key(name)
+        path = self.path_for(name)
+        writer.wait(path)
+        with self._lock:
+            player = get_save_file(path, self.serializer).load()
+            self._stats[key] = self._stat(path)
+            if player is None:
+                self._players.pop(key, None)
+                self._bases.pop(key, None)
+                return None
+
+            live = self._players.get(key)
+            base = self._bases.get(key)
+            self._bases[key] = json.loads(json.dumps(player))
+            if live is None:
+                self._players[key] = player
+                return player
+
+            if base is not None:
+                # Keep changes made in memory since the last load or save
+                try:
+                    player = three_way_merge(base, live, player, conflict="raise")
+                except ConflictError as e:
+                    print(f"Save of {key} changed on disk, keeping unsaved changes: {e}")
+                    player = three_way_merge(base, live, player, conflict="ours")
+
+            # Keep the identity of the live object so holders see the new state
+            live.clear()
+            live.update(player)
+            return live
+
+    def peek(self, name: str) -> Optional[Mapping[str, Any]]:
+        """Get a read-only view of a player without loading its heavy sections."""
+        key = self.key(name)
+        with self._lock:
+            if key in self._players:
+                return self._players[key]
+        path = self.path_for(name)
+        writer.wait(path)
+        return load_lazy(path, serializer=self.serializer)
+
+    def add(self, player: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a newly created player as the live object for its name."""
+        with self._lock:
+            self._players[self.key(player['name'])] = player
+        return player
+
+    def save(self, player: Dict[str, Any], wait: bool = False) -> bool:
+        """
+        Queue a save of a player and notify subscribers.
+
+        Args:
+        player (Dict[str, Any]): The player to save.
+        wait (bool): Block until the write is done, for callers that must know it landed.
+
+        Returns:
+        bool: False if the write failed (only known when waiting), True otherwise.
+        """
+        if not player.get('name'):
+            raise ValueError("Player must have a name")
+
+        key = self.key(player['name'])
+        path = self.path_for(player['name'])
+        with self._lock:
+            live = self._players.setdefault(key, player)
+            if live is not player:
+                # A detached copy is being saved; make it the state of the live object
+                live.clear()
+                live.update(player)
+            # Snapshot now; the live object keeps changing while the write is queued
+            snapshot = json.loads(json.dumps(live))
+            self._bases[key] = snapshot
+
+        def write():
+            save_file = get_save_file(path, self.serializer)
+            written = save_file.save(snapshot)
+            # No repository lock here: holders of it may be waiting for this write.
+            # If another process saved too, the merged result is picked up by the next poll
+            self._stats[key] = None if save_file.diverged else self._stat(path)
+            return written
+
+        future = writer.submit(path, write, coalesce=True)
+        self._notify(key, live, "save")
+        if not wait:
+            # Failures are reported by the writer's error callback and flush()
+            return True
+        try:
+            future.result()
+        except Exception:
+            return False
+        return True
+
+    def mark_changed(self, player: Dict[str, Any]) -> None:
+        """Tell subscribers a live player was changed in memory without saving."""
+        self._notify(self.key(player['name']), player, "changed")
+
+    def evict(self, name: str) -> None:
+        """Forget the live object for a character."""
+        key = self.key(name)
+        with self._lock:
+            self._players.pop(key, None)
+            self._stats.pop(key, None)
+            self._bases.pop(key, None)
+
+    def subscribe(self, callback: ChangeCallback) -> Callable[[], None]:
+        """Register a change callback, returning a function that unsubscribes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def poll(self) -> List[str]:
+        """Reload live players whose save files were changed outside the game."""
+        with self._lock:
+            return [key for key in list(self._players) if self._reload_if_changed(key)]
+
+    def _reload_if_changed(self, key: str) -> bool:
+        """Reload a live player if its file changed since we last read or wrote it."""
+        path = self.path_for(key)
+        if writer.pending(path) or self._stat(path) == self._stats.get(key):
+            # Our own queued writes are not external changes
+            return False
+        player = self.load(key)
+        if player is not None:
+            self._notify(key, player, "external")
+        return True
+
+    def _notify(self, key: str, player: Dict[str, Any], source: str) -> None:
+        """Call every subscriber, isolating the game from subscriber errors."""
+        for callback in list(self._subscribers):
+            try:
+                callback(key, player, source)
+            except Exception as e:
+                print(f"Error in player change subscriber: {e}")
+
+
+# Repository shared by the game; saves live in the working directory
+players = PlayerRepository()
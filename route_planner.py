@@ -0,0 +1,317 @@
+"""
+Route Planner Module
+==================
+
+Plans the order in which to visit unclaimed treasures within a fuel budget.
+
+The ship burns FUEL_PER_UNIT fuel per unit of distance and travels
+TRAVEL_SPEED units per day. Given the current position and the unclaimed
+treasures of treasure_map, the planner looks for the route that collects the
+most treasure value that the fuel can reach:
+
+1. Nearest neighbour: starting from the ship, repeatedly fly to the closest
+   treasure that still leaves enough fuel (to get home, for round trips).
+   When fuel is short, a second route built by insertion alone (step 3)
+   competes with it, since the nearest treasures are not always the best.
+2. 2-opt and Or-opt: reverse stretches of the route, and move runs of one
+   to three stops elsewhere, while that shortens it. Every candidate move
+   from a stop is priced at once from the distance matrix.
+3. Insertion: spend the fuel saved on the treasures left out, best value per
+   extra unit of distance first. Steps 2 and 3 repeat until nothing changes
+   or the time limit is reached.
+
+Distances come from one vectorized matrix over the ship and the candidates.
+Only the MAX_CANDIDATES treasures nearest the ship are considered, so
+planning stays interactive with large maps.
+
+Usage:
+-----
+```python
+plan = plan_treasure_route(player)                    # Uses player['resources']['fuel']
+print(plan.stops, plan.fuel, plan.days)
+follow_route(player, plan, time_manager)              # Fly it: fuel, time, position, loot
+order, length = plan_route(start, points, max_distance=5000, return_to_start=True)
+```
+"""
+
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from item_catalog import Inventory
+from treasure_map import ORIGIN, claim_treasure, player_position, treasure_index
+
+# Fuel burned per unit of distance
+FUEL_PER_UNIT = 0.01
+
+# Distance covered per game day
+TRAVEL_SPEED = 500.0
+
+# Seconds spent improving a route
+DEFAULT_TIME_LIMIT = 0.2
+
+# Treasures closest to the ship that are considered for a route
+MAX_CANDIDATES = 500
+
+# Improvements smaller than this are rounding noise
+EPSILON = 1e-9
+
+
+def distance_matrix(points: np.ndarray) -> np.ndarray:
+    """Pairwise Euclidean distances between the rows of points."""
+    points = np.asarray(points, dtype=np.float64)
+    squared = np.einsum("ij,ij->i", points, points)
+    gram = squared[:, None] + squared[None, :] - 2.0 * points @ points.T
+    np.maximum(gram, 0.0, out=gram)
+    np.fill_diagonal(gram, 0.0)
+    return np.sqrt(gram)
+
+
+def _length(d: np.ndarray, path: np.ndarray) -> float:
+    return float(d[path[:-1], path[1:]].sum())
+
+
+# Routes are node arrays [0, ..., end]: node 0 is the start and the last node
+# is a copy of it for round trips, or a free end at distance 0 from everything.
+
+def _nearest_neighbour(d: np.ndarray, budget: float, end: int) -> np.ndarray:
+    """Greedy route: always fly to the nearest stop that keeps the route within budget."""
+    unvisited = np.ones(len(d), dtype=bool)
+    unvisited[[0, end]] = False
+    path, length, current = [0], 0.0, 0
+    while unvisited.any():
+        total = length + d[current] + d[:, end]
+        feasible = unvisited & (total <= budget)
+        if not feasible.any():
+            break
+        step = np.where(feasible, d[current], np.inf)
+        current = int(np.argmin(step))
+        length += d[path[-1], current]
+        path.append(current)
+        unvisited[current] = False
+    path.append(end)
+    return np.array(path)
+
+
+def _two_opt(d: np.ndarray, path: np.ndarray, deadline: float) -> bool:
+    """Reverse route stretches while that shortens the route; returns whether it changed."""
+    changed = False
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, len(path) - 2):
+            js = np.arange(i + 1, len(path) - 1)
+            delta = (d[path[i - 1], path[js]] + d[path[i], path[js + 1]]
+                     - d[path[i - 1], path[i]] - d[path[js], path[js + 1]])
+            best = int(np.argmin(delta))
+            if delta[best] < -EPSILON:
+                j = js[best]
+                path[i:j + 1] = path[i:j + 1][::-1].copy()
+                improved = changed = True
+    return changed
+
+
+def _or_opt(d: np.ndarray, path: np.ndarray, deadline: float) -> Tuple[np.ndarray, bool]:
+    """Move runs of one to three stops (possibly reversed) where they cost less."""
+    changed = False
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for size in (1, 2, 3):
+            i = 1
+            while i + size < len(path):
+                first, last = path[i], path[i + size - 1]
+                prev, after = path[i - 1], path[i + size]
+                removed = d[prev, first] + d[last, after] - d[prev, after]
+                rest = np.concatenate([path[:i], path[i + size:]])
+                a, b = rest[:-1], rest[1:]
+                forward = d[a, first] + d[last, b] - d[a, b]
+                backward = d[a, last] + d[first, b] - d[a, b]
+                cost = np.minimum(forward, backward)
+                k = int(np.argmin(cost))
+                if cost[k] < removed - EPSILON:
+                    segment = path[i:i + size]
+                    if backward[k] < forward[k]:
+                        segment = segment[::-1]
+                    path = np.concatenate([rest[:k + 1], segment, rest[k + 1:]])
+                    improved = changed = True
+                i += 1
+    return path, changed
+
+
+def _insert(d: np.ndarray, path: np.ndarray, prizes: np.ndarray, budget: float,
+            deadline: float) -> Tuple[np.ndarray, bool]:
+    """Add left-out stops while the budget allows, best prize per extra distance first."""
+    changed = False
+    length = _length(d, path)
+    outside = np.ones(len(d), dtype=bool)
+    outside[path] = False
+    while outside.any() and time.perf_counter() < deadline:
+        candidates = np.flatnonzero(outside)
+        a, b = path[:-1], path[1:]
+        extra = d[a][:, candidates] + d[candidates][:, b].T - d[a, b][:, None]
+        position = np.argmin(extra, axis=0)
+        cost = extra[position, np.arange(len(candidates))]
+        affordable = length + cost <= budget + EPSILON
+        if not affordable.any():
+            break
+        score = np.where(affordable, prizes[candidates] / np.maximum(cost, EPSILON), -np.inf)
+        best = int(np.argmax(score))
+        node, at = candidates[best], position[best]
+        path = np.concatenate([path[:at + 1], [node], path[at + 1:]])
+        length += cost[best]
+        outside[node] = False
+        changed = True
+    return path, changed
+
+
+def plan_route(start: Sequence[float], points: np.ndarray, max_distance: float = math.inf,
+               prizes: Optional[Sequence[float]] = None, return_to_start: bool = False,
+               time_limit: float = DEFAULT_TIME_LIMIT) -> Tuple[List[int], float]:
+    """
+    Plan a visiting order over points within a distance budget.
+
+    Args:
+    start (Sequence[float]): Where the route starts.
+    points (np.ndarray): Points to visit, one row each.
+    max_distance (float): Longest allowed route.
+    prizes (Optional[Sequence[float]]): Worth of visiting each point, 1 each by default.
+    return_to_start (bool): Plan a round trip instead of ending at the last stop.
+    time_limit (float): Seconds to spend improving the route.
+
+    Returns:
+    Tuple[List[int], float]: Row numbers of the visited points in order, and the route length.
+    """
+    deadline = time.perf_counter() + time_limit
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not len(points):
+        return [], 0.0
+    d = distance_matrix(np.vstack([start, points]))
+    # Add the end node: the start again for round trips, a free end otherwise
+    end_row = d[0] if return_to_start else np.zeros(len(d))
+    d = np.block([[d, end_row[:, None]], [end_row[None, :], np.zeros((1, 1))]])
+    end = len(d) - 1
+    node_prizes = np.zeros(len(d))
+    node_prizes[1:end] = 1.0 if prizes is None else np.asarray(prizes, dtype=np.float64)
+
+    # Under a tight budget the nearest stops are not always the valuable ones, so a route
+    # built by insertion alone competes with the nearest neighbour one
+    routes = [_nearest_neighbour(d, max_distance, end)]
+    if max_distance < math.inf:
+        routes.append(_insert(d, np.array([0, end]), node_prizes, max_distance, math.inf)[0])
+    best = None
+    for number, path in enumerate(routes):
+        share = time.perf_counter() + (deadline - time.perf_counter()) / (len(routes) - number)
+        path = _improve(d, path, node_prizes, max_distance, share)
+        key = (node_prizes[path].sum(), -_length(d, path))
+        if best is None or key > best[0]:
+            best = (key, path)
+    path = best[1]
+    return (path[1:-1] - 1).tolist(), _length(d, path)
+
+
+def _improve(d: np.ndarray, path: np.ndarray, prizes: np.ndarray, budget: float,
+             deadline: float) -> np.ndarray:
+    """Shorten the route and spend the savings on more stops until nothing changes."""
+    changed = True
+    while changed and time.perf_counter() < deadline:
+        changed = _two_opt(d, path, deadline)
+        path, moved = _or_opt(d, path, deadline)
+        path, inserted = _insert(d, path, prizes, budget, deadline)
+        changed = changed or moved or inserted
+    return path
+
+
+@dataclass
+class RoutePlan:
+    """A route through discovered treasures."""
+    stops: List[int]           # Positions in player["discovered_locations"], in visiting order
+    distance: float
+    fuel: float                # Fuel the route burns
+    days: int                  # Game days to fly it, for TimeManager.advance_time
+    value: int                 # Value of the treasures collected
+    left_out: int              # Unclaimed treasures the fuel could not reach
+    return_to_start: bool = False
+    legs: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _treasure_value(treasure: Dict[str, Any]) -> int:
+    return sum(item.get("value", 0) for item in treasure.get("contents", []) if isinstance(item, dict))
+
+
+def plan_treasure_route(player: Dict[str, Any], fuel: Optional[float] = None,
+                        return_to_start: bool = False, time_limit: float = DEFAULT_TIME_LIMIT,
+                        max_candidates: int = MAX_CANDIDATES) -> RoutePlan:
+    """
+    Plan a route through the player's unclaimed treasures.
+
+    Args:
+    player (Dict[str, Any]): The player, with discovered_locations and position.
+    fuel (Optional[float]): Fuel to plan with, the player's fuel by default.
+    return_to_start (bool): Come back to the current position at the end.
+    time_limit (float): Seconds to spend improving the route.
+    max_candidates (int): Treasures nearest the ship that are considered.
+
+    Returns:
+    RoutePlan: The route, its fuel and its time in days.
+    """
+    if fuel is None:
+        fuel = player.get("resources", {}).get("fuel", 0)
+    treasures = player.get("discovered_locations") or []
+    start = np.asarray(player_position(player))
+    index = treasure_index(player)
+    candidates = [position for position, _ in index.nearest(start, max_candidates)]
+    if not candidates:
+        return RoutePlan([], 0.0, 0.0, 0, 0, 0, return_to_start)
+
+    points = index.points[candidates]
+    prizes = [max(_treasure_value(treasures[position]), 1) for position in candidates]
+    order, distance = plan_route(start, points, fuel / FUEL_PER_UNIT, prizes, return_to_start, time_limit)
+    stops = [candidates[i] for i in order]
+
+    route = np.vstack([start, index.points[stops]] + ([start] if return_to_start and stops else []))
+    legs = np.linalg.norm(np.diff(route, axis=0), axis=1).tolist()
+    return RoutePlan(
+        stops=stops,
+        distance=distance,
+        fuel=distance * FUEL_PER_UNIT,
+        days=math.ceil(distance / TRAVEL_SPEED),
+        value=sum(_treasure_value(treasures[position]) for position in stops),
+        left_out=index.unclaimed_count - len(stops),
+        return_to_start=return_to_start,
+        legs=legs,
+    )
+
+
+def follow_route(player: Dict[str, Any], plan: RoutePlan, time_manager=None) -> List[str]:
+    """
+    Fly a planned route: burn the fuel, advance time, move the ship and collect the treasures.
+
+    Returns:
+    List[str]: Events the time manager reported for the days spent travelling.
+    """
+    resources = player.setdefault("resources", {})
+    if plan.fuel > resources.get("fuel", 0) + EPSILON:
+        print(f"Not enough fuel for this route: it needs {plan.fuel:.1f}")
+        return []
+
+    resources["fuel"] = max(0, resources.get("fuel", 0) - math.ceil(plan.fuel))
+    treasures = player.get("discovered_locations") or []
+    inventory = Inventory.of(player)
+    for position in plan.stops:
+        if claim_treasure(player, position):
+            for item in treasures[position].get("contents", []):
+                inventory.add(item)
+    if plan.stops and not plan.return_to_start:
+        player["position"] = dict(treasures[plan.stops[-1]].get("location") or dict(zip("xyz", ORIGIN)))
+
+    events = []
+    if time_manager is not None and plan.days:
+        events = time_manager.advance_time(plan.days)
+    return events
@@ -0,0 +1,440 @@
+"""
+Serializers Module
+================
+
+Pluggable encodings for save files.
+
+Every file written by a Serializer starts with a small header:
+
+    b"RPGS" | format version (1 byte) | codec id (1 byte) | compression id (1 byte)
+
+followed by the (possibly compressed) payload. Files without the magic
+prefix are treated as legacy JSON saves written with json.dump, so older
+saves keep loading transparently.
+
+Codecs:
+------
+- json:     Compact JSON (no indentation, tight separators)
+- binary:   Tagged binary encoding with varint lengths and a key table, so
+            repeated dictionary keys are stored once per file
+- sections: A table of contents followed by one compact JSON section per
+            top-level key, compressed per section. Large dictionaries are
+            nested section tables and heavy lists are stored one item per
+            line, so lazy_save.py can read single sections without parsing
+            the rest of the file
+
+Compression:
+----------
+- None:   Never compress
+- zlib:   Compress payloads at or above compress_threshold bytes
+- lzma:   Compress payloads at or above compress_threshold bytes
+- auto:   zlib at or above compress_threshold, lzma at or above lzma_threshold
+
+Usage:
+-----
+```python
+serializer = Serializer.from_name("binary+zlib")
+serializer.dump(player, "strijder.json")
+player = serializer.load("strijder.json")
+```
+
+Run bench_serializers.py to compare encode/decode time and bytes on disk.
+"""
+
+import json
+import lzma
+import struct
+import zlib
+from typing import Any, Dict, List, Optional
+
+MAGIC = b"RPGS"
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+CODEC_IDS = {"json": 1, "binary": 2, "sections": 3}
+COMPRESSION_IDS = {None: 0, "zlib": 1, "lzma": 2}
+
+# Payloads below this size are not worth compressing
+DEFAULT_COMPRESS_THRESHOLD = 64 * 1024
+# In auto mode, payloads at or above this size use lzma instead of zlib
+DEFAULT_LZMA_THRESHOLD = 4 * 1024 * 1024
+
+# Sections codec: lists under these keys are stored one item per line and loaded lazily
+DEFAULT_HEAVY_SECTIONS = frozenset({
+    "conversation_history", "npcs", "activity_log", "discovered_locations", "story_progress"
+})
+# Sections codec: dictionaries and lists encoding to more bytes than this get their own table or lines
+DEFAULT_SECTION_THRESHOLD = 16 * 1024
+
+# Section kinds of the sections codec
+SECTION_JSON, SECTION_LINES, SECTION_TABLE = "json", "lines", "table"
+
+
+class SerializationError(ValueError):
+    """Raised when a save file cannot be encoded or decoded."""
+
+
+# --- Binary codec ---
+
+# Type tags of the binary codec
+_NONE, _TRUE, _FALSE, _INT, _BIGINT, _FLOAT, _STR, _LIST, _DICT = b"NTFiIdslm"
+# Dictionary keys: a new key is stored inline, a repeated key by table index
+_KEY_NEW, _KEY_REF = b"kr"
+
+_DOUBLE = struct.Struct("<d")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int):
+    """Read an unsigned LEB128 varint, returning (value, new position)."""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_binary(value: Any, out: bytearray, keys: Dict[str, int]) -> None:
+    """Append the binary encoding of a JSON-compatible value."""
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if -(1 << 63) <= value < (1 << 63):
+            out.append(_INT)
+            # Zigzag encoding keeps small negative numbers short
+            _write_varint(out, (value << 1) ^ (value >> 63))
+        else:
+            raw = str(value).encode('ascii')
+            out.append(_BIGINT)
+            _write_varint(out, len(raw))
+            out += raw
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        raw = value.encode('utf-8')
+        out.append(_STR)
+        _write_varint(out, len(raw))
+        out += raw
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode_binary(item, out, keys)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            key = key if isinstance(key, str) else json.dumps(key)
+            index = keys.get(key)
+            if index is None:
+                keys[key] = len(keys)
+                raw = key.encode('utf-8')
+                out.append(_KEY_NEW)
+                _write_varint(out, len(raw))
+                out += raw
+            else:
+                out.append(_KEY_REF)
+                _write_varint(out, index)
+            _encode_binary(item, out, keys)
+    else:
+        raise SerializationError(f"Cannot encode value of type {type(value).__name__}")
+
+
+def _decode_binary(data: bytes, pos: int, keys: List[str]):
+    """Decode one value, returning (value, new position)."""
+    tag = data[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _INT:
+        raw, pos = _read_varint(data, pos)
+        return (raw >> 1) ^ -(raw & 1), pos
+    if tag == _BIGINT:
+        length, pos = _read_varint(data, pos)
+        return int(data[pos:pos + length].decode('ascii')), pos + length
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+    if tag == _STR:
+        length, pos = _read_varint(data, pos)
+        return data[pos:pos + length].decode('utf-8'), pos + length
+    if tag == _LIST:
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode_binary(data, pos, keys)
+            items.append(item)
+        return items, pos
+    if tag == _DICT:
+        count, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(count):
+            key_tag = data[pos]
+            pos += 1
+            if key_tag == _KEY_NEW:
+                length, pos = _read_varint(data, pos)
+                key = data[pos:pos + length].decode('utf-8')
+                pos += length
+                keys.append(key)
+            elif key_tag == _KEY_REF:
+                index, pos = _read_varint(data, pos)
+                key = keys[index]
+            else:
+                raise SerializationError(f"Unknown key tag {key_tag!r} at byte {pos - 1}")
+            result[key], pos = _decode_binary(data, pos, keys)
+        return result, pos
+    raise SerializationError(f"Unknown type tag {tag!r} at byte {pos - 1}")
+
+
+def encode_binary(value: Any) -> bytes:
+    """Encode a JSON-compatible value with the binary codec."""
+    out = bytearray()
+    _encode_binary(value, out, {})
+    return bytes(out)
+
+
+def decode_binary(data: bytes) -> Any:
+    """Decode a value written by encode_binary."""
+    value, pos = _decode_binary(data, 0, [])
+    if pos != len(data):
+        raise SerializationError(f"Trailing data after byte {pos}")
+    return value
+
+
+# --- Sections codec ---
+
+def _json_bytes(value: Any) -> bytes:
+    """Encode a value as compact JSON."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress(payload: bytes, compression: Optional[str]) -> bytes:
+    """Compress a payload with one of COMPRESSION_IDS."""
+    if compression == "zlib":
+        return zlib.compress(payload, 6)
+    if compression == "lzma":
+        return lzma.compress(payload)
+    return payload
+
+
+def decompressor(compression: Optional[str]):
+    """Get an incremental decompressor with a decompress(bytes) method, or None."""
+    if compression == "zlib":
+        return zlib.decompressobj()
+    if compression == "lzma":
+        return lzma.LZMADecompressor()
+    return None
+
+
+def encode_sections(document: Dict[str, Any], heavy=DEFAULT_HEAVY_SECTIONS,
+                    threshold: int = DEFAULT_SECTION_THRESHOLD,
+                    choose_compression=lambda size: None) -> bytes:
+    """
+    Encode a dictionary as a section table.
+
+    Layout: varint table length | table (JSON list of [key, kind, offset,
+    length, compression id]) | section bytes, with offsets counted from the
+    end of the table.
+    """
+    if not isinstance(document, dict):
+        raise SerializationError("The sections codec only encodes dictionaries")
+
+    table = []
+    data = bytearray()
+    for key, value in document.items():
+        encoded = _json_bytes(value)
+        compression = None
+        if isinstance(value, dict) and len(encoded) > threshold:
+            kind = SECTION_TABLE
+            body = encode_sections(value, heavy, threshold, choose_compression)
+        else:
+            if isinstance(value, list) and (key in heavy or len(encoded) > threshold):
+                kind = SECTION_LINES
+                body = b''.join(_json_bytes(item) + b'\n' for item in value)
+            else:
+                kind = SECTION_JSON
+                body = encoded
+            compression = choose_compression(len(body))
+            body = compress(body, compression)
+        table.append([key, kind, len(data), len(body), COMPRESSION_IDS[compression]])
+        data += body
+
+    raw_table = _json_bytes(table)
+    out = bytearray()
+    _write_varint(out, len(raw_table))
+    out += raw_table
+    out += data
+    return bytes(out)
+
+
+def read_section_table(data: bytes, pos: int = 0):
+    """Read a section table, returning (entries, position of the first section)."""
+    length, pos = _read_varint(data, pos)
+    table = json.loads(data[pos:pos + length].decode('utf-8'))
+    compressions = {value: key for key, value in COMPRESSION_IDS.items()}
+    entries = [(key, kind, offset, size, compressions[compression_id])
+               for key, kind, offset, size, compression_id in table]
+    return entries, pos + length
+
+
+def decode_section(kind: str, body: bytes, compression: Optional[str]) -> Any:
+    """Decode the bytes of one section."""
+    if kind == SECTION_TABLE:
+        return decode_sections(body)
+    body = decompressor(compression).decompress(body) if compression else body
+    if kind == SECTION_LINES:
+        return [json.loads(line) for line in body.decode('utf-8').split('\n') if line]
+    return json.loads(body.decode('utf-8'))
+
+
+def decode_sections(data: bytes) -> Dict[str, Any]:
+    """Decode a whole section table written by encode_sections."""
+    entries, start = read_section_table(data)
+    return {key: decode_section(kind, data[start + offset:start + offset + size], compression)
+            for key, kind, offset, size, compression in entries}
+
+
+# --- Serializer ---
+
+class Serializer:
+    """Encodes documents with a codec and optional compression behind a magic header."""
+
+    def __init__(self, codec: str = "json", compression: Optional[str] = "auto",
+                 compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+                 lzma_threshold: int = DEFAULT_LZMA_THRESHOLD,
+                 heavy_sections=DEFAULT_HEAVY_SECTIONS,
+                 section_threshold: int = DEFAULT_SECTION_THRESHOLD):
+        if codec not in CODEC_IDS:
+            raise ValueError(f"Unknown codec: {codec}")
+        if compression not in COMPRESSION_IDS and compression != "auto":
+            raise ValueError(f"Unknown compression: {compression}")
+        self.codec = codec
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.lzma_threshold = lzma_threshold
+        self.heavy_sections = heavy_sections
+        self.section_threshold = section_threshold
+
+    @classmethod
+    def from_name(cls, name: str, **kwargs) -> 'Serializer':
+        """Build a serializer from a name such as "json", "binary+zlib" or "json+auto"."""
+        codec, _, compression = name.partition('+')
+        return cls(codec, compression or None, **kwargs)
+
+    @property
+    def name(self) -> str:
+        """The name from_name accepts for this serializer."""
+        return f"{self.codec}+{self.compression}" if self.compression else self.codec
+
+    def _choose_compression(self, size: int) -> Optional[str]:
+        """Pick the compression for a payload of the given size."""
+        if self.compression is None or size < self.compress_threshold:
+            return None
+        if self.compression == "auto":
+            return "lzma" if size >= self.lzma_threshold else "zlib"
+        return self.compression
+
+    def encode(self, document: Any) -> bytes:
+        """Encode a document without header or compression."""
+        if self.codec == "binary":
+            return encode_binary(document)
+        if self.codec == "sections":
+            return encode_sections(document, self.heavy_sections, self.section_threshold)
+        return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, document: Any) -> bytes:
+        """Encode a document into the bytes of a save file."""
+        if self.codec == "sections":
+            # Sections are compressed one by one so they can be read on their own
+            payload = encode_sections(document, self.heavy_sections, self.section_threshold,
+                                      self._choose_compression)
+            compression = None
+        else:
+            payload = self.encode(document)
+            compression = self._choose_compression(len(payload))
+            payload = compress(payload, compression)
+        header = MAGIC + bytes((FORMAT_VERSION, CODEC_IDS[self.codec], COMPRESSION_IDS[compression]))
+        return header + payload
+
+    def loads(self, data: bytes) -> Any:
+        """Decode the bytes of a save file written by any serializer or by json.dump."""
+        return loads(data)
+
+    def dump(self, document: Any, path: str) -> int:
+        """Write a document to path, returning the number of bytes written."""
+        data = self.dumps(document)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return len(data)
+
+    def load(self, path: str) -> Any:
+        """Read a document from path."""
+        with open(path, 'rb') as f:
+            return loads(f.read())
+
+
+def read_header(data: bytes) -> Optional[Dict[str, Any]]:
+    """Describe the header of save file bytes, or return None for legacy JSON."""
+    if not data.startswith(MAGIC):
+        return None
+    if len(data) < HEADER_SIZE:
+        raise SerializationError("Truncated save file header")
+    version, codec_id, compression_id = data[len(MAGIC):HEADER_SIZE]
+    if version != FORMAT_VERSION:
+        raise SerializationError(f"Unsupported save format version {version}")
+    codecs = {value: key for key, value in CODEC_IDS.items()}
+    compressions = {value: key for key, value in COMPRESSION_IDS.items()}
+    if codec_id not in codecs or compression_id not in compressions:
+        raise SerializationError("Unknown codec or compression in save file header")
+    return {"codec": codecs[codec_id], "compression": compressions[compression_id]}
+
+
+def loads(data: bytes) -> Any:
+    """Decode save file bytes written by a Serializer or a legacy json.dump."""
+    header = read_header(data)
+    if header is None:
+        return json.loads(data.decode('utf-8'))
+
+    payload = data[HEADER_SIZE:]
+    if header["compression"] == "zlib":
+        payload = zlib.decompress(payload)
+    elif header["compression"] == "lzma":
+        payload = lzma.decompress(payload)
+
+    if header["codec"] == "binary":
+        return decode_binary(payload)
+    if header["codec"] == "sections":
+        return decode_sections(payload)
+    return json.loads(payload.decode('utf-8'))
+
+
+def load(path: str) -> Any:
+    """Read a save file written by a Serializer or a legacy json.dump."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+# Serializer used by the save functions unless they are given another one
+default_serializer = Serializer()
+
+# Serializer for large character and player saves, which lazy_save.py can read section by section
+sections_serializer = Serializer("sections")
@@ -4,6 +4,7 @@ Handles displaying changes to player stats, inventory, and relationships
 """
 from typing import Dict, Any, Union, List
 from colorama import init, Fore, Style
+from item_catalog import Inventory
 
 # Initialize colorama for colored terminal output
 init()
@@ -28,7 +29,7 @@ class StatusManager:
         return {
             'health': player_data.get('health', 100),
             'credits': player_data.get('resources', {}).get('credits', 0),
-            'inventory': set(player_data.get('inventory', [])),
+            'inventory': {definition.label for definition, _ in Inventory.of(player_data)} if player_data.get('inventory') else set(),
             'relationships': player_data.get('relationships', {}),
             'skills': player_data.get('skills', []),
             'knowledge': player_data.get('knowledge', []),
@@ -0,0 +1,234 @@
+"""
+Storage Module
+============
+
+Hash-sharded save directories with a persistent index.
+
+A flat directory with tens of thousands of saves makes every listing a full
+directory scan. ShardedDirectory spreads the files of each name over two
+levels of sub-directories named after a hash of the name:
+
+characters/
+├── index.jsonl            # Name -> metadata, one update per line
+├── 3f/
+│   └── a2/
+│       ├── strijder.json
+│       └── strijder.delta.jsonl
+└── ...
+
+The index keeps a little metadata per name (last_saved, level, location) so
+listing and searching never open the save files. It is an append-only
+journal folded in memory on load, and rewritten when it holds many more
+updates than names.
+
+Relative directories are resolved against the storage root, taken from the
+RPG_STORAGE_ROOT environment variable (the working directory if unset).
+Existing flat layouts are migrated the first time a directory without an
+index is opened.
+
+Usage:
+-----
+```python
+characters = ShardedDirectory("characters", describe=describe_character)
+path = characters.path_for("strijder", ".json", create=True)
+characters.record("strijder", {"level": 3, "location": "docks"})
+veterans = characters.search(lambda name, meta: meta.get("level", 0) >= 3)
+```
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import journal
+from persistence_writer import atomic_write, writer
+
+INDEX_FILENAME = "index.jsonl"
+
+# Rewrite the index once it holds this many times more updates than names
+INDEX_COMPACT_RATIO = 4
+
+_SHARD_NAME = re.compile(r"^[0-9a-f]{2}$")
+
+
+def storage_root() -> str:
+    """Get the directory relative save directories are resolved against."""
+    return os.environ.get("RPG_STORAGE_ROOT", "")
+
+
+def resolve(directory: str) -> str:
+    """Resolve a save directory against the storage root."""
+    if os.path.isabs(directory):
+        return directory
+    return os.path.join(storage_root(), directory) if storage_root() else directory
+
+
+def shard_for(name: str) -> str:
+    """Get the shard sub-path (two levels of two hex digits) of a name."""
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+    return os.path.join(digest[:2], digest[2:4])
+
+
+class ShardedDirectory:
+    def __init__(self, directory: str,
+                 describe: Optional[Callable[[str, str], Optional[Dict[str, Any]]]] = None):
+        """
+        Open a sharded save directory, migrating a flat layout if needed.
+
+        Args:
+        directory (str): The save directory, relative to the storage root unless absolute.
+        describe (Optional[Callable]): Called with (name, path of its .json file) to read
+            its index metadata; used to rebuild the index after a migration.
+        """
+        self.directory = resolve(directory)
+        self.describe = describe
+        self.index_path = os.path.join(self.directory, INDEX_FILENAME)
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            self._load_index()
+        else:
+            self.migrate()
+
+    def path_for(self, name: str, suffix: str = ".json", create: bool = False) -> str:
+        """Get the path of a file belonging to name, creating its shard if create is set."""
+        shard = os.path.join(self.directory, shard_for(name))
+        if create:
+            os.makedirs(shard, exist_ok=True)
+        return os.path.join(shard, f"{name}{suffix}")
+
+    # --- Index ---
+
+    def _load_index(self) -> None:
+        """Fold the index journal into memory, rewriting it if it grew long."""
+        updates = 0
+        index: Dict[str, Dict[str, Any]] = {}
+        for entry in journal.iter_entries(self.index_path):
+            updates += 1
+            if entry.get("deleted"):
+                index.pop(entry["name"], None)
+            else:
+                index.setdefault(entry["name"], {}).update(entry.get("meta", {}))
+        with self._lock:
+            self._index = index
+        if updates > INDEX_COMPACT_RATIO * max(len(index), 16):
+            self._rewrite_index()
+
+    def _rewrite_index(self) -> None:
+        """Write the index with one line per name."""
+        with self._lock:
+            entries = [{"name": name, "meta": meta} for name, meta in sorted(self._index.items())]
+        writer.wait(self.index_path)
+        atomic_write(self.index_path, journal.encode_entries(entries))
+
+    def record(self, name: str, meta: Dict[str, Any]) -> None:
+        """Add a name to the index or update its metadata."""
+        with self._lock:
+            self._index.setdefault(name, {}).update(meta)
+        writer.submit(self.index_path, journal.append_lines, self.index_path,
+                      journal.encode_entries([{"name": name, "meta": dict(meta)}]))
+
+    def remove(self, name: str) -> None:
+        """Drop a name from the index."""
+        with self._lock:
+            if self._index.pop(name, None) is None:
+                return
+        writer.submit(self.index_path, journal.append_lines, self.index_path,
+                      journal.encode_entries([{"name": name, "deleted": True}]))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def names(self) -> List[str]:
+        """List the indexed names, sorted."""
+        with self._lock:
+            return sorted(self._index)
+
+    def get_meta(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get the indexed metadata of a name."""
+        with self._lock:
+            meta = self._index.get(name)
+            return dict(meta) if meta is not None else None
+
+    def search(self, predicate: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+               **equals: Any) -> List[str]:
+        """
+        Find names by metadata without opening their files.
+
+        Args:
+        predicate (Optional[Callable]): Called with (name, metadata); keeps names it accepts.
+        **equals: Metadata fields that must have the given values, e.g. location="docks".
+
+        Returns:
+        List[str]: The matching names, sorted.
+        """
+        with self._lock:
+            items = sorted(self._index.items())
+        return [name for name, meta in items
+                if all(meta.get(field) == value for field, value in equals.items())
+                and (predicate is None or predicate(name, meta))]
+
+    # --- Migration ---
+
+    def _legacy_entries(self) -> List[str]:
+        """Find files and per-name folders left in the top level by a flat layout."""
+        legacy = []
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry == INDEX_FILENAME or entry.endswith(".tmp"):
+                continue
+            if os.path.isdir(path) and _SHARD_NAME.match(entry) and not os.path.exists(
+                    os.path.join(path, "history.json")):
+                continue
+            legacy.append(entry)
+        return legacy
+
+    def migrate(self) -> int:
+        """
+        Move a flat layout into shards and rebuild the index.
+
+        Files are grouped by the part of their name before the first dot, so
+        a save's snapshot, delta log and journals land in the same shard.
+
+        Returns:
+        int: The number of files and folders moved.
+        """
+        moved = 0
+        writer.wait()
+        # Folders first, so a legacy folder named like a shard is moved before that shard is created
+        legacy = sorted(self._legacy_entries(),
+                        key=lambda entry: not os.path.isdir(os.path.join(self.directory, entry)))
+        for entry in legacy:
+            name = entry.split('.')[0]
+            target = os.path.join(self.directory, shard_for(name), entry)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(os.path.join(self.directory, entry), target)
+            moved += 1
+        self.rebuild_index()
+        return moved
+
+    def rebuild_index(self) -> None:
+        """Rebuild the index by walking the shards."""
+        index: Dict[str, Dict[str, Any]] = {}
+        for first in os.listdir(self.directory):
+            first_path = os.path.join(self.directory, first)
+            if not (_SHARD_NAME.match(first) and os.path.isdir(first_path)):
+                continue
+            for second in os.listdir(first_path):
+                shard = os.path.join(first_path, second)
+                if not os.path.isdir(shard):
+                    continue
+                for filename in os.listdir(shard):
+                    if not filename.endswith(".json") or filename.count('.') != 1:
+                        continue
+                    name = filename[:-5]
+                    meta = self.describe(name, os.path.join(shard, filename)) if self.describe else None
+                    index[name] = meta or {}
+        with self._lock:
+            self._index = index
+        self._rewrite_index()
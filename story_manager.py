@@ -2,6 +2,8 @@ import json
 import os
 from typing import Dict, List, Optional
 
+from game_state_store import GameStateStore, get_store
+
 # Story scenarios define the main plot points and their requirements
 STORY_SCENARIOS = [
     {
@@ -56,35 +58,18 @@ STORY_SCENARIOS = [
 ]
 
 def load_game_state() -> Optional[Dict]:
-    """Load the game state from file."""
-    try:
-        with open("game_state.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+    """Get a copy of the game state held by the shared store."""
+    return get_store().to_dict()
 
 def save_game_state(game_state: Dict) -> None:
-    """Save the game state to file."""
-    with open("game_state.json", "w") as f:
-        json.dump(game_state, f)
+    """Replace the game state held by the shared store and write a snapshot."""
+    get_store().replace(game_state)
 
-def get_next_available_scenario() -> Optional[Dict]:
+def get_next_available_scenario(store: Optional[GameStateStore] = None) -> Optional[Dict]:
     """Get the next available scenario based on completed scenarios."""
-    game_state = load_game_state()
-    if not game_state:
-        # Start with intro if no game state
-        return next(s for s in STORY_SCENARIOS if s["id"] == "intro")
-    
-    completed = set(game_state["completed_scenarios"])
-    
-    # Find scenarios where all requirements are met
-    available_scenarios = [
-        s for s in STORY_SCENARIOS
-        if s["id"] not in completed and
-        all(req in completed for req in s["requirements"])
-    ]
-    
-    return available_scenarios[0] if available_scenarios else None
+    store = store or get_store()
+    # Scenarios whose requirements are all met, starting with intro on a new game
+    return store.index_for(STORY_SCENARIOS).first_available()
 
 def generate_story_event(scenario: Dict, player: Dict) -> Dict:
     """Generate an event based on the current scenario."""
@@ -122,14 +107,6 @@ def generate_story_event(scenario: Dict, player: Dict) -> Dict:
             "scenario_id": scenario["id"]
         }
 
-def mark_scenario_complete(scenario_id: str) -> None:
+def mark_scenario_complete(scenario_id: str, store: Optional[GameStateStore] = None) -> None:
     """Mark a scenario as complete in the game state."""
-    game_state = load_game_state()
-    if not game_state:
-        game_state = {"completed_scenarios": [], "current_scenario": None}
-    
-    if scenario_id not in game_state["completed_scenarios"]:
-        game_state["completed_scenarios"].append(scenario_id)
-    
-    game_state["current_scenario"] = None
-    save_game_state(game_state)
+    (store or get_store()).mark_scenario_complete(scenario_id)
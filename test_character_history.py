@@ -0,0 +1,65 @@
+import json
+import os
+
+import journal
+from character_manager import CharacterManager
+from storage import shard_for
+from persistence_writer import writer
+
+
+def test_history_rotates_and_streams_with_filters(tmp_path):
+    manager = CharacterManager(str(tmp_path), history_max_bytes=400)
+    for i in range(20):
+        location = "docks" if i % 2 else "tower"
+        manager._update_character_log("Vex", {"health": 100 - i, "current_location": location})
+    writer.flush()
+
+    log = manager._history_log("vex")
+    assert len(log.archives()) > 1
+    assert all(path.endswith(".jsonl.gz") for path in log.archives())
+
+    entries = list(manager.iter_character_history("Vex"))
+    assert [entry["stats"]["health"] for entry in entries] == [100 - i for i in range(20)]
+
+    docks = list(manager.iter_character_history("Vex", match={"stats.location": "docks"}))
+    assert len(docks) == 10
+    later = list(manager.iter_character_history("Vex", since=entries[15]["timestamp"]))
+    assert later[0]["stats"]["health"] <= 85
+
+
+def test_archives_are_capped(tmp_path):
+    log = journal.RotatingJournal(str(tmp_path / "x.history.jsonl"), max_bytes=50,
+                                  compression="lzma", max_archives=2)
+    for i in range(30):
+        log.append({"timestamp": f"2024-01-01T00:00:{i:02d}", "i": i})
+
+    assert len(log.archives()) == 2
+    kept = [entry["i"] for entry in log.iter_entries()]
+    assert kept == list(range(kept[0], 30))
+
+
+def test_legacy_history_is_migrated(tmp_path):
+    manager = CharacterManager(str(tmp_path))
+    legacy_dir = os.path.join(os.path.dirname(manager._save_path("vex")), "vex")
+    os.makedirs(legacy_dir)
+    with open(os.path.join(legacy_dir, "history.json"), "w") as f:
+        json.dump([{"timestamp": "2020-01-01T00:00:00", "changes": {}, "stats": {}}], f)
+
+    manager._update_character_log("Vex", {"health": 50})
+    history = list(manager.iter_character_history("vex"))
+    assert [entry["timestamp"][:4] for entry in history][0] == "2020"
+    assert len(history) == 2
+    assert not os.path.exists(legacy_dir)
+
+
+def test_mixed_case_legacy_folder_is_migrated(tmp_path):
+    # The old layout named the history folder after the character as written
+    os.makedirs(tmp_path / "Strijder")
+    with open(tmp_path / "Strijder" / "history.json", "w") as f:
+        json.dump([{"timestamp": "2020-01-01T00:00:00", "changes": {}, "stats": {}}], f)
+    manager = CharacterManager(str(tmp_path))
+
+    manager._update_character_log("Strijder", {"health": 50})
+    history = list(manager.iter_character_history("strijder"))
+    assert len(history) == 2 and history[0]["timestamp"] == "2020-01-01T00:00:00"
+    assert not os.path.exists(os.path.join(str(tmp_path), shard_for("Strijder"), "Strijder"))
@@ -0,0 +1,41 @@
+import random
+import time
+
+from combat_ai import MAX_BUDGET, MCTSOpponent, opponent_policy_for
+from combat_system import CombatSystem, random_policy
+
+BRUTE = {"name": "Brute", "hp": 420, "abilities": {
+    "Flail": {"damage_range": (0, 2)},
+    "Crush": {"damage_range": (20, 30)},
+}}
+
+
+def test_search_prefers_the_stronger_ability():
+    combat = CombatSystem({"name": "Hero"}, BRUTE, rng=random.Random(0))
+    policy = MCTSOpponent(iterations=400)
+    assert policy(combat, combat.opponent, combat.player, random.Random(5)) == "Crush"
+
+    stats = policy.statistics(combat, random.Random(5))
+    assert stats["Crush"][1] > stats["Flail"][1]
+
+
+def test_search_stays_within_its_budget():
+    combat = CombatSystem({"name": "Hero"}, BRUTE)
+    assert MCTSOpponent(budget=10).budget == MAX_BUDGET
+
+    policy = MCTSOpponent(budget=0.02)
+    start = time.perf_counter()
+    policy.statistics(combat, random.Random(1))
+    assert time.perf_counter() - start < 0.1
+
+
+def test_parallel_workers_add_their_visits():
+    combat = CombatSystem({"name": "Hero"}, BRUTE)
+    stats = MCTSOpponent(iterations=50, workers=2).statistics(combat, random.Random(2))
+    assert sum(visits for visits, _ in stats.values()) == 100
+
+
+def test_difficulty_levels_map_to_budgets():
+    assert opponent_policy_for("Easy") is random_policy
+    assert opponent_policy_for("Hard").budget == 0.02
+    assert opponent_policy_for("Unknown").budget == opponent_policy_for("Normal").budget
@@ -0,0 +1,56 @@
+import random
+
+from combat_system import Ability, CombatEntity
+
+
+def test_expiry_matches_per_turn_countdown():
+    rng = random.Random(4)
+    entity = CombatEntity("Hero", 100, 100, {"Strike": Ability("Strike", (1, 2), cooldown=3)},
+                          status_effects={"poison": 2})
+    effects, buffs, cooldown = {"poison": 2}, {}, 0
+
+    for _ in range(300):
+        for _ in range(rng.randint(0, 2)):
+            name, duration = rng.choice("abcde"), rng.randint(0, 5)
+            entity.apply_status_effect(name, duration)
+            effects[name] = duration
+        if rng.random() < 0.3:
+            name, duration = rng.choice("xyz"), rng.randint(1, 4)
+            entity.apply_buff(name, {"damage_multiplier": 2}, duration)
+            buffs[name] = duration
+        if rng.random() < 0.2 and cooldown == 0:
+            entity.abilities["Strike"].current_cooldown = 3
+            cooldown = 3
+
+        entity.update_status_effects()
+        entity.update_cooldowns()
+        effects = {name: left - 1 for name, left in effects.items() if left > 1}
+        buffs = {name: left - 1 for name, left in buffs.items() if left > 1}
+        cooldown = max(cooldown - 1, 0)
+
+        assert dict(entity.status_effects) == effects
+        assert {name: data["duration"] for name, data in entity.buffs.items()} == buffs
+        assert entity.damage_multiplier() == 2 ** len(buffs)
+        assert entity.abilities["Strike"].current_cooldown == cooldown
+        assert entity.ready_abilities() == ([] if cooldown else ["Strike"])
+
+
+def test_abilities_added_later_count_down_too():
+    entity = CombatEntity("Hero", 100, 100, {})
+    entity.update_cooldowns()
+    entity.abilities["Kick"] = Ability("Kick", (1, 2), cooldown=2, current_cooldown=2)
+    entity.update_cooldowns()
+    assert entity.abilities["Kick"].current_cooldown == 1
+
+
+def test_buff_entries_are_live():
+    entity = CombatEntity("Hero", 100, 100, {})
+    entity.apply_buff("rage", {"damage_multiplier": 1.5}, 1)
+    assert entity.buffs["rage"] == {"effect": {"damage_multiplier": 1.5}, "duration": 1}
+
+    entity.buffs["rage"]["duration"] += 1
+    entity.buffs["rage"]["effect"] = {"damage_multiplier": 3}
+    entity.update_status_effects()
+    assert entity.buffs["rage"]["duration"] == 1 and entity.damage_multiplier() == 3
+    entity.update_status_effects()
+    assert "rage" not in entity.buffs and entity.damage_multiplier() == 1
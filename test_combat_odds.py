@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+import combat_odds
+from combat_odds import (TableTooLarge, action_win_chances, cached_win_chance, get_table,
+                         request_table, win_chance)
+from combat_simulator import run_simulation
+from combat_ai import opponent_policy_for
+from combat_system import CombatSystem
+
+LOADOUT = {"hp": 120, "abilities": {
+    "Strike": {"damage_range": (10, 20)},
+    "Bash": {"damage_range": (5, 10), "cooldown": 2, "special_effects": {"stun": 1}},
+    "Cry": {"damage_range": (0, 0), "cooldown": 3,
+            "special_effects": {"buff": {"effect": {"damage_multiplier": 1.5}, "duration": 2}}},
+}}
+WOLF = {"name": "Wolf", "hp": 150, "abilities": {
+    "Bite": {"damage_range": (8, 16)},
+    "Pounce": {"damage_range": (12, 22), "cooldown": 2},
+}}
+
+
+def _combat():
+    return CombatSystem({"name": "Hero"}, WOLF, player_abilities=LOADOUT["abilities"],
+                        player_hp=LOADOUT["hp"])
+
+
+def test_exact_odds_match_monte_carlo():
+    exact = win_chance(_combat(), "tactical")
+    report = run_simulation(LOADOUT, WOLF, fights=4000, player_policy="tactical", seed=11, processes=1)
+    assert 0.05 < exact < 0.95
+    assert abs(report.win_rate - exact) < 4 * math.sqrt(exact * (1 - exact) / 4000)
+
+    table = get_table(_combat(), "tactical")
+    turns = table.expected_turns(120, 150, table.state_of(_combat()))
+    assert abs(report.to_dict()["turns"]["mean"] - turns) < 0.3
+
+
+def test_optimal_play_is_at_least_as_good_as_fixed_policies():
+    combat = _combat()
+    best = win_chance(combat)
+    assert best >= win_chance(combat, "tactical") - 1e-12
+    assert best >= win_chance(combat, "greedy") - 1e-12
+    assert abs(max(action_win_chances(combat).values()) - best) < 1e-9
+
+
+def test_tables_are_memoized_and_feed_the_combat_state():
+    combat = _combat()
+    assert get_table(combat) is get_table(_combat())
+    state = combat.get_combat_state()
+    assert state["win_chance"] == round(win_chance(combat), 3)
+
+    table = get_table(combat)
+    weak, strong = table.opponent_hp_for(0.99), table.opponent_hp_for(0.95)
+    assert weak < strong
+
+
+def test_combat_state_never_solves_and_large_fights_are_refused(monkeypatch):
+    knight = dict(WOLF, hp=149)
+    combat = CombatSystem({"name": "Hero"}, knight, player_abilities=LOADOUT["abilities"],
+                          player_hp=LOADOUT["hp"])
+    assert cached_win_chance(combat) is None
+    assert combat.get_combat_state()["win_chance"] is None
+    combat._odds_request.result(timeout=60)
+    assert combat.get_combat_state()["win_chance"] == round(win_chance(combat), 3)
+
+    monkeypatch.setattr(combat_odds, "MAX_TABLE_CELLS", 1000)
+    giant = CombatSystem({"name": "Hero"}, dict(WOLF, hp=400))
+    with pytest.raises(TableTooLarge):
+        request_table(giant).result(timeout=60)
+    assert giant.get_win_chance() is None
+
+
+def test_no_odds_against_a_searching_opponent():
+    combat = CombatSystem({"name": "Hero"}, WOLF, player_abilities=LOADOUT["abilities"],
+                          player_hp=LOADOUT["hp"], opponent_policy=opponent_policy_for("Hard"))
+    get_table(combat)
+    assert combat.get_combat_state()["win_chance"] is None and combat._odds_request is None
+    easy = CombatSystem({"name": "Hero"}, WOLF, player_abilities=LOADOUT["abilities"],
+                        player_hp=LOADOUT["hp"], opponent_policy=opponent_policy_for("Easy"))
+    assert easy.get_win_chance() == round(win_chance(easy), 3)
+
+
+def test_table_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(combat_odds, "TABLE_CACHE_SIZE", 2)
+    for hp in (30, 31, 32):
+        get_table(CombatSystem({"name": "Hero"}, dict(WOLF, hp=hp)))
+    assert len(combat_odds._tables) == 2
@@ -0,0 +1,74 @@
+import os
+import random
+
+import pytest
+
+import combat_replay
+from combat_ai import MCTSOpponent
+from combat_replay import RECORD, decode_replay, load_replay, read_records
+from combat_system import CombatSystem
+
+OPPONENT = {"name": "Brute", "hp": 160, "abilities": {
+    "Smash": "A heavy blow",
+    "Headbutt": {"damage_range": (5, 10), "cooldown": 2, "special_effects": {"stun": 1}},
+}}
+
+
+def _play(seed, opponent_policy=None, turns=100):
+    combat = CombatSystem({"name": "Hero"}, OPPONENT, seed=seed, opponent_policy=opponent_policy)
+    rng = random.Random(seed)
+    while not combat.is_combat_finished() and turns:
+        combat.execute_turn(rng.choice(combat.player.ready_abilities()))
+        turns -= 1
+    return combat
+
+
+def test_replay_rebuilds_every_turn(tmp_path):
+    combat = _play(7, MCTSOpponent(iterations=20))
+    path = str(tmp_path / "fight.rpgr")
+    combat.save_replay(path)
+
+    replay = load_replay(path)
+    assert replay.seed == 7 and replay.turns == combat.turn_number - 1
+    assert replay.records.itemsize == RECORD.size
+    for entry in combat.combat_log:
+        state = replay.state_at(entry["turn"] + 1)
+        assert state.player.current_health == entry["player_hp"]
+        assert state.opponent.current_health == entry["opponent_hp"]
+
+    final = replay.final_state()
+    assert final.get_combat_state()["available_actions"] == combat.get_combat_state()["available_actions"]
+    assert final.opponent.status_effects == combat.opponent.status_effects
+
+
+def test_seed_reproduces_a_fight():
+    first, second = _play(3), _play(3)
+    assert first.replay.to_bytes() == second.replay.to_bytes()
+    assert decode_replay(first.replay.to_bytes()).turns == first.turn_number - 1
+
+
+def test_bulk_records(tmp_path):
+    paths = []
+    for seed in range(5):
+        path = str(tmp_path / f"{seed}.rpgr")
+        _play(seed).save_replay(path)
+        paths.append(path)
+
+    records = read_records(paths)
+    assert sorted(set(records["fight"].tolist())) == list(range(5))
+    assert len(records) == sum(len(load_replay(path)) for path in paths)
+    player = records[records["actor"] == 0]
+    assert ((player["roll"] >= 0) & (player["roll"] <= 40)).all()
+
+
+def test_default_directory_keeps_the_newest_replays(tmp_path, monkeypatch):
+    monkeypatch.setenv("RPG_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(combat_replay, "KEEP_REPLAYS", 2)
+    paths = [_play(seed, turns=3).save_replay() for seed in range(1, 5)]
+    assert sorted(os.listdir(tmp_path / "replays")) == sorted(os.path.basename(path) for path in paths[-2:])
+
+
+def test_fighters_with_too_many_abilities_are_refused():
+    crowd = dict(OPPONENT, abilities={f"Move {i}": "A move" for i in range(255)})
+    with pytest.raises(ValueError):
+        CombatSystem({"name": "Hero"}, crowd)
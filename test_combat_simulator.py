@@ -0,0 +1,37 @@
+import random
+
+from combat_simulator import run_simulation, simulate_fight
+from combat_system import CombatSystem
+
+OPPONENT = {"name": "Brute", "hp": 150, "abilities": {"Smash": "A heavy blow"}}
+
+
+def test_fights_are_reproducible_per_seed():
+    first = simulate_fight({}, OPPONENT, "tactical", seed=42)
+    second = simulate_fight({}, OPPONENT, "tactical", seed=42)
+    assert first == second
+    assert first.winner in ("player", "opponent")
+    assert sum(first.ability_uses.values()) == first.turns
+
+
+def test_results_do_not_depend_on_process_count():
+    serial = run_simulation({}, OPPONENT, fights=60, seed=3, processes=1, chunk_size=16)
+    parallel = run_simulation({}, OPPONENT, fights=60, seed=3, processes=2, chunk_size=16)
+    assert serial.to_dict() == parallel.to_dict()
+    assert serial.wins + serial.losses + serial.draws == 60
+    assert sum(serial.turn_counts.values()) == 60
+
+
+def test_stun_skips_the_opponent_and_cooldowns_count_down():
+    loadout = {"Sword Strike": {"damage_range": (20, 40)},
+               "Shield Bash": {"damage_range": (10, 20), "cooldown": 2, "special_effects": {"stun": 1}}}
+    combat = CombatSystem({"name": "Hero"}, OPPONENT, rng=random.Random(1), player_abilities=loadout)
+    turn = combat.execute_turn("Shield Bash")
+    assert turn["opponent_stunned"] and turn["opponent_damage"] == 0
+    assert "Shield Bash" not in combat.get_combat_state()["available_actions"]
+
+    turn = combat.execute_turn("Sword Strike")
+    assert turn["opponent_action"] == "Smash"
+    combat.execute_turn("Sword Strike")
+    assert "Shield Bash" in combat.player.ready_abilities()
+    assert len(combat.combat_log) == 3
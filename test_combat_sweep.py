@@ -0,0 +1,60 @@
+from combat_sweep import (apply_params, config_id, grid, load_results, random_search, rank, run_sweep,
+                          setup_id)
+
+OPPONENT = {"name": "Brute", "hp": 150, "abilities": {"Smash": "A heavy blow"}}
+SPACE = {"opponent.hp": [100, 200], "player.abilities.Sword Strike.damage_range": [(10, 20), (20, 40)]}
+
+
+def test_apply_params_changes_copies_only():
+    loadout, opponent = apply_params({}, OPPONENT, {"opponent.hp": 90,
+                                                   "opponent.abilities.Smash.cooldown": 2,
+                                                   "player.abilities.Sword Strike.damage_range": [5, 9]})
+    assert opponent["hp"] == 90 and OPPONENT["hp"] == 150
+    assert opponent["abilities"]["Smash"] == {"description": "A heavy blow", "cooldown": 2}
+    assert loadout["abilities"]["Sword Strike"]["damage_range"] == (5, 9)
+    assert "Shield Bash" in loadout["abilities"]
+
+
+def test_grid_and_random_search():
+    configs = list(grid(SPACE))
+    assert len(configs) == 4 and len({config_id(c) for c in configs}) == 4
+    samples = list(random_search({"opponent.hp": (50, 60), "player.hp": [1, 2]}, 5, seed=1))
+    assert samples == list(random_search({"opponent.hp": (50, 60), "player.hp": [1, 2]}, 5, seed=1))
+    assert all(50 <= s["opponent.hp"] <= 60 and s["player.hp"] in (1, 2) for s in samples)
+
+
+def test_sweep_streams_rows_and_resumes(tmp_path):
+    path = str(tmp_path / "sweep.jsonl")
+    configs = list(grid(SPACE))
+    rows = run_sweep(configs[:2], {}, OPPONENT, path, fights=20, processes=1, progress=False)
+    assert len(rows) == 2 and len(load_results(path)) == 2
+
+    rows = run_sweep(configs, {}, OPPONENT, path, fights=20, processes=2, progress=False)
+    assert len(rows) == 4
+    setup = setup_id({}, OPPONENT, 20, 0, "scalar", "tactical", "random")
+    assert sorted(row["id"] for row in load_results(path)) == sorted(config_id(c, setup) for c in configs)
+    weak = next(row for row in rows if row["params"] == {"opponent.hp": 200,
+                                                        "player.abilities.Sword Strike.damage_range": [10, 20]})
+    strong = next(row for row in rows if row["params"]["opponent.hp"] == 100
+                  and row["params"]["player.abilities.Sword Strike.damage_range"] == [20, 40])
+    assert strong["win_rate"] >= weak["win_rate"]
+
+    # A different base opponent or fight count is a new sweep, not a resume
+    rows = run_sweep(configs[:1], {}, dict(OPPONENT, name="Twin"), path, fights=20, processes=1,
+                     progress=False)
+    assert len(rows) == 1
+    rows = run_sweep(configs[:1], {}, OPPONENT, path, fights=30, processes=1, progress=False)
+    assert len(rows) == 1 and rows[0]["wins"] + rows[0]["losses"] + rows[0]["draws"] == 30
+    assert len(load_results(path)) == 6
+
+
+def test_csv_table_and_ranking(tmp_path):
+    path = str(tmp_path / "sweep.csv")
+    run_sweep(grid({"opponent.hp": [100, 150]}), {}, OPPONENT, path, fights=10, processes=1, progress=False)
+    rows = load_results(path)
+    assert len(rows) == 2 and isinstance(rows[0]["params"], dict)
+    assert rows[0]["win_rate"] == rows[0]["wins"] / 10
+
+    table = [{"win_rate": 0.9, "mean_turns": 5}, {"win_rate": 0.6, "mean_turns": 9},
+             {"win_rate": 0.64, "mean_turns": 7}, {"win_rate": 0.3, "mean_turns": 5}]
+    assert [row["win_rate"] for row in rank(table, (0.55, 0.7))] == [0.64, 0.6]
@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from concurrency import ConflictError, file_lock, three_way_merge
+from incremental_save import IncrementalSaveFile
+
+
+def test_merge_keeps_both_sides():
+    base = {"credits": 100, "inventory": ["Pistol"], "location": "docks"}
+    mine = {"credits": 50, "inventory": ["Pistol", "Medkit"], "location": "docks"}
+    theirs = {"credits": 100, "inventory": ["Pistol", "Data Chip"], "location": "tower"}
+
+    merged = three_way_merge(base, mine, theirs)
+    assert merged == {"credits": 50, "inventory": ["Pistol", "Data Chip", "Medkit"], "location": "tower"}
+
+    with pytest.raises(ConflictError):
+        three_way_merge(base, mine, dict(theirs, credits=75), conflict="raise")
+    assert three_way_merge(base, mine, dict(theirs, credits=75), conflict="theirs")["credits"] == 75
+
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "strijder.json")
+    IncrementalSaveFile(path).save({"credits": 100, "inventory": []})
+
+    cli, web = IncrementalSaveFile(path), IncrementalSaveFile(path)
+    cli_player, web_player = cli.load(), web.load()
+    cli_player["credits"] -= 30
+    cli.save(cli_player)
+    web_player["inventory"].append("Medkit")
+    web.save(web_player)
+
+    assert web.diverged
+    fresh = IncrementalSaveFile(path)
+    assert fresh.load() == {"credits": 70, "inventory": ["Medkit"]} and fresh.version == 3
+
+    with pytest.raises(ConflictError):
+        cli.compare_and_swap(dict(cli_player, credits=0), expected_version=2)
+
+
+def test_loads_do_not_cut_off_a_save_in_progress(tmp_path):
+    path = str(tmp_path / "strijder.json")
+    save_file = IncrementalSaveFile(path)
+    save_file.save({"credits": 0})
+    save_file.save({"credits": 1})
+    line = json.dumps({"version": 3, "ops": [{"op": "replace", "path": "/credits", "value": 2}]}) + "\n"
+
+    loaded = []
+    with file_lock(path):
+        with open(save_file.log_path, "a") as f:
+            f.write(line[:10])
+        reader = threading.Thread(target=lambda: loaded.append(IncrementalSaveFile(path).load()))
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive()
+        with open(save_file.log_path, "a") as f:
+            f.write(line[10:])
+    reader.join()
+
+    assert loaded == [{"credits": 2}]
+    fresh = IncrementalSaveFile(path)
+    assert fresh.load() == {"credits": 2} and fresh.version == 3
+
+
+def _increment(path, times):
+    save_file = IncrementalSaveFile(path)
+    for _ in range(times):
+        save_file.update(lambda player: player.update(counter=player["counter"] + 1))
+
+
+def test_locked_updates_across_processes(tmp_path):
+    path = str(tmp_path / "counter.json")
+    IncrementalSaveFile(path).save({"counter": 0})
+
+    workers = [multiprocessing.Process(target=_increment, args=(path, 25)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+
+    assert IncrementalSaveFile(path).load()["counter"] == 100
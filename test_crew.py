@@ -0,0 +1,121 @@
+import random
+
+import numpy as np
+
+from crew import (CREW_STATUSES, advance_crew_time, advance_crews, crew_status_changes,
+                  update_crew_status)
+
+
+def step_hourly(crew, hours):
+    """The update_crew_status rule applied one hour at a time (levels without float drift)."""
+    start, crew = crew, dict(crew)
+    changes = []
+    for hour in range(1, hours + 1):
+        crew['rest'] = max(0, min(100, start['rest'] - 0.5 * hour))
+        crew['morale'] = max(0, min(100, start['morale'] - 0.2 * hour))
+        if crew['rest'] >= 80 and crew['morale'] >= 80:
+            status = "Well Rested"
+        elif crew['rest'] >= 60 and crew['morale'] >= 60:
+            status = "Rested"
+        elif crew['rest'] <= 30 or crew['morale'] <= 30:
+            status = "Exhausted"
+        elif crew['rest'] <= 50 or crew['morale'] <= 50:
+            status = "Tired"
+        else:
+            status = crew['status']
+        if status != crew['status']:
+            changes.append((hour, status))
+            crew['status'] = status
+    return crew, changes
+
+
+def random_crew(rng):
+    return {'rest': rng.choice([rng.uniform(0, 100), rng.randint(0, 100)]),
+            'morale': rng.choice([rng.uniform(0, 100), rng.randint(0, 100)]),
+            'status': rng.choice(CREW_STATUSES[:4]), 'hours_since_rest': 0}
+
+
+def test_jumps_match_hourly_steps():
+    rng = random.Random(7)
+    for _ in range(500):
+        crew, hours = random_crew(rng), rng.randint(1, 400)
+        expected, expected_changes = step_hourly(crew, hours)
+        player = {'crew': dict(crew)}
+        assert advance_crew_time(player, hours) == expected_changes
+        assert player['crew']['status'] == expected['status']
+        assert abs(player['crew']['rest'] - expected['rest']) < 1e-6
+        assert abs(player['crew']['morale'] - expected['morale']) < 1e-6
+        assert player['crew']['hours_since_rest'] == hours
+
+
+def test_long_leave_reports_every_threshold():
+    player = {'crew': {'rest': 100, 'morale': 100, 'status': "Well Rested", 'hours_since_rest': 0}}
+    update_crew_status(player, 10_000)
+    assert player['crew']['status'] == "Exhausted" and player['crew']['rest'] == 0
+    changes = crew_status_changes({'rest': 100, 'morale': 100, 'status': "Well Rested"}, 1000)
+    assert changes == [(41, "Rested"), (100, "Tired"), (140, "Exhausted")]
+
+
+def test_vectorized_matches_scalar():
+    rng = random.Random(3)
+    crews = [random_crew(rng) for _ in range(300)]
+    hours = np.array([rng.randint(0, 300) for _ in crews])
+    result = advance_crews([c['rest'] for c in crews], [c['morale'] for c in crews],
+                           [CREW_STATUSES.index(c['status']) for c in crews], hours)
+    for i, crew in enumerate(crews):
+        player = {'crew': dict(crew)}
+        advance_crew_time(player, int(hours[i]))
+        assert CREW_STATUSES[result['status'][i]] == player['crew']['status']
+        assert abs(result['rest'][i] - player['crew']['rest']) < 1e-9
+    rest, morale = np.array([c['rest'] for c in crews]), np.array([c['morale'] for c in crews])
+    assert np.allclose(result['crossings']['Exhausted'], np.minimum((rest - 30) / 0.5, (morale - 30) / 0.2))
+
+
+def test_planner_matches_exhaustive_search():
+    from crew import CREW_ACTIVITIES, _after_activity, _levels_after, _plans, plan_crew_activities
+
+    def exhaustive(rest, morale, budget, window, targets):
+        best = None
+        def visit(r, m, spent, hours, sequence):
+            nonlocal best
+            fr, fm = _levels_after(r, m, window - hours)
+            key = (round(max(0, targets[0] - fr) + max(0, targets[1] - fm), 9), spent, len(sequence))
+            best = key if best is None or key < best else best
+            for name, activity in CREW_ACTIVITIES.items():
+                if hours + activity['duration'] <= window and spent + activity['cost'] <= budget:
+                    visit(*_after_activity(r, m, activity), spent + activity['cost'],
+                          hours + activity['duration'], sequence + (name,))
+        visit(rest, morale, 0, 0, ())
+        return best
+
+    rng = random.Random(5)
+    for _ in range(25):
+        rest, morale = rng.randint(0, 100), rng.randint(0, 100)
+        credits, window = rng.choice([0, 60, 150, 400]), rng.randint(0, 12)
+        targets = (rng.choice([60, 80, 100]), rng.choice([60, 80, 100]))
+        _plans.clear()
+        player = {'crew': {'rest': rest, 'morale': morale, 'status': "Tired"}, 'resources': {'credits': credits}}
+        plan = plan_crew_activities(player, window, *targets)
+        shortfall = max(0, targets[0] - plan.rest) + max(0, targets[1] - plan.morale)
+        assert (round(shortfall, 9), plan.cost, len(plan.activities)) == exhaustive(rest, morale, credits, window, targets)
+        assert plan.cost <= credits and plan.hours <= window
+
+
+def test_plans_are_cached_per_rounded_state():
+    from crew import _plans, plan_crew_activities
+    _plans.clear()
+    player = {'crew': {'rest': 40.2, 'morale': 30.4, 'status': "Tired"}, 'resources': {'credits': 1000}}
+    first = plan_crew_activities(player, 48)
+    player['crew'].update(rest=39.8, morale=30.3)
+    second = plan_crew_activities(player, 48)
+    assert len(_plans) == 1 and first.activities == second.activities
+    assert second.meets_targets and second.rest >= 80 and second.morale >= 80
+
+
+def test_rich_plans_can_mix_activities():
+    from crew import _plans, plan_crew_activities
+    _plans.clear()
+    player = {'crew': {'rest': 65, 'morale': 0, 'status': "Exhausted"}, 'resources': {'credits': 1000}}
+    plan = plan_crew_activities(player, 7)
+    # Movie Night and Feast fit 7 hours together but cost more than any one activity repeated
+    assert sorted(plan.activities) == ["Feast", "Movie Night"] and plan.cost == 220
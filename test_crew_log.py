@@ -0,0 +1,76 @@
+import random
+
+import journal
+from crew import get_crew_status_report, initialize_crew, perform_crew_activity
+from crew_log import CrewLog
+
+
+def entry(i, activity="Movie Night"):
+    return {"activity": activity, "duration": i % 4 + 1, "cost": i * 10,
+            "effects": {"rest": i, "morale": -i}}
+
+
+def test_wraparound_keeps_newest_in_order():
+    crew = {"activity_log": []}
+    log = CrewLog.of(crew, capacity=5)
+    for i in range(13):
+        log.append(entry(i))
+    assert len(log) == 5 and len(crew["activity_log"]["entries"]) == 5
+    assert [e["effects"]["rest"] for e in log] == [8, 9, 10, 11, 12]
+    assert log.recent(0) == []
+    for count in range(1, 8):
+        assert log.recent(count) == list(log)[-count:]
+
+
+def test_totals_match_a_full_scan():
+    rng = random.Random(3)
+    crew = {}
+    log = CrewLog.of(crew, capacity=7)
+    history = [entry(rng.randrange(100), rng.choice(["Movie Night", "Meditation", "Rest"]))
+               for _ in range(60)]
+    for e in history:
+        log.append(e)
+    totals = log.totals
+    assert totals["count"] == 60
+    assert totals["hours"] == sum(e["duration"] for e in history)
+    assert totals["credits"] == sum(e["cost"] for e in history)
+    for name, stats in totals["activities"].items():
+        mine = [e for e in history if e["activity"] == name]
+        assert stats["count"] == len(mine)
+        assert stats["rest"] == sum(e["effects"]["rest"] for e in mine)
+        assert stats["morale"] == sum(e["effects"]["morale"] for e in mine)
+
+
+def test_list_log_migrates_and_spills_to_archive(tmp_path):
+    archive = str(tmp_path / "activities.jsonl")
+    history = [entry(i) for i in range(8)]
+    crew = {"activity_log": list(history)}
+    log = CrewLog.of(crew, capacity=3, archive_path=archive)
+    assert isinstance(crew["activity_log"], dict)
+    assert list(log) == history[-3:] and log.totals["count"] == 8
+    assert list(journal.iter_entries(archive)) == history[:5]
+
+    log.append(entry(8))
+    assert list(journal.iter_entries(archive))[-1] == history[5]
+    assert CrewLog.of(crew).recent(2) == [history[7], entry(8)]
+
+
+def test_migration_fills_missing_costs():
+    history = [{"activity": "Movie Night", "duration": 3, "effects": {"rest": 10, "morale": 20}},
+               {"activity": "Feast", "duration": 4, "effects": {"rest": 5, "morale": 25}}]
+    log = CrewLog.of({"activity_log": history})
+    assert [e["cost"] for e in log] == [20, 200]
+    assert log.totals["credits"] == 220 and log.totals["activities"]["Feast"]["credits"] == 200
+
+
+def test_activities_are_logged_and_reported():
+    player = {"resources": {"credits": 1000}}
+    initialize_crew(player)
+    for _ in range(3):
+        perform_crew_activity(player, "Movie Night")
+    perform_crew_activity(player, "Recreation Time")
+    report = get_crew_status_report(player)
+    assert [e["activity"] for e in report["recent_activities"]] == ["Movie Night", "Movie Night", "Recreation Time"]
+    totals = report["activity_totals"]
+    assert totals["count"] == 4 and totals["credits"] == 1000 - player["resources"]["credits"]
+    assert totals["activities"]["Movie Night"]["count"] == 3
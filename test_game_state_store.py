@@ -0,0 +1,53 @@
+from game_state_store import GameStateStore
+
+SCENARIOS = [
+    {"id": "intro", "requirements": []},
+    {"id": "first_job", "requirements": ["intro"]},
+    {"id": "betrayal", "requirements": ["intro", "first_job"]},
+]
+
+EVENTS = {
+    "starting_conflict": {"id": "starting_conflict", "required_previous": None},
+    "rival_gang": {"id": "rival_gang", "required_previous": ["starting_conflict"]},
+}
+
+
+def test_index_tracks_completed_scenarios(tmp_path):
+    store = GameStateStore(str(tmp_path / "game_state.json"))
+
+    assert store.index_for(SCENARIOS).first_available()["id"] == "intro"
+    store.mark_scenario_complete("intro")
+    assert [s["id"] for s in store.available_scenarios(SCENARIOS)] == ["first_job"]
+    store.mark_scenario_complete("first_job")
+    assert store.index_for(SCENARIOS).first_available()["id"] == "betrayal"
+
+    assert [s["id"] for s in store.available_scenarios(EVENTS)] == ["starting_conflict"]
+    store.mark_scenario_complete("starting_conflict")
+    assert [s["id"] for s in store.available_scenarios(EVENTS)] == ["rival_gang"]
+
+
+def test_journal_is_replayed_and_compacted(tmp_path):
+    path = str(tmp_path / "game_state.json")
+    store = GameStateStore(path, compact_every=3)
+    store.set_current_scenario(SCENARIOS[0])
+    store.mark_scenario_complete("intro")
+    store.mark_scenario_complete("intro")
+
+    reloaded = GameStateStore(path)
+    assert reloaded.to_dict() == {"completed_scenarios": ["intro"], "current_scenario": None}
+    assert not (tmp_path / "game_state.log.jsonl").exists()
+
+    store.set_current_scenario(SCENARIOS[1])
+    reloaded = GameStateStore(path)
+    assert reloaded.current_scenario["id"] == "first_job"
+    assert reloaded.is_completed("intro")
+
+
+def test_scenario_completed_before_its_prerequisite_stays_unavailable(tmp_path):
+    store = GameStateStore(str(tmp_path / "game_state.json"))
+    index = store.index_for(SCENARIOS)
+    store.mark_scenario_complete("first_job")
+    store.mark_scenario_complete("intro")
+    assert [s["id"] for s in index.available()] == ["betrayal"]
+    store.mark_scenario_complete("betrayal")
+    assert index.first_available() is None
@@ -0,0 +1,93 @@
+import copy
+import json
+import os
+
+from incremental_save import IncrementalSaveFile, apply_patch, diff
+
+
+def make_player():
+    return {
+        "name": "strijder",
+        "resources": {"credits": 1000, "fuel": 100},
+        "inventory": ["Data Chip"],
+        "conversation_history": [{"prompt": f"p{i}", "response": "r" * 200} for i in range(50)],
+    }
+
+
+def test_diff_roundtrip():
+    old = make_player()
+    new = copy.deepcopy(old)
+    new["resources"]["credits"] = 900
+    new["inventory"].append("Stim Packs")
+    del new["conversation_history"][0]
+    new["crew"] = {"morale": 80}
+
+    ops = diff(old, new)
+    assert apply_patch(copy.deepcopy(old), ops) == new
+
+
+def test_small_change_writes_small_delta(tmp_path):
+    path = str(tmp_path / "strijder.json")
+    save_file = IncrementalSaveFile(path)
+    player = make_player()
+    snapshot_bytes = save_file.save(player)
+
+    player["resources"]["credits"] -= 100
+    delta_bytes = save_file.save(player)
+    assert 0 < delta_bytes < snapshot_bytes / 10
+    assert save_file.save(player) == 0
+
+    reloaded = IncrementalSaveFile(path)
+    assert reloaded.load() == player and reloaded.version == 2
+
+
+def test_log_is_folded_into_snapshot(tmp_path):
+    path = str(tmp_path / "strijder.json")
+    save_file = IncrementalSaveFile(path, max_log_bytes=2048)
+    player = make_player()
+    save_file.save(player)
+
+    log_path = path.replace(".json", ".delta.jsonl")
+    for i in range(100):
+        player["resources"]["credits"] += i
+        save_file.save(player)
+        if os.path.exists(log_path):
+            assert os.path.getsize(log_path) <= 2048
+
+    reloaded = IncrementalSaveFile(path)
+    assert reloaded.load() == player and reloaded.version == 100
+
+
+def test_stale_log_is_ignored(tmp_path):
+    path = str(tmp_path / "strijder.json")
+    save_file = IncrementalSaveFile(path)
+    player = make_player()
+    save_file.save(player)
+    player["inventory"].append("Stim Packs")
+    save_file.save(player)
+
+    # Simulate a crash after the snapshot was replaced but before the log was removed
+    log_path = path.replace(".json", ".delta.jsonl")
+    with open(log_path, "rb") as f:
+        stale_log = f.read()
+    save_file.snapshot(player)
+    with open(log_path, "wb") as f:
+        f.write(stale_log)
+
+    assert IncrementalSaveFile(path).load()["inventory"] == ["Data Chip", "Stim Packs"]
+
+
+def test_version_stays_out_of_the_document(tmp_path):
+    path = str(tmp_path / "strijder.json")
+    # A save from before the version moved into the delta log
+    with open(path, "w") as f:
+        json.dump(dict(make_player(), _version=7), f)
+
+    save_file = IncrementalSaveFile(path)
+    player = save_file.load()
+    assert "_version" not in player and save_file.version == 7
+    player["resources"]["fuel"] -= 10
+    save_file.save(player)
+
+    reloaded = IncrementalSaveFile(path)
+    assert reloaded.load() == player and reloaded.version == 8
@@ -0,0 +1,79 @@
+import copy
+import json
+
+from inventory_manager import PlayerSession
+from items import Item
+from player_repository import players
+
+
+def make_session(credits=20000, inventory=None):
+    player = {"name": "tester", "inventory": {} if inventory is None else inventory,
+              "resources": {"credits": credits}}
+    saves = []
+    session = PlayerSession(player, save=lambda data: saves.append(copy.deepcopy(data)) or True)
+    return session, saves
+
+
+def test_purchase_saves_once():
+    session, saves = make_session()
+    assert session.purchase("Ghost Blade Energy Sword", 12000)
+    assert session.credits == 8000
+    assert session.has_item("Ghost Blade Energy Sword")
+    assert len(saves) == 1
+    assert saves[0]["inventory"] == {"Ghost Blade Energy Sword": 1}
+
+
+def test_failed_batch_rolls_back_in_memory():
+    session, saves = make_session(credits=20000)
+    assert not session.purchase_many([("Ghost Blade Energy Sword", 12000),
+                                      ("Neon Slasher Energy Sword", 15000)])
+    assert session.credits == 20000
+    assert session.player["inventory"] == {}
+    assert saves == []
+
+
+def test_batch_purchase_is_one_write():
+    session, saves = make_session(credits=30000)
+    assert session.purchase_many([("Stim Packs", 100)] * 5)
+    assert session.get_item_count("Stim Packs") == 5
+    assert session.credits == 29500
+    assert len(saves) == 1
+    assert saves[0]["inventory"] == {"Stim Packs": 5}
+
+
+def test_rollback_restores_nested_changes():
+    session, saves = make_session()
+    with session.transaction() as transaction:
+        session.add_item("Data Chip")
+        session.modify_credits(-500)
+        transaction.rollback()
+    assert session.player["inventory"] == {}
+    assert session.credits == 20000
+    assert saves == []
+
+
+def test_failed_save_rolls_back():
+    player = {"name": "tester", "inventory": {"Medkit": 2}, "resources": {"credits": 500}}
+    session = PlayerSession(player, save=lambda data: False)
+    assert not session.add_item("Data Chip")
+    assert player["inventory"] == {"Medkit": 2}
+
+
+def test_legacy_list_inventory_save_is_converted(tmp_path, monkeypatch):
+    rifle = Item("Pulse Rifle", "Weapon", "Rare", {"damage": 30}).to_dict()
+    with open(tmp_path / "veteran.json", "w") as f:
+        json.dump({"name": "Veteran", "inventory": ["Medkit", rifle, "Medkit"],
+                   "resources": {"credits": 100}}, f)
+    monkeypatch.setenv("RPG_STORAGE_ROOT", str(tmp_path))
+    saves = []
+    try:
+        session = PlayerSession.open("veteran", save=lambda data: saves.append(copy.deepcopy(data)) or True)
+        assert session.get_item_count("Medkit") == 2 and session.has_item(rifle)
+        assert session.add_item("Medkit")
+    finally:
+        players.evict("veteran")
+
+    inventory = saves[0]["inventory"]
+    assert isinstance(inventory, dict) and inventory.pop("Medkit") == 3
+    assert list(inventory.values()) == [1]
+    assert session.get_inventory() == ["Medkit"] * 3 + [rifle]
@@ -0,0 +1,50 @@
+import json
+
+from inventory_manager import PlayerSession
+from item_catalog import CATALOG, Inventory, ItemCatalog, format_inventory, item_key
+from items import Item
+
+BLADE = {"name": "Phase Blade", "type": "weapon", "rarity": "Rare", "attributes": {"damage": 12}, "value": 512}
+
+
+def test_list_inventories_migrate_without_loss():
+    legacy = ["Data Chip", BLADE, "Data Chip", {"name": "Phase Blade", "attributes": {"damage": 3}}]
+    player = {"inventory": json.loads(json.dumps(legacy))}
+    inventory = Inventory.of(player)
+    assert isinstance(player["inventory"], dict) and len(inventory) == 3
+    assert inventory.count("Data Chip") == 2 and BLADE in inventory
+    canonical = lambda entries: sorted(json.dumps(entry, sort_keys=True) for entry in entries)
+    assert canonical(inventory.entries()) == canonical(legacy)
+    # The keyed form survives a JSON round trip and converts only once
+    player = json.loads(json.dumps(player))
+    assert Inventory.of(player).counts == inventory.counts
+    assert format_inventory(player) == "Data Chip x2, Phase Blade (Rare), Phase Blade"
+
+
+def test_counts_and_removal():
+    inventory = Inventory.of({})
+    inventory.add("Stim Packs", 1000)
+    inventory.add(Item("Void Reaper", "weapon", "Epic", {"damage": 40}))
+    assert inventory.count("Stim Packs") == 1000 and inventory.total() == 1001
+    assert inventory.remove("Stim Packs", 999) == 999 and inventory.remove("Stim Packs", 5) == 1
+    assert "Stim Packs" not in inventory and inventory.remove("Stim Packs") == 0
+    assert inventory.value() == 10 * 100 + 40
+
+
+def test_definitions_are_interned_once():
+    catalog = ItemCatalog()
+    first, second = catalog.intern(dict(BLADE)), catalog.intern(dict(reversed(list(BLADE.items()))))
+    assert first == second == catalog.find(BLADE) and len(catalog) == 1
+    definition = catalog[first]
+    assert (definition.name, definition.rarity, definition.value) == ("Phase Blade", "Rare", 512)
+    assert catalog.find("Unknown") is None
+    assert Inventory.of({"inventory": [BLADE, "Medkit"]}).ids() == {
+        CATALOG.intern_key(item_key(BLADE)): 1, CATALOG.intern("Medkit"): 1}
+
+
+def test_session_counts_without_scanning():
+    player = {"name": "tester", "inventory": ["Stim Packs"] * 3, "resources": {"credits": 100}}
+    session = PlayerSession(player, save=lambda data: True)
+    assert session.get_item_count("Stim Packs") == 3
+    assert session.remove_item("Stim Packs", 2) and player["inventory"] == {"Stim Packs": 1}
+    assert session.get_inventory() == ["Stim Packs"]
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import lazy_save
+from incremental_save import get_save_file
+from lazy_save import load_lazy
+from serializers import SerializationError, Serializer
+
+
+def make_save(messages=2000):
+    return {
+        "character": {"name": "Vex", "level": 5,
+                      "npcs": {f"npc{i}": {"notes": "x" * 200} for i in range(200)}},
+        "conversation_history": [{"role": "user", "content": f"message {i}"} for i in range(messages)],
+        "current_context": {"location": "docks"},
+        "last_saved": "2024-01-01T00:00:00",
+    }
+
+
+def test_heavy_sections_load_on_first_access(tmp_path):
+    path = str(tmp_path / "vex.json")
+    Serializer("sections", compress_threshold=1024).dump(make_save(), path)
+
+    save = load_lazy(path)
+    assert save["character"]["level"] == 5
+    assert not save.is_loaded("conversation_history")
+    assert not save["character"].is_loaded("npcs")
+
+    streamed = save.iter_section("conversation_history")
+    assert next(streamed)["content"] == "message 0"
+    assert sum(1 for _ in streamed) == 1999
+    assert not save.is_loaded("conversation_history")
+
+    assert len(save["conversation_history"]) == 2000
+    assert save.materialize() == make_save()
+
+
+def test_delta_log_is_applied_per_section(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy_save, "STREAM_BLOCK_SIZE", 512)
+    path = str(tmp_path / "vex.json")
+    save_file = get_save_file(path, Serializer("sections"))
+    document = make_save(50)
+    save_file.snapshot(document)
+    document["conversation_history"].append({"role": "npc", "content": "late reply"})
+    document["character"]["level"] = 6
+    save_file.save(document)
+
+    save = load_lazy(path)
+    assert save["character"]["level"] == 6
+    assert not save.is_loaded("conversation_history")
+    assert list(save.iter_section("conversation_history"))[-1]["content"] == "late reply"
+    assert save.materialize() == document
+
+
+def test_no_file_stays_open_and_replaced_snapshots_are_refused(tmp_path):
+    path = str(tmp_path / "vex.json")
+    Serializer("sections", compress_threshold=1024).dump(make_save(), path)
+    fd_dir = "/proc/self/fd"
+    before = len(os.listdir(fd_dir)) if os.path.isdir(fd_dir) else None
+
+    saves = [load_lazy(path) for _ in range(20)]
+    assert all(save["character"]["level"] == 5 for save in saves)
+    if before is not None:
+        assert len(os.listdir(fd_dir)) <= before + 1
+    assert len(saves[0]["conversation_history"]) == 2000
+
+    Serializer("sections", compress_threshold=1024).dump(make_save(10), path + ".new")
+    os.replace(path + ".new", path)
+    with pytest.raises(SerializationError):
+        saves[1]["conversation_history"]
@@ -0,0 +1,35 @@
+import random
+from collections import Counter
+
+from items import RARITY_LEVELS, LootTable, generate_quest_reward, generate_random_item, generate_treasure
+
+
+def test_rarity_frequencies_follow_the_weights():
+    table = LootTable(seed=5)
+    draws = Counter(table.rarities[table.draw_rarity()] for _ in range(40000))
+    for rarity, weight in RARITY_LEVELS.items():
+        assert abs(draws[rarity] / 40000 - weight) < 0.01
+
+    batch = Counter(item.rarity for item in table.draw_many(40000, "Rare"))
+    assert set(batch) == {"Rare", "Epic", "Legendary"}
+    assert abs(batch["Rare"] / 40000 - 0.15 / 0.25) < 0.015
+
+
+def test_items_are_well_formed_and_seeded_tables_repeat():
+    first = [item.to_dict() for item in LootTable(seed=9).draw_many(50, "Epic")]
+    assert first == [item.to_dict() for item in LootTable(seed=9).draw_many(50, "Epic")]
+    table = LootTable(seed=9)
+    for item in table.draw_many(200) + [table.draw("Uncommon") for _ in range(200)]:
+        rank = table.rarity_index[item.rarity] + 1
+        assert item.name in table.names[table.types.index(item.item_type)][rank - 1]
+        assert all(1 * rank <= v <= 10 * rank and v % rank == 0 for v in item.attributes.values())
+
+
+def test_module_functions_use_the_random_module():
+    random.seed(3)
+    first = (generate_random_item("Rare").to_dict(), generate_treasure("Hard").to_dict())
+    random.seed(3)
+    assert first == (generate_random_item("Rare").to_dict(), generate_treasure("Hard").to_dict())
+    assert 3 <= len(first[1]["contents"]) <= 5
+    reward = generate_quest_reward("Epic")
+    assert len(reward["items"]) == 1 and reward["items"][0].rarity in ("Epic", "Legendary")
@@ -0,0 +1,97 @@
+import json
+import os
+
+import journal
+import serializers
+from npc_manager import NPCManager
+from persistence_writer import writer
+
+
+def test_conversations_are_appended_to_journal(tmp_path):
+    manager = NPCManager(str(tmp_path))
+    manager.create_npc("eva", {"name": "Eva"})
+
+    for i in range(10):
+        assert manager.add_conversation("eva", {"content": f"line {i}"})
+
+    recent = manager.get_recent_conversations("eva", 3)
+    assert [entry["content"] for entry in recent] == ["line 7", "line 8", "line 9"]
+    assert len(list(manager.iter_conversations("eva"))) == 10
+
+    head = serializers.load(manager._npc_path("eva"))
+    assert "conversation_history" not in head
+    assert manager.list_npcs() == ["eva"]
+
+
+def test_tail_reads_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "TAIL_BLOCK_SIZE", 16)
+    path = str(tmp_path / "log.jsonl")
+    for i in range(50):
+        journal.append_entry(path, {"i": i, "text": "x" * (i % 7)})
+
+    assert [entry["i"] for entry in journal.read_tail(path, 5)] == [45, 46, 47, 48, 49]
+    assert len(journal.read_tail(path, 500)) == 50
+
+
+def test_legacy_documents_are_migrated(tmp_path):
+    legacy = {
+        "id": "jack",
+        "created_at": "2024-01-01T00:00:00",
+        "last_updated": "2024-01-01T00:00:00",
+        "data": {"name": "Fixer Jack"},
+        "story_progression": [{"description": "Met the player", "timestamp": "2024-01-01T00:00:00"}],
+        "relationships": {},
+        "conversation_history": []
+    }
+    with open(tmp_path / "jack.json", "w") as f:
+        json.dump(legacy, f)
+
+    manager = NPCManager(str(tmp_path))
+    manager.add_story_event("jack", {"description": "Offered a job"})
+
+    events = manager.get_recent_story_events("jack", 3)
+    assert [event["description"] for event in events] == ["Met the player", "Offered a job"]
+    assert "story_progression" not in manager.get_npc("jack")
+
+
+def test_interrupted_migration_is_not_repeated(tmp_path):
+    story = [{"description": "Met the player", "timestamp": "2024-01-01T00:00:00"}]
+    manager = NPCManager(str(tmp_path))
+    with open(manager._npc_path("jack", create=True), "w") as f:
+        json.dump({"id": "jack", "data": {}, "relationships": {}, "story_progression": story}, f)
+    # The journal was written but the process stopped before the head was
+    journal.append_entries(manager._journal_path("jack", "story_progression"), story)
+
+    assert manager.get_recent_story_events("jack", 5) == story
+    assert "story_progression" not in serializers.load(manager._npc_path("jack"))
+    assert list(NPCManager(str(tmp_path)).iter_story_events("jack")) == story
+
+
+def test_compaction_drops_torn_lines_and_trims(tmp_path):
+    manager = NPCManager(str(tmp_path))
+    manager.create_npc("eva", {"name": "Eva"})
+    for i in range(5):
+        manager.add_story_event("eva", {"description": f"event {i}"})
+
+    path = manager._journal_path("eva", "story_progression")
+    writer.flush()
+    with open(path, "a") as f:
+        f.write('{"description": "torn')
+
+    assert manager.compact_npc("eva", keep_last=2)
+    assert [event["description"] for event in journal.iter_entries(path)] == ["event 3", "event 4"]
+
+
+def test_append_after_torn_line_keeps_both_records_apart(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    journal.append_entry(path, {"i": 0})
+    with open(path, "a") as f:
+        f.write('{"i": 1, "te')
+    journal.append_entry(path, {"i": 2})
+    assert [entry["i"] for entry in journal.iter_entries(path)] == [0, 2]
+
+    rotating = journal.RotatingJournal(path)
+    with open(path, "a") as f:
+        f.write('{"i": 3')
+    rotating.append({"i": 4})
+    assert [entry["i"] for entry in journal.iter_entries(path)] == [0, 2, 4]
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from persistence_writer import PersistenceError, PersistenceWriter, WriteQueueFull, atomic_write
+
+
+def test_writes_run_in_order_and_coalesce(tmp_path):
+    writer = PersistenceWriter(on_error=None)
+    gate = threading.Event()
+    order = []
+
+    writer.submit("gate", gate.wait)
+    writer.submit("log", order.append, "first")
+    writer.submit("doc", order.append, "doc v1", coalesce=True)
+    writer.submit("doc", order.append, "doc v2", coalesce=True)
+    writer.submit("log", order.append, "second")
+    assert writer.pending("doc") == 1
+
+    gate.set()
+    writer.flush(timeout=5)
+    assert order == ["first", "doc v2", "second"]
+    assert writer.pending() == 0
+
+
+def test_errors_surface_through_future_and_flush(tmp_path):
+    errors = []
+    writer = PersistenceWriter(on_error=lambda key, error: errors.append(key))
+    missing = str(tmp_path / "missing" / "save.json")
+
+    future = writer.submit(missing, atomic_write, missing, b"{}")
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    with pytest.raises(PersistenceError):
+        writer.flush(timeout=5)
+    assert errors == [missing]
+    writer.flush(timeout=5)
+
+
+def test_full_queue_applies_backpressure():
+    writer = PersistenceWriter(max_queue=1, on_error=None)
+    gate, started = threading.Event(), threading.Event()
+    writer.submit("gate", lambda: started.set() or gate.wait(5))
+    # Once the writer thread runs the gate, the queue is empty again
+    assert started.wait(5)
+    writer.submit("a", lambda: None)
+
+    with pytest.raises(WriteQueueFull):
+        writer.submit("b", lambda: None, timeout=0.05)
+    gate.set()
+    writer.flush(timeout=5)
@@ -0,0 +1,89 @@
+import os
+import time
+
+import pytest
+
+import serializers
+from persistence_writer import PersistenceError, writer
+from player_repository import PlayerRepository
+
+
+def make_repository(tmp_path):
+    repository = PlayerRepository(str(tmp_path))
+    player = {"name": "Strijder", "resources": {"credits": 1000}, "inventory": []}
+    repository.save(player)
+    return repository, player
+
+
+def test_identity_map_returns_live_object(tmp_path):
+    repository, player = make_repository(tmp_path)
+    assert repository.get("strijder") is player
+    assert repository.get("STRIJDER") is player
+    assert os.path.exists(tmp_path / "strijder.json")
+
+
+def test_subscribers_are_notified_on_save(tmp_path):
+    repository, player = make_repository(tmp_path)
+    events = []
+    unsubscribe = repository.subscribe(lambda name, changed, source: events.append((name, source)))
+
+    player["resources"]["credits"] -= 100
+    repository.save(player)
+    unsubscribe()
+    repository.save(player)
+
+    assert events == [("strijder", "save")]
+
+
+def test_external_edits_reload_in_place(tmp_path):
+    repository, player = make_repository(tmp_path)
+    events = []
+    repository.subscribe(lambda name, changed, source: events.append(source))
+
+    edited = dict(player, resources={"credits": 5})
+    time.sleep(0.01)
+    serializers.default_serializer.dump(edited, str(tmp_path / "strijder.json"))
+
+    assert repository.poll() == ["strijder"]
+    assert player["resources"]["credits"] == 5
+    assert events == ["external"]
+    assert repository.poll() == []
+
+
+def test_external_edits_keep_unsaved_changes(tmp_path):
+    repository, player = make_repository(tmp_path)
+    writer.flush()
+    player["resources"]["credits"] -= 300
+    player["inventory"].append("Laser Pistol")
+
+    edited = dict(player, resources={"credits": 5, "fuel": 40}, inventory=[], level=2)
+    time.sleep(0.01)
+    serializers.default_serializer.dump(edited, str(tmp_path / "strijder.json"))
+
+    assert repository.poll() == ["strijder"]
+    # Credits changed on both sides: the unsaved value wins; the rest is merged
+    assert player["resources"] == {"credits": 700, "fuel": 40}
+    assert player["inventory"] == ["Laser Pistol"] and player["level"] == 2
+
+
+def test_fresh_repository_loads_from_disk(tmp_path):
+    make_repository(tmp_path)
+    assert PlayerRepository(str(tmp_path)).get("strijder")["resources"]["credits"] == 1000
+    assert PlayerRepository(str(tmp_path)).get("nobody") is None
+
+
+def test_waiting_save_reports_failed_writes(tmp_path, monkeypatch):
+    repository, player = make_repository(tmp_path)
+    assert repository.save(player, wait=True)
+
+    class BrokenSaveFile:
+        diverged = False
+
+        def save(self, document):
+            raise OSError("disk full")
+
+    monkeypatch.setattr("player_repository.get_save_file", lambda path, serializer: BrokenSaveFile())
+    monkeypatch.setattr("persistence_writer.writer.on_error", None)
+    assert not repository.save(player, wait=True)
+    with pytest.raises(PersistenceError):
+        writer.flush()
@@ -0,0 +1,61 @@
+import itertools
+import random
+
+import numpy as np
+
+from items import generate_treasure
+from route_planner import FUEL_PER_UNIT, distance_matrix, follow_route, plan_route, plan_treasure_route
+from time_manager import TimeManager
+from treasure_map import discover_treasure
+
+
+def route_length(start, points, order, closed):
+    stops = [start] + [points[i] for i in order] + ([start] if closed else [])
+    return sum(np.linalg.norm(np.subtract(a, b)) for a, b in zip(stops, stops[1:]))
+
+
+def test_small_routes_are_optimal():
+    rng = np.random.default_rng(2)
+    points = rng.uniform(-100, 100, (7, 3))
+    for closed in (False, True):
+        order, length = plan_route([0, 0, 0], points, return_to_start=closed, time_limit=1.0)
+        assert sorted(order) == list(range(7))
+        assert abs(route_length([0, 0, 0], points, order, closed) - length) < 1e-6
+        best = min(route_length([0, 0, 0], points, p, closed) for p in itertools.permutations(range(7)))
+        assert length <= best * 1.02
+
+
+def test_budget_limits_the_route_and_prefers_prizes():
+    points = np.array([[10, 0, 0], [20, 0, 0], [-15, 0, 0], [500, 0, 0]], dtype=float)
+    order, length = plan_route([0, 0, 0], points, max_distance=60)
+    assert length <= 60 and set(order) == {0, 1, 2}
+    order, _ = plan_route([0, 0, 0], points, max_distance=16, prizes=[1, 1, 50, 1])
+    assert order == [2]
+    assert np.allclose(distance_matrix(points), np.linalg.norm(points[:, None] - points[None], axis=2))
+
+
+def test_hundreds_of_points_improve_on_nearest_neighbour():
+    points = np.random.default_rng(5).uniform(-1000, 1000, (300, 3))
+    quick, quick_length = plan_route([0, 0, 0], points, time_limit=0.0)
+    order, length = plan_route([0, 0, 0], points, time_limit=0.5)
+    assert sorted(order) == list(range(300)) and length < quick_length
+
+
+def test_follow_route_spends_fuel_and_time():
+    random.seed(11)
+    player = {"name": "tester", "resources": {"fuel": 40}, "inventory": {}}
+    for _ in range(30):
+        discover_treasure(player, generate_treasure("Easy"))
+    plan = plan_treasure_route(player)
+    assert plan.stops and plan.fuel <= 40 and plan.left_out == 30 - len(plan.stops)
+    assert abs(plan.distance * FUEL_PER_UNIT - plan.fuel) < 1e-9
+    assert abs(sum(plan.legs) - plan.distance) < 1e-6
+
+    time_manager = TimeManager()
+    follow_route(player, plan, time_manager)
+    assert time_manager.current_date == plan.days
+    assert player["resources"]["fuel"] == 40 - int(np.ceil(plan.fuel))
+    assert all(player["discovered_locations"][p]["claimed"] for p in plan.stops)
+    assert sum(player["inventory"].values()) == sum(
+        len(player["discovered_locations"][p]["contents"]) for p in plan.stops)
+    assert plan_treasure_route(player, fuel=1000).stops[0] not in plan.stops
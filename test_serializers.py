@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import serializers
+from serializers import Serializer, SerializationError, decode_binary, encode_binary
+
+DOCUMENT = {
+    "name": "strijder",
+    "health": 100,
+    "debt": -(1 << 70),
+    "morale": 80.5,
+    "nsfw_enabled": False,
+    "current_event": None,
+    "inventory": ["Data Chip", {"name": "Phase Blade", "attributes": {"damage": 12}}],
+    "relationships": {"Eva": "Friendly", "Fixer Jack": "Cautious"},
+    "notes": "Ünïcode ✓",
+}
+
+
+@pytest.mark.parametrize("name", ["json", "json+zlib", "json+lzma", "json+auto",
+                                  "binary", "binary+zlib", "binary+lzma",
+                                  "sections", "sections+zlib"])
+def test_roundtrip(name, tmp_path):
+    serializer = Serializer.from_name(name, compress_threshold=0)
+    path = str(tmp_path / "save.json")
+    serializer.dump(DOCUMENT, path)
+    assert serializers.load(path) == DOCUMENT
+    assert serializers.read_header(serializer.dumps(DOCUMENT))["codec"] == name.split("+")[0]
+
+
+def test_legacy_json_loads_transparently(tmp_path):
+    path = str(tmp_path / "legacy.json")
+    with open(path, "w") as f:
+        json.dump(DOCUMENT, f, indent=4)
+    assert serializers.load(path) == DOCUMENT
+
+
+def test_small_payloads_are_not_compressed():
+    data = Serializer("json", "zlib").dumps(DOCUMENT)
+    assert serializers.read_header(data)["compression"] is None
+
+
+def test_binary_repeats_keys_once():
+    document = [{"activity": "Movie Night", "duration": 3}] * 100
+    assert len(encode_binary(document)) < len(json.dumps(document)) / 2
+    assert decode_binary(encode_binary(document)) == document
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(Serializer().dumps(DOCUMENT))
+    data[4] = 99
+    with pytest.raises(SerializationError):
+        serializers.loads(bytes(data))
@@ -0,0 +1,41 @@
+import json
+import os
+
+from character_manager import CharacterManager
+from persistence_writer import writer
+from storage import ShardedDirectory, shard_for
+
+
+def test_flat_layout_is_migrated_and_indexed(tmp_path):
+    save = {"character": {"name": "Vex", "level": 4, "current_location": "docks"},
+            "last_saved": "2024-01-01T00:00:00"}
+    with open(tmp_path / "vex.json", "w") as f:
+        json.dump(save, f)
+    os.makedirs(tmp_path / "vex")
+    with open(tmp_path / "vex" / "history.json", "w") as f:
+        json.dump([], f)
+
+    manager = CharacterManager(str(tmp_path))
+
+    shard = tmp_path / shard_for("vex")
+    assert sorted(os.listdir(shard)) == ["vex", "vex.json"]
+    assert sorted(os.listdir(tmp_path)) == sorted(["index.jsonl", shard_for("vex").split(os.sep)[0]])
+    assert manager.list_characters() == ["vex"]
+    assert manager.storage.get_meta("vex") == {"last_saved": "2024-01-01T00:00:00",
+                                                "level": 4, "location": "docks"}
+    assert manager.load_character("Vex")["character"]["level"] == 4
+
+
+def test_index_survives_reopen_and_supports_search(tmp_path):
+    manager = CharacterManager(str(tmp_path))
+    manager.save_character({"name": "Rook", "level": 2, "current_location": "docks"})
+    manager.save_character({"name": "Ash", "level": 7, "current_location": "tower"})
+    manager.save_character({"name": "Rook", "level": 3, "current_location": "docks"})
+    manager.delete_character("Ash")
+    writer.flush()
+
+    reopened = ShardedDirectory(str(tmp_path))
+    assert reopened.names() == ["rook"]
+    assert reopened.search(location="docks") == ["rook"]
+    assert reopened.search(lambda name, meta: meta["level"] > 5) == []
+    assert reopened.get_meta("rook")["level"] == 3
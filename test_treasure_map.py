@@ -0,0 +1,92 @@
+import base64
+import json
+import random
+
+import numpy as np
+
+from items import generate_treasure
+import treasure_map
+from treasure_map import (CHUNK_POINTS, INDEX_KEY, PLAYER_CACHE_SIZE, TreasureIndex, claim_treasure,
+                          discover_treasure, treasure_index)
+
+
+def brute_force(points, claimed, center, include_claimed=False):
+    distances = np.linalg.norm(points - np.asarray(center), axis=1)
+    order = [i for i in np.argsort(distances, kind="stable") if include_claimed or not claimed[i]]
+    return order, distances
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(4)
+    points = np.concatenate([rng.uniform(-1000, 1000, (3000, 3)), rng.normal(300, 5, (500, 3))])
+    claimed = rng.random(len(points)) < 0.3
+    index = TreasureIndex(cell_size=80)
+    index.extend(points[:1000], claimed[:1000])
+    for point, flag in zip(points[1000:], claimed[1000:]):
+        index.add(point.tolist(), flag)
+
+    for center in ([0, 0, 0], [300, 300, 300], [5000, -5000, 0]):
+        order, distances = brute_force(points, claimed, center)
+        assert [p for p, _ in index.nearest(center, k=7)] == order[:7]
+        everything, _ = brute_force(points, claimed, center, include_claimed=True)
+        assert [p for p, _ in index.nearest(center, k=3, include_claimed=True)] == everything[:3]
+        found = {p for p, d in index.within_radius(center, 150)}
+        assert found == {i for i in order if distances[i] <= 150}
+
+    low, high = np.array([-200, 0, -500]), np.array([400, 350, 320])
+    inside = np.all((points >= low) & (points <= high), axis=1) & ~claimed
+    assert index.in_box(low, high) == np.flatnonzero(inside).tolist()
+
+
+def test_claims_and_saved_index():
+    random.seed(8)
+    player = {"name": "tester", "position": {"x": 0, "y": 0, "z": 0}}
+    for _ in range(40):
+        discover_treasure(player, generate_treasure("Normal"))
+    nearest = treasure_index(player).nearest((0, 0, 0), k=1)[0][0]
+    assert claim_treasure(player, nearest) and not claim_treasure(player, nearest)
+    assert player["discovered_locations"][nearest]["claimed"]
+    assert treasure_index(player).nearest((0, 0, 0), k=1)[0][0] != nearest
+
+    loaded = json.loads(json.dumps(player))
+    index = treasure_index(loaded)
+    assert np.array_equal(index.points, treasure_index(player).points)
+    assert index.unclaimed_count == 39
+
+    # Saves without (or with a stale) index are rebuilt from the treasures
+    del loaded[INDEX_KEY]
+    loaded = json.loads(json.dumps(loaded))
+    assert treasure_index(loaded).nearest((0, 0, 0), k=39) == treasure_index(player).nearest((0, 0, 0), k=39)
+
+
+def test_discoveries_and_claims_only_touch_the_end_of_the_saved_index():
+    random.seed(9)
+    player = {"name": "tester"}
+    for _ in range(CHUNK_POINTS * 3 + 5):
+        discover_treasure(player, generate_treasure("Normal"))
+    before = json.loads(json.dumps(player[INDEX_KEY]))
+    discover_treasure(player, generate_treasure("Normal"))
+    claim_treasure(player, 7)
+    after = player[INDEX_KEY]
+    assert after["chunks"][:-1] == before["chunks"][:-1] and after["chunks"][-1] != before["chunks"][-1]
+    assert after["claimed"] == before["claimed"] + [7]
+    assert after == treasure_index(player).to_dict()
+
+    # Indexes saved as one blob still load, and are converted on the next change
+    legacy = dict(after, points=base64.b64encode(
+        treasure_index(player).points.astype("<f8").tobytes()).decode("ascii"),
+        claimed=base64.b64encode(np.packbits(treasure_index(player).claimed)).decode("ascii"))
+    del legacy["chunks"]
+    loaded = json.loads(json.dumps(dict(player, treasure_index=legacy)))
+    assert np.array_equal(treasure_index(loaded).claimed, treasure_index(player).claimed)
+    discover_treasure(loaded, generate_treasure("Normal"))
+    assert loaded[INDEX_KEY] == treasure_index(loaded).to_dict()
+
+
+def test_only_recent_players_stay_cached():
+    players = [{"discovered_locations": []} for _ in range(PLAYER_CACHE_SIZE * 2)]
+    for player in players:
+        treasure_index(player)
+    cached = [entry[0] for entry in treasure_map._indexes.values()]
+    assert len(cached) == PLAYER_CACHE_SIZE
+    assert all(any(player is other for other in players[-PLAYER_CACHE_SIZE:]) for player in cached)
@@ -0,0 +1,47 @@
+import math
+
+from combat_simulator import run_simulation, simulate_fight
+from vector_combat import simulate_batch
+
+OGRE = {"name": "Ogre", "hp": 500, "abilities": {
+    "Club": {"damage_range": (15, 35)},
+    "Roar": {"damage_range": (5, 10), "cooldown": 1},
+}}
+KNIGHT = {"abilities": {
+    "Sword Strike": {"damage_range": (20, 40)},
+    "Shield Bash": {"damage_range": (10, 20), "cooldown": 2, "special_effects": {"stun": 1}},
+    "War Cry": {"damage_range": (0, 0), "cooldown": 4,
+                "special_effects": {"buff": {"effect": {"damage_multiplier": 1.5}, "duration": 2}}},
+}}
+
+
+def test_fixed_rolls_match_the_scalar_engine_exactly():
+    loadout = {"hp": 120, "abilities": {
+        "Strike": {"damage_range": (12, 12)},
+        "Bash": {"damage_range": (7, 7), "cooldown": 2, "special_effects": {"stun": 1}},
+        "Cry": {"damage_range": (0, 0), "cooldown": 4,
+                "special_effects": {"buff": {"effect": {"damage_multiplier": 1.5}, "duration": 2}}},
+    }}
+    opponent = {"name": "Golem", "hp": 150, "abilities": {
+        "Slam": {"damage_range": (9, 9), "cooldown": 1}}}
+
+    for policy in ("greedy", "tactical"):
+        scalar = simulate_fight(loadout, opponent, policy, seed=0)
+        vector = simulate_batch(loadout, opponent, fights=3, player_policy=policy, seed=0)
+        assert vector.turn_counts == {scalar.turns: 3}
+        assert set(vector.damage_dealt) == {scalar.damage_dealt}
+        assert set(vector.damage_taken) == {scalar.damage_taken}
+        assert vector.wins == (3 if scalar.winner == "player" else 0)
+
+
+def test_outcomes_agree_with_the_scalar_engine_statistically():
+    for policy in ("random", "tactical"):
+        scalar = run_simulation(KNIGHT, OGRE, fights=3000, player_policy=policy, seed=5, processes=1)
+        vector = simulate_batch(KNIGHT, OGRE, fights=30000, player_policy=policy, seed=5)
+
+        p = vector.win_rate
+        assert abs(scalar.win_rate - p) < 4 * math.sqrt(p * (1 - p) / 3000)
+        scalar_turns = scalar.to_dict()["turns"]
+        vector_turns = vector.to_dict()["turns"]
+        assert abs(scalar_turns["mean"] - vector_turns["mean"]) < 0.5
+        assert abs(scalar.to_dict()["damage_taken"]["mean"] - vector.to_dict()["damage_taken"]["mean"]) < 10
@@ -0,0 +1,390 @@
+"""
+Treasure Map Module
+=================
+
+Spatial index over the treasure locations a player has discovered.
+
+Map fragments add treasures with 3D coordinates to
+player["discovered_locations"]. TreasureIndex files them in a uniform grid
+of cubic cells. Coordinates are kept in one NumPy array; each cell lists the
+positions of its points. A query only measures the points in the cells that
+overlap it, so it stays fast with tens of thousands of fragments:
+
+- nearest():       the k closest treasures. Rings of cells grow until k
+                   candidates are found, then one exact radius pass runs.
+- within_radius(): every treasure within a distance.
+- in_box():        every treasure inside an axis-aligned box.
+
+Claimed treasures are skipped unless include_claimed is set. Adding and
+claiming treasures update the index in place.
+
+The index is saved with the player under "treasure_index". Coordinates are
+packed float64 and base64 encoded in chunks of CHUNK_POINTS points, and the
+claimed treasures are a list of positions. Both only grow at the end, so a
+discovery rewrites at most one small chunk and a claim appends one number.
+An incremental save therefore writes a few hundred bytes, not the whole
+index. Loading the index does not read the discovered_locations list,
+which the lazy save formats keep out of memory until used. It is rebuilt
+from that list if the counts disagree, for example in saves from before the
+index existed.
+
+The player's position is player["position"] ({"x", "y", "z"}), the origin
+if unset.
+
+Usage:
+-----
+```python
+discover_treasure(player, generate_treasure("Normal"))   # Save it and index it
+for position, distance in treasure_index(player).nearest(player_position(player), k=5):
+    print(player["discovered_locations"][position]["name"], distance)
+claim_treasure(player, position)
+display_nearest_caches(player)                            # The 'caches' command
+```
+"""
+
+import base64
+from collections import OrderedDict
+from itertools import chain, product
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Edge length of a grid cell; treasures are spread over a 2000-unit cube
+DEFAULT_CELL_SIZE = 100.0
+
+# Player field holding the saved index
+INDEX_KEY = "treasure_index"
+
+# Points per saved coordinate chunk; a discovery rewrites at most one chunk
+CHUNK_POINTS = 64
+
+# Players whose index is kept in memory, least recently used dropped first
+PLAYER_CACHE_SIZE = 8
+
+ORIGIN = (0.0, 0.0, 0.0)
+
+Point = Sequence[float]
+
+
+def _xyz(location: Any) -> Tuple[float, float, float]:
+    """Coordinates of a {"x", "y", "z"} location or a sequence."""
+    if isinstance(location, dict):
+        return (float(location.get("x", 0.0)), float(location.get("y", 0.0)), float(location.get("z", 0.0)))
+    return tuple(float(v) for v in location)
+
+
+class TreasureIndex:
+    """Uniform grid over 3D points; positions are the order points were added in."""
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self._points = np.empty((0, 3))
+        self._claimed = np.empty(0, dtype=bool)
+        self._count = 0
+        self._unclaimed = 0
+        self._cells: Dict[Tuple[int, int, int], List[int]] = {}
+        self._low = np.zeros(3, dtype=np.int64)   # Cell bounds of all points
+        self._high = np.full(3, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def points(self) -> np.ndarray:
+        """Coordinates of the indexed points, one row per position."""
+        return self._points[:self._count]
+
+    @property
+    def claimed(self) -> np.ndarray:
+        return self._claimed[:self._count]
+
+    @property
+    def unclaimed_count(self) -> int:
+        return self._unclaimed
+
+    # --- Updates ---
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._count + extra
+        if needed > len(self._points):
+            capacity = max(needed, 2 * len(self._points), 64)
+            points = np.empty((capacity, 3))
+            points[:self._count] = self.points
+            claimed = np.zeros(capacity, dtype=bool)
+            claimed[:self._count] = self.claimed
+            self._points, self._claimed = points, claimed
+
+    def add(self, location: Any, claimed: bool = False) -> int:
+        """Index one point ({"x", "y", "z"} or a sequence); returns its position."""
+        point = _xyz(location)
+        position = self._count
+        self._reserve(1)
+        self._points[position] = point
+        self._claimed[position] = claimed
+        self._count += 1
+        self._unclaimed += not claimed
+        cell = tuple(int(v // self.cell_size) for v in point)
+        if position == 0:
+            self._low, self._high = np.array(cell), np.array(cell)
+        else:
+            self._low, self._high = np.minimum(self._low, cell), np.maximum(self._high, cell)
+        self._cells.setdefault(cell, []).append(position)
+        return position
+
+    def extend(self, points: Iterable[Point], claimed: Optional[Iterable[bool]] = None) -> int:
+        """Index many points at once; returns the position of the first."""
+        points = np.asarray(list(points) if not isinstance(points, np.ndarray) else points,
+                            dtype=np.float64).reshape(-1, 3)
+        flags = (np.zeros(len(points), dtype=bool) if claimed is None
+                 else np.fromiter(claimed, dtype=bool, count=len(points)))
+        first = self._count
+        if not len(points):
+            return first
+        self._reserve(len(points))
+        self._points[first:first + len(points)] = points
+        self._claimed[first:first + len(points)] = flags
+        self._count += len(points)
+        self._unclaimed += int(len(flags) - flags.sum())
+
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        if first == 0:
+            self._low, self._high = cells.min(axis=0), cells.max(axis=0)
+        else:
+            self._low = np.minimum(self._low, cells.min(axis=0))
+            self._high = np.maximum(self._high, cells.max(axis=0))
+        unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+        order = np.argsort(inverse.ravel(), kind="stable")
+        bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(unique)))[:-1]
+        for cell, members in zip(map(tuple, unique.tolist()), np.split(order + first, bounds)):
+            self._cells.setdefault(cell, []).extend(members.tolist())
+        return first
+
+    def set_claimed(self, position: int, claimed: bool = True) -> None:
+        """Mark the point at a position as claimed (or unclaimed again)."""
+        if not 0 <= position < self._count:
+            raise IndexError(f"No treasure at position {position}")
+        if self._claimed[position] != claimed:
+            self._claimed[position] = claimed
+            self._unclaimed += -1 if claimed else 1
+
+    # --- Queries ---
+
+    def _cell_range(self, low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cells overlapping a box, clipped to the cells holding points."""
+        return (np.maximum(np.floor(low / self.cell_size).astype(np.int64), self._low),
+                np.minimum(np.floor(high / self.cell_size).astype(np.int64), self._high))
+
+    def _candidates(self, low_cell: np.ndarray, high_cell: np.ndarray, include_claimed: bool) -> np.ndarray:
+        """Positions of the points in a range of cells."""
+        span = high_cell - low_cell + 1
+        if (span <= 0).any():
+            return np.empty(0, dtype=np.int64)
+        if np.all(low_cell <= self._low) and np.all(high_cell >= self._high):
+            positions = np.arange(self._count)
+        else:
+            if int(np.prod(span)) <= len(self._cells):
+                keys = product(*(range(lo, hi + 1) for lo, hi in zip(low_cell.tolist(), high_cell.tolist())))
+                lists = [self._cells[key] for key in keys if key in self._cells]
+            else:
+                lo, hi = low_cell.tolist(), high_cell.tolist()
+                lists = [members for key, members in self._cells.items()
+                         if lo[0] <= key[0] <= hi[0] and lo[1] <= key[1] <= hi[1] and lo[2] <= key[2] <= hi[2]]
+            positions = np.fromiter(chain.from_iterable(lists), dtype=np.int64)
+        if not include_claimed:
+            positions = positions[~self._claimed[positions]]
+        return positions
+
+    def _distances(self, positions: np.ndarray, center: np.ndarray) -> np.ndarray:
+        offsets = self._points[positions] - center
+        return np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+
+    @staticmethod
+    def _sorted(positions: np.ndarray, distances: np.ndarray) -> List[Tuple[int, float]]:
+        order = np.argsort(distances, kind="stable")
+        return list(zip(positions[order].tolist(), distances[order].tolist()))
+
+    def within_radius(self, center: Point, radius: float,
+                      include_claimed: bool = False) -> List[Tuple[int, float]]:
+        """Points within radius of center, as (position, distance), closest first."""
+        center = np.asarray(_xyz(center))
+        positions = self._candidates(*self._cell_range(center - radius, center + radius), include_claimed)
+        distances = self._distances(positions, center)
+        inside = distances <= radius
+        return self._sorted(positions[inside], distances[inside])
+
+    def nearest(self, center: Point, k: int = 5, include_claimed: bool = False) -> List[Tuple[int, float]]:
+        """The k points closest to center, as (position, distance), closest first."""
+        available = self._count if include_claimed else self._unclaimed
+        k = min(k, available)
+        if k <= 0:
+            return []
+        center = np.asarray(_xyz(center))
+        home = np.floor(center / self.cell_size).astype(np.int64)
+        ring = 0
+        while True:
+            positions = self._candidates(np.maximum(home - ring, self._low),
+                                         np.minimum(home + ring, self._high), include_claimed)
+            if len(positions) >= k:
+                break
+            ring = 2 * ring + 1
+        # The k-th candidate bounds the k-th nearest point; one radius pass makes it exact
+        distances = self._distances(positions, center)
+        reach = float(np.partition(distances, k - 1)[k - 1])
+        return self.within_radius(center, reach, include_claimed)[:k]
+
+    def in_box(self, low: Point, high: Point, include_claimed: bool = False) -> List[int]:
+        """Positions of the points inside an axis-aligned box, in position order."""
+        low, high = np.asarray(_xyz(low)), np.asarray(_xyz(high))
+        positions = self._candidates(*self._cell_range(low, high), include_claimed)
+        points = self._points[positions]
+        inside = np.all((points >= low) & (points <= high), axis=1)
+        return np.sort(positions[inside]).tolist()
+
+    # --- Persistence ---
+
+    def _encode_chunk(self, chunk: int) -> str:
+        start = chunk * CHUNK_POINTS
+        points = self._points[start:min(start + CHUNK_POINTS, self._count)]
+        return base64.b64encode(points.astype("<f8").tobytes()).decode("ascii")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Encode the index compactly for a save file."""
+        return {
+            "cell_size": self.cell_size,
+            "count": self._count,
+            "chunks": [self._encode_chunk(chunk) for chunk in range(-(-self._count // CHUNK_POINTS))],
+            "claimed": np.flatnonzero(self.claimed).tolist(),
+        }
+
+    def update_dict(self, data: Dict[str, Any], first: int) -> None:
+        """Bring a dict written by to_dict() up to date after points were added from position first."""
+        chunks = data["chunks"]
+        for chunk in range(first // CHUNK_POINTS, -(-self._count // CHUNK_POINTS)):
+            encoded = self._encode_chunk(chunk)
+            if chunk < len(chunks):
+                chunks[chunk] = encoded
+            else:
+                chunks.append(encoded)
+        data["claimed"].extend(position for position in range(first, self._count) if self._claimed[position])
+        data["count"] = self._count
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TreasureIndex':
+        """Decode an index written by to_dict()."""
+        count = int(data["count"])
+        if "chunks" in data:
+            raw = b''.join(base64.b64decode(chunk) for chunk in data["chunks"])
+            claimed = np.zeros(count, dtype=bool)
+            claimed[np.asarray(data["claimed"], dtype=np.int64)] = True
+        else:
+            # One blob of coordinates and packed claimed bits, as first saved
+            raw = base64.b64decode(data["points"])
+            claimed = np.unpackbits(np.frombuffer(base64.b64decode(data["claimed"]), dtype=np.uint8),
+                                    count=count).astype(bool)
+        points = np.frombuffer(raw, dtype="<f8").reshape(-1, 3)
+        if len(points) != count:
+            raise ValueError("Treasure index is truncated")
+        index = cls(data.get("cell_size", DEFAULT_CELL_SIZE))
+        index.extend(points, claimed)
+        return index
+
+    @classmethod
+    def from_treasures(cls, treasures: Iterable[Dict[str, Any]],
+                       cell_size: float = DEFAULT_CELL_SIZE) -> 'TreasureIndex':
+        """Build an index over treasure dicts (Treasure.to_dict())."""
+        treasures = list(treasures)
+        index = cls(cell_size)
+        index.extend([_xyz(t.get("location", ORIGIN)) for t in treasures],
+                     [bool(t.get("claimed", False)) for t in treasures])
+        return index
+
+
+# --- Player helpers ---
+
+# id(player) -> (player, index), least recently used first. Player dicts cannot
+# be weakly referenced, so the player is kept (and its id cannot be reused)
+# until PLAYER_CACHE_SIZE other players have been indexed since
+_indexes: "OrderedDict[int, Tuple[Dict[str, Any], TreasureIndex]]" = OrderedDict()
+
+
+def _stored(player: Dict[str, Any], index: TreasureIndex) -> Dict[str, Any]:
+    """The player's saved index, rewritten in the current format if it is missing or older."""
+    stored = player.get(INDEX_KEY)
+    if not (isinstance(stored, dict) and "chunks" in stored):
+        stored = player[INDEX_KEY] = index.to_dict()
+    return stored
+
+
+def treasure_index(player: Dict[str, Any]) -> TreasureIndex:
+    """Get the index of a player's discovered treasures, loading or building it once."""
+    cached = _indexes.get(id(player))
+    if cached is not None and cached[0] is player:
+        _indexes.move_to_end(id(player))
+        return cached[1]
+
+    treasures = player.get("discovered_locations") or []
+    stored = player.get(INDEX_KEY)
+    index = None
+    if isinstance(stored, dict) and stored.get("count") == len(treasures):
+        try:
+            index = TreasureIndex.from_dict(stored)
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            print(f"Rebuilding treasure index: {e}")
+    if index is None:
+        index = TreasureIndex.from_treasures(treasures)
+        if treasures:
+            player[INDEX_KEY] = index.to_dict()
+    _indexes[id(player)] = (player, index)
+    _indexes.move_to_end(id(player))
+    while len(_indexes) > PLAYER_CACHE_SIZE:
+        _indexes.popitem(last=False)
+    return index
+
+
+def player_position(player: Dict[str, Any]) -> Tuple[float, float, float]:
+    """The player's position, the origin if unknown."""
+    return _xyz(player.get("position") or ORIGIN)
+
+
+def discover_treasure(player: Dict[str, Any], treasure: Any) -> int:
+    """Add a treasure (Treasure or its dict) to the player's map; returns its position."""
+    entry = treasure.to_dict() if hasattr(treasure, "to_dict") else dict(treasure)
+    entry["discovered"] = True
+    index = treasure_index(player)
+    stored = _stored(player, index)
+    player.setdefault("discovered_locations", []).append(entry)
+    position = index.add(entry.get("location", ORIGIN), entry.get("claimed", False))
+    index.update_dict(stored, position)
+    return position
+
+
+def claim_treasure(player: Dict[str, Any], position: int) -> bool:
+    """Mark a discovered treasure as claimed."""
+    treasures = player.get("discovered_locations") or []
+    if not 0 <= position < len(treasures):
+        print(f"No discovered treasure at position {position}")
+        return False
+    if treasures[position].get("claimed"):
+        return False
+    index = treasure_index(player)
+    stored = _stored(player, index)
+    treasures[position]["claimed"] = True
+    index.set_claimed(position)
+    stored["claimed"].append(position)
+    return True
+
+
+def display_nearest_caches(player: Dict[str, Any], count: int = 5) -> None:
+    """Print the closest unclaimed treasures."""
+    index = treasure_index(player)
+    nearest = index.nearest(player_position(player), count)
+    if not nearest:
+        print("\nNo unclaimed caches on your map. Map fragments reveal new ones.")
+        return
+    print(f"\n=== NEAREST UNCLAIMED CACHES ({index.unclaimed_count} known) ===")
+    treasures = player["discovered_locations"]
+    for position, distance in nearest:
+        treasure = treasures[position]
+        x, y, z = _xyz(treasure.get("location", ORIGIN))
+        print(f"- {treasure.get('name', 'Unknown Cache')}: {distance:.1f} units away "
+              f"(X:{x:.1f}, Y:{y:.1f}, Z:{z:.1f})")
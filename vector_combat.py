@@ -0,0 +1,335 @@
+"""
+Vector Combat Module
+==================
+
+A NumPy combat engine that resolves many fights at once.
+
+The scalar CombatSystem walks ability dictionaries and CombatEntity objects
+for every action, which limits balance runs to tens of thousands of turns
+per second. VectorCombat keeps the state of M fights in a struct of arrays:
+
+- health per side                   shape (M,)
+- ability cooldowns per side        shape (M, abilities)
+- stun duration per side            shape (M,)
+- buff durations per side           shape (M, distinct buffs)
+
+and advances every unfinished fight by one turn per step with whole-array
+operations; the random numbers of a step are drawn in one batch. Finished
+fights are dropped from the arrays as they end, so late steps only touch
+the long fights.
+
+The rules are those of CombatSystem.execute_turn: cooldowns, stuns and
+buffs count down after the owner acts (or loses its action to a stun) and
+effects apply from the next action on. The built-in policies ("random",
+"greedy", "tactical") are vectorized; custom policy functions need the
+scalar engine. Results are the same SimulationReport as combat_simulator,
+and agree with it statistically (see test_vector_combat.py).
+
+Usage:
+-----
+```python
+report = simulate_batch({}, {"name": "Dragon", "hp": 400, "abilities": {"Claw": "A rending claw"}},
+                        fights=1_000_000, player_policy="tactical", seed=7)
+print(report.summary())
+```
+
+Run bench_combat.py to compare turns per second with the scalar engine.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from combat_simulator import DEFAULT_MAX_TURNS, SimulationReport
+from combat_system import CombatEntity, CombatSystem
+
+VECTOR_POLICIES = ("random", "greedy", "tactical")
+
+# Fights resolved together by simulate_batch, bounding memory use
+DEFAULT_BATCH_SIZE = 100_000
+
+# Result codes
+DRAW, PLAYER_WON, OPPONENT_WON = 0, 1, 2
+
+
+class _Side:
+    """The static ability table and the per-fight state of one side."""
+
+    def __init__(self, entity: CombatEntity, fights: int):
+        abilities = list(entity.abilities.values())
+        self.names = [ability.name for ability in abilities]
+        self.low = np.array([ability.damage_range[0] for ability in abilities], dtype=np.int64)
+        self.span = np.array([ability.damage_range[1] - ability.damage_range[0] + 1
+                              for ability in abilities], dtype=np.int64)
+        self.mean = self.low + (self.span - 1) / 2
+        self.cooldown = np.array([ability.cooldown for ability in abilities], dtype=np.int16)
+        self.stun = np.array([ability.special_effects.get("stun", 0) for ability in abilities],
+                             dtype=np.int16)
+
+        # One buff slot per distinct buff name
+        buff_names: List[str] = []
+        multipliers: List[float] = []
+        self.buff_slot = np.full(len(abilities), -1, dtype=np.int64)
+        self.buff_duration = np.zeros(len(abilities), dtype=np.int16)
+        for i, ability in enumerate(abilities):
+            buff = ability.special_effects.get("buff")
+            if buff is None:
+                continue
+            name = buff.get("name", ability.name)
+            if name not in buff_names:
+                buff_names.append(name)
+                multipliers.append(buff.get("effect", {}).get("damage_multiplier", 1.0))
+            self.buff_slot[i] = buff_names.index(name)
+            self.buff_duration[i] = buff.get("duration", 1)
+        self.buff_multiplier = np.array(multipliers, dtype=np.float64)
+        self.is_buff = self.buff_slot >= 0
+        self.is_stun = self.stun > 0
+
+        # Per-fight state, starting from the entity's current state
+        self.hp = np.full(fights, entity.current_health, dtype=np.int64)
+        self.cd = np.tile(np.array([ability.current_cooldown for ability in abilities],
+                                   dtype=np.int16), (fights, 1))
+        self.stunned = np.full(fights, entity.status_effects.get("stun", 0), dtype=np.int16)
+        self.buffs = np.zeros((fights, len(buff_names)), dtype=np.int16)
+        for name, data in entity.buffs.items():
+            if name in buff_names:
+                self.buffs[:, buff_names.index(name)] = data["duration"]
+
+    def keep(self, rows: np.ndarray) -> None:
+        """Drop the state of finished fights."""
+        self.hp = self.hp[rows]
+        self.cd = self.cd[rows]
+        self.stunned = self.stunned[rows]
+        self.buffs = self.buffs[rows]
+
+    def multiplier(self, rows: np.ndarray) -> np.ndarray:
+        """Get the damage multiplier of the active buffs in the given fights."""
+        if not len(self.buff_multiplier):
+            return np.ones(len(rows))
+        active = self.buffs[rows] > 0
+        return np.where(active, self.buff_multiplier, 1.0).prod(axis=1)
+
+
+def _choose(policy: str, actor: _Side, target: _Side, rows: np.ndarray, u: np.ndarray):
+    """Pick an ability per fight; returns (ability index, whether one was ready)."""
+    ready = actor.cd[rows] == 0
+    valid = ready.any(axis=1)
+    if not ready.shape[1]:
+        return np.zeros(len(rows), dtype=np.int64), valid
+
+    if policy == "random":
+        count = ready.sum(axis=1)
+        k = (u * count).astype(np.int64)
+        return np.argmax(np.cumsum(ready, axis=1) > k[:, None], axis=1), valid
+
+    greedy = np.argmax(np.where(ready, actor.mean, -np.inf), axis=1)
+    if policy == "greedy":
+        return greedy, valid
+
+    # Tactical: buff when unbuffed, stun when the target can act, otherwise greedy
+    pick = greedy
+    stun_ready = ready & actor.is_stun
+    use_stun = stun_ready.any(axis=1) & (target.stunned[rows] == 0)
+    pick = np.where(use_stun, np.argmax(np.where(stun_ready, actor.mean, -np.inf), axis=1), pick)
+    if actor.buffs.shape[1]:
+        buff_ready = ready & actor.is_buff
+        use_buff = buff_ready.any(axis=1) & ~(actor.buffs[rows] > 0).any(axis=1)
+        pick = np.where(use_buff, np.argmax(buff_ready, axis=1), pick)
+    return pick, valid
+
+
+def _end_action(side: _Side, rows: np.ndarray) -> None:
+    """Count down effects and cooldowns of the side in the given fights."""
+    side.stunned[rows] = np.maximum(side.stunned[rows] - 1, 0)
+    side.buffs[rows] = np.maximum(side.buffs[rows] - 1, 0)
+    side.cd[rows] = np.maximum(side.cd[rows] - 1, 0)
+
+
+def _act(actor: _Side, target: _Side, rows: np.ndarray, pick: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Use the picked abilities in the given fights, returning the damage dealt."""
+    rolls = actor.low[pick] + (u * actor.span[pick]).astype(np.int64)
+    damage = (rolls * actor.multiplier(rows)).astype(np.int64)
+    target.hp[rows] = np.maximum(target.hp[rows] - damage, 0)
+
+    _end_action(actor, rows)
+    actor.cd[rows, pick] = actor.cooldown[pick]
+
+    stuns = actor.stun[pick]
+    stunning = stuns > 0
+    target.stunned[rows[stunning]] = stuns[stunning]
+    slots = actor.buff_slot[pick]
+    buffing = slots >= 0
+    actor.buffs[rows[buffing], slots[buffing]] = actor.buff_duration[pick[buffing]]
+    return damage
+
+
+class VectorCombat:
+    def __init__(self, player: CombatEntity, opponent: CombatEntity, fights: int,
+                 player_policy: str = "greedy", opponent_policy: str = "random",
+                 seed: Optional[int] = None):
+        """
+        Set up many copies of one fight.
+
+        Args:
+        player (CombatEntity): The player, as built by CombatSystem.
+        opponent (CombatEntity): The opponent, as built by CombatSystem.
+        fights (int): Number of fights resolved together.
+        player_policy (str): One of VECTOR_POLICIES.
+        opponent_policy (str): One of VECTOR_POLICIES.
+        seed (Optional[int]): Seed of the NumPy random generator.
+        """
+        for policy in (player_policy, opponent_policy):
+            if policy not in VECTOR_POLICIES:
+                raise ValueError(f"Policy {policy!r} is not vectorized; use one of {VECTOR_POLICIES}")
+        self.player = _Side(player, fights)
+        self.opponent = _Side(opponent, fights)
+        self.player_policy = player_policy
+        self.opponent_policy = opponent_policy
+        self.rng = np.random.default_rng(seed)
+
+        self.fights = fights
+        self.turn_number = 1
+        self.ids = np.arange(fights)
+        self.dealt = np.zeros(fights, dtype=np.int64)
+        self.taken = np.zeros(fights, dtype=np.int64)
+        self.player_uses = np.zeros(len(self.player.names), dtype=np.int64)
+
+        # Per-fight results, filled in as fights end
+        self.outcome = np.zeros(fights, dtype=np.int8)
+        self.turns = np.zeros(fights, dtype=np.int64)
+        self.final_dealt = np.zeros(fights, dtype=np.int64)
+        self.final_taken = np.zeros(fights, dtype=np.int64)
+        self.final_player_hp = np.zeros(fights, dtype=np.int64)
+
+    @classmethod
+    def from_combat(cls, combat: CombatSystem, fights: int, **kwargs) -> 'VectorCombat':
+        """Set up many copies of the current state of a CombatSystem fight."""
+        return cls(combat.player, combat.opponent, fights, **kwargs)
+
+    @property
+    def active(self) -> int:
+        """Number of fights still running."""
+        return len(self.ids)
+
+    def _finish(self, done: np.ndarray, turns: int) -> None:
+        """Record the results of the fights in the done mask and drop them."""
+        ids = self.ids[done]
+        player_hp, opponent_hp = self.player.hp[done], self.opponent.hp[done]
+        self.outcome[ids] = np.where(opponent_hp == 0, PLAYER_WON,
+                                     np.where(player_hp == 0, OPPONENT_WON, DRAW))
+        self.turns[ids] = turns
+        self.final_dealt[ids] = self.dealt[done]
+        self.final_taken[ids] = self.taken[done]
+        self.final_player_hp[ids] = player_hp
+
+        keep = ~done
+        self.ids = self.ids[keep]
+        self.dealt = self.dealt[keep]
+        self.taken = self.taken[keep]
+        self.player.keep(keep)
+        self.opponent.keep(keep)
+
+    def step(self) -> int:
+        """Advance every running fight by one turn, returning how many are still running."""
+        if not self.active:
+            return 0
+        u = self.rng.random((4, self.active))
+        rows = np.arange(self.active)
+
+        pick, valid = _choose(self.player_policy, self.player, self.opponent, rows, u[0])
+        if not valid.all():
+            # The player has nothing ready: the fight ends undecided
+            self._finish(~valid, self.turn_number - 1)
+            u, pick = u[:, valid], pick[valid]
+            rows = np.arange(self.active)
+            if not self.active:
+                return 0
+
+        self.dealt += _act(self.player, self.opponent, rows, pick, u[1])
+        self.player_uses += np.bincount(pick, minlength=len(self.player.names))
+
+        alive = rows[self.opponent.hp > 0]
+        stunned = self.opponent.stunned[alive] > 0
+        _end_action(self.opponent, alive[stunned])
+        acting = alive[~stunned]
+        if len(acting):
+            opp_pick, opp_valid = _choose(self.opponent_policy, self.opponent, self.player,
+                                          acting, u[2, acting])
+            _end_action(self.opponent, acting[~opp_valid])
+            acting, opp_pick = acting[opp_valid], opp_pick[opp_valid]
+            if len(acting):
+                self.taken[acting] += _act(self.opponent, self.player, acting, opp_pick, u[3, acting])
+
+        done = (self.opponent.hp == 0) | (self.player.hp == 0)
+        if done.any():
+            self._finish(done, self.turn_number)
+        self.turn_number += 1
+        return self.active
+
+    def run(self, max_turns: int = DEFAULT_MAX_TURNS) -> SimulationReport:
+        """Resolve every fight, calling those still running after max_turns draws."""
+        while self.active and self.turn_number <= max_turns:
+            self.step()
+        if self.active:
+            self._finish(np.ones(self.active, dtype=bool), self.turn_number - 1)
+        return self.report()
+
+    def report(self) -> SimulationReport:
+        """Summarise the finished fights."""
+        won = self.outcome == PLAYER_WON
+        return SimulationReport(
+            fights=self.fights,
+            wins=int(won.sum()),
+            losses=int((self.outcome == OPPONENT_WON).sum()),
+            draws=int((self.outcome == DRAW).sum()),
+            turn_counts=Counter(dict(zip(*(values.tolist() for values in
+                                           np.unique(self.turns, return_counts=True))))),
+            damage_dealt=self.final_dealt.tolist(),
+            damage_taken=self.final_taken.tolist(),
+            player_hp_on_win=self.final_player_hp[won].tolist(),
+            ability_uses=Counter({name: int(count) for name, count
+                                  in zip(self.player.names, self.player_uses) if count}),
+        )
+
+
+def merge_reports(reports: List[SimulationReport]) -> SimulationReport:
+    """Combine the reports of several batches."""
+    merged = SimulationReport(0, 0, 0, 0, Counter(), [], [], [], Counter())
+    for report in reports:
+        merged.fights += report.fights
+        merged.wins += report.wins
+        merged.losses += report.losses
+        merged.draws += report.draws
+        merged.turn_counts.update(report.turn_counts)
+        merged.damage_dealt.extend(report.damage_dealt)
+        merged.damage_taken.extend(report.damage_taken)
+        merged.player_hp_on_win.extend(report.player_hp_on_win)
+        merged.ability_uses.update(report.ability_uses)
+    return merged
+
+
+def simulate_batch(loadout: Dict[str, Any], opponent: Dict[str, Any], fights: int = 100_000,
+                   player_policy: str = "greedy", opponent_policy: str = "random",
+                   seed: Optional[int] = None, max_turns: int = DEFAULT_MAX_TURNS,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> SimulationReport:
+    """
+    Resolve many fights with the vectorized engine.
+
+    Takes the same loadout and opponent dictionaries as combat_simulator.run_simulation.
+
+    Returns:
+    SimulationReport: The aggregated results.
+    """
+    combat = CombatSystem({"name": loadout.get("name", "Player")},
+                          dict(opponent, name=opponent.get("name", "Opponent")),
+                          player_abilities=loadout.get("abilities"),
+                          player_hp=loadout.get("hp"))
+    seeds = np.random.SeedSequence(seed).spawn((fights + batch_size - 1) // batch_size)
+    reports = []
+    for start, batch_seed in zip(range(0, fights, batch_size), seeds):
+        engine = VectorCombat.from_combat(combat, min(batch_size, fights - start),
+                                          player_policy=player_policy,
+                                          opponent_policy=opponent_policy, seed=batch_seed)
+        reports.append(engine.run(max_turns))
+    return reports[0] if len(reports) == 1 else merge_reports(reports)
@@ -1,5 +1,6 @@
 from flask import Flask, render_template, request, jsonify
 from llm_service import LLMService
+from item_catalog import Inventory
 import json
 import re
 
@@ -47,7 +48,7 @@ def get_character_state():
         'health': char.get('resources', {}).get('health', 100),
         'credits': char.get('resources', {}).get('credits', 0),
         'location': char.get('location', 'Unknown'),
-        'inventory': char.get('inventory', []),
+        'inventory': Inventory.of(char).labels(),
         'relationships': char.get('relationships', {})
     }
 
@@ -99,7 +100,7 @@ Presence:
 {appearance.get('presence', '')}
 
 Recent Events:
-{chr(10).join(f"• {event['description']}" for event in npc_data['story_progression'][-3:])}
+{chr(10).join(f"• {event['description']}" for event in llm_service.npc_manager.get_recent_story_events(npc_name, 3))}
 
 Your Relationship: {npc_data['relationships'].get('player', {}).get('status', 'neutral')}
 Trust Level: {npc_data['relationships'].get('player', {}).get('trust_level', 0)}/10